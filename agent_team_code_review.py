@@ -1,13 +1,26 @@
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from azure.identity import DefaultAzureCredential
 from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import ToolSet, CodeInterpreterTool
-from utils.agent_team import AgentTeam, _create_task
-import re
-import ast
+from utils.agent_team import AgentTeam, AgentTask, RequestResult, _create_task
+from utils.review_cache import ReviewCache, split_review_by_file
+from utils.agent_pool import AgentPool
+from utils.report_writer import IncrementalReportWriter, StreamPrinter
+from utils.git_diff import get_changed_files
+from utils.chunking import ReviewBatch, estimate_tokens, pack_chunks, pack_texts, split_code
+from utils.compaction import compact_files, remap_line_references
+from utils.static_analysis import analyze_files, render_regions
+from utils.sharding import balance_shards, shard_agent_name, shard_count
+from utils.file_discovery import discover_files
+from utils.pipeline import Pipeline, PipelineStage
+from utils.report_consolidation import ReportConsolidator
+from utils.throttling import ThrottleController, ThrottledAgentsClient
+from utils.transcript import RecordingAgentsClient, ReplayAgentsClient
+from utils import metrics
+from utils.tracing_policy import TracingPolicy, apply_export_defaults, set_policy
 import yaml
 
 # OpenTelemetry imports for tracing
@@ -16,8 +29,8 @@ from opentelemetry import trace
 
 load_dotenv()
 
-# Enable content recording for tracing (set to True to trace chat message content)
-os.environ["AZURE_TRACING_GEN_AI_CONTENT_RECORDING_ENABLED"] = "true"
+# Enable content recording for tracing (set to false in the environment to leave chat message content out)
+os.environ.setdefault("AZURE_TRACING_GEN_AI_CONTENT_RECORDING_ENABLED", "true")
 
 # Load language configs and extension mapping from YAML
 with open("language_agents.yaml", "r") as f:
@@ -28,217 +41,773 @@ EXTENSION_TO_LANGUAGE = config["extension_to_language"]
 def detect_language(file_path: Path) -> str:
     return EXTENSION_TO_LANGUAGE.get(file_path.suffix.lower(), 'unknown')
 
-def read_code_file(file_path):
+def read_code_file(file_path, contents: Optional[Dict[Path, str]] = None):
+    # Files read during discovery are taken from ``contents`` instead of being read again
+    if contents and file_path in contents:
+        return contents[file_path]
     with open(file_path, 'r') as file:
         return file.read()
 
-def prepare_code_review_content(files: List[Path]) -> str:
-    content = "Please review these files:\n\n"
+def review_file_name(file_path: Path, input_dir: Optional[Path] = None) -> str:
+    # Files are named by their path under the input directory, so files with the same name in
+    # different directories are reviewed, cached and reported separately
+    if input_dir is not None:
+        try:
+            return file_path.relative_to(input_dir).as_posix()
+        except ValueError:
+            pass
+    return file_path.name
+
+def prepare_code_review_content(
+    files: List[Path],
+    diffs: Optional[Dict[Path, str]] = None,
+    max_tokens: Optional[int] = None,
+    contents: Optional[Dict[Path, str]] = None,
+    duplicates: Optional[Dict[Path, List[Path]]] = None,
+    notes: Optional[Dict[Path, str]] = None,
+    input_dir: Optional[Path] = None,
+) -> List[ReviewBatch]:
+    """
+    Packs the files into batches that each stay under the token budget. Files that are too large
+    on their own are split on function/class boundaries into parts. ``duplicates`` lists the files
+    left out because they are identical to one that is sent, and ``notes`` is shown under a file's
+    heading. Files are named by their path relative to ``input_dir``.
+    """
+    max_tokens = max_tokens or REVIEW_BATCH_MAX_TOKENS
+    chunks = []
+    duplicate_names: Dict[str, List[str]] = {}
+    for file_path, copies in (duplicates or {}).items():
+        duplicate_names[review_file_name(file_path, input_dir)] = [review_file_name(copy, input_dir) for copy in copies]
+    file_notes = {review_file_name(file_path, input_dir): note for file_path, note in (notes or {}).items() if note}
     for file_path in files:
-        code = read_code_file(file_path)
-        content += f"File: {file_path.name}\n```{file_path.suffix[1:]}\n{code}\n```\n\n"
-    return content
+        file_name = review_file_name(file_path, input_dir)
+        if diffs and file_path in diffs:
+            chunks.extend(split_code(file_name, "diff", diffs[file_path], "diff", max_tokens))
+        else:
+            chunks.extend(split_code(file_name, file_path.suffix[1:], read_code_file(file_path, contents), detect_language(file_path), max_tokens))
+    batches = pack_chunks(chunks, max_tokens)
+    for batch in batches:
+        content = "Please review these files:\n\n"
+        for chunk in batch.chunks:
+            heading = f"File: {chunk.file_name}"
+            if duplicate_names.get(chunk.file_name):
+                heading += f" (identical to {', '.join(duplicate_names[chunk.file_name])}, which are not shown)"
+            if chunk.tag == "diff":
+                heading += " (only the changed hunks are shown, review the changes)"
+            if chunk.parts > 1:
+                heading += f" (part {chunk.part} of {chunk.parts}"
+                heading += ")" if chunk.tag == "diff" else f", lines {chunk.start_line}-{chunk.end_line})"
+            content += f"{heading}\n"
+            if chunk.part == 1 and chunk.file_name in file_notes:
+                content += f"{file_notes[chunk.file_name]}\n"
+            content += f"```{chunk.tag}\n{chunk.content}\n```\n\n"
+        batch.content = content
+    return batches
 
 PROJECT_ENDPOINT = os.getenv('PROJECT_ENDPOINT')
 MODEL_DEPLOYMENT_NAME = os.getenv('MODEL_DEPLOYMENT_NAME')
+# Number of agent tasks (e.g. per-language reviews) that may run at the same time
+AGENT_TEAM_MAX_WORKERS = int(os.getenv('AGENT_TEAM_MAX_WORKERS', '4'))
+# Per-file review cache, keyed on file content, agent instructions and model deployment
+REVIEW_CACHE_ENABLED = os.getenv('REVIEW_CACHE_ENABLED', 'true').lower() == 'true'
+REVIEW_CACHE_DIR = os.getenv('REVIEW_CACHE_DIR', '.review_cache')
+REVIEW_CACHE_MAX_MB = float(os.getenv('REVIEW_CACHE_MAX_MB', '100'))
+REVIEW_CACHE_MAX_AGE_DAYS = float(os.getenv('REVIEW_CACHE_MAX_AGE_DAYS', '7'))
+
+# Warm agent pool: reuse agents across runs instead of creating and deleting them every time
+AGENT_POOL_ENABLED = os.getenv('AGENT_POOL_ENABLED', 'false').lower() == 'true'
+AGENT_POOL_PATH = os.getenv('AGENT_POOL_PATH', '.agent_pool.json')
+AGENT_POOL_TTL_HOURS = float(os.getenv('AGENT_POOL_TTL_HOURS', '24'))
+# Consume agent runs as event streams instead of polling them to completion
+AGENT_TEAM_STREAMING = os.getenv('AGENT_TEAM_STREAMING', 'false').lower() == 'true'
+# Token budget per review task; larger inputs are split into several tasks
+REVIEW_BATCH_MAX_TOKENS = int(os.getenv('REVIEW_BATCH_MAX_TOKENS', '12000'))
+# Incremental mode: review only files changed since this git ref (empty reviews whole files)
+REVIEW_BASE_REF = os.getenv('REVIEW_BASE_REF', '')
+REVIEW_DIFF_CONTEXT_LINES = int(os.getenv('REVIEW_DIFF_CONTEXT_LINES', '10'))
+# "leader" lets the team leader route tasks; "pipeline" runs the fixed flow in AGENT_TEAM_PIPELINE
+AGENT_TEAM_MODE = os.getenv('AGENT_TEAM_MODE', 'leader').lower()
+AGENT_TEAM_PIPELINE = os.getenv('AGENT_TEAM_PIPELINE', 'review_pipeline.yaml')
+# "shared", "per_task" or "pruned"; see AgentTeam for what each join-point task sees
+AGENT_TEAM_THREAD_STRATEGY = os.getenv('AGENT_TEAM_THREAD_STRATEGY', 'shared').lower()
+# Per-request budgets for the team; 0 leaves a budget unbounded
+AGENT_TEAM_MAX_RUNS = int(os.getenv('AGENT_TEAM_MAX_RUNS', '0'))
+AGENT_TEAM_MAX_TOKENS = int(os.getenv('AGENT_TEAM_MAX_TOKENS', '0'))
+AGENT_TEAM_MAX_SECONDS = float(os.getenv('AGENT_TEAM_MAX_SECONDS', '0'))
+# File discovery: size limit, extra gitignore-style patterns (comma separated) and read parallelism
+REVIEW_MAX_FILE_KB = float(os.getenv('REVIEW_MAX_FILE_KB', '256'))
+REVIEW_IGNORE = [pattern.strip() for pattern in os.getenv('REVIEW_IGNORE', '').split(',') if pattern.strip()]
+REVIEW_USE_GITIGNORE = os.getenv('REVIEW_USE_GITIGNORE', 'true').lower() == 'true'
+REVIEW_DISCOVERY_WORKERS = int(os.getenv('REVIEW_DISCOVERY_WORKERS', '8'))
+SKIPPED_PATHS_PER_EVENT = 10
+# Compaction drops licence headers, extra whitespace and duplicate files before code is sent for review
+REVIEW_COMPACTION_ENABLED = os.getenv('REVIEW_COMPACTION_ENABLED', 'false').lower() == 'true'
+# Number of identical review agents a language's files are spread across: a fixed number, or "auto" for
+# one per REVIEW_SHARD_TOKENS of code, up to REVIEW_MAX_SHARDS
+REVIEW_SHARDS = os.getenv('REVIEW_SHARDS', '1').lower()
+REVIEW_SHARD_TOKENS = int(os.getenv('REVIEW_SHARD_TOKENS', '24000'))
+REVIEW_MAX_SHARDS = int(os.getenv('REVIEW_MAX_SHARDS', '4'))
+if REVIEW_SHARDS != 'auto' and not (REVIEW_SHARDS.isdigit() and int(REVIEW_SHARDS) >= 1):
+    raise ValueError(f"REVIEW_SHARDS must be a positive number of agents or 'auto', not '{REVIEW_SHARDS}'.")
+# "single" has the documentation agent write the report in one pass over all reviews; "map_reduce"
+# summarizes per file, then per language, then writes the report, caching each summary
+REVIEW_CONSOLIDATION = os.getenv('REVIEW_CONSOLIDATION', 'single').lower()
+REVIEW_SUMMARY_MIN_CHARS = int(os.getenv('REVIEW_SUMMARY_MIN_CHARS', '1500'))
+# Local static analysis: findings and the regions worth a look are sent instead of whole files, and
+# files with no findings and at most REVIEW_TRIVIAL_MAX_LINES lines of code are not sent at all
+REVIEW_STATIC_ANALYSIS_ENABLED = os.getenv('REVIEW_STATIC_ANALYSIS_ENABLED', 'false').lower() == 'true'
+REVIEW_TRIVIAL_MAX_LINES = int(os.getenv('REVIEW_TRIVIAL_MAX_LINES', '20'))
+REVIEW_ANALYSIS_WORKERS = int(os.getenv('REVIEW_ANALYSIS_WORKERS', '4'))
+# Task content on spans and events is cut to TRACE_CONTENT_MAX_CHARS (0 records only its length and hash)
+# and recorded for a TRACE_CONTENT_SAMPLE_RATIO share of traces
+TRACE_CONTENT_MAX_CHARS = int(os.getenv('TRACE_CONTENT_MAX_CHARS', '2048'))
+TRACE_CONTENT_SAMPLE_RATIO = float(os.getenv('TRACE_CONTENT_SAMPLE_RATIO', '1.0'))
+# "record" saves every agent run to AGENT_TRANSCRIPT_PATH; "replay" serves the recorded runs back
+# with no network access, to rebuild reports without new model runs
+AGENT_TRANSCRIPT_MODE = os.getenv('AGENT_TRANSCRIPT_MODE', 'off').lower()
+AGENT_TRANSCRIPT_PATH = os.getenv('AGENT_TRANSCRIPT_PATH', '.agent_transcript.json.gz')
+# Retries and pacing of throttled calls; an RPM or TPM limit of 0 leaves that quota unchecked
+AGENT_THROTTLE_ENABLED = os.getenv('AGENT_THROTTLE_ENABLED', 'true').lower() == 'true'
+AGENT_THROTTLE_MAX_CONCURRENCY = int(os.getenv('AGENT_THROTTLE_MAX_CONCURRENCY', '8'))
+AGENT_THROTTLE_RPM = int(os.getenv('AGENT_THROTTLE_RPM', '0'))
+AGENT_THROTTLE_TPM = int(os.getenv('AGENT_THROTTLE_TPM', '0'))
+AGENT_THROTTLE_MAX_RETRIES = int(os.getenv('AGENT_THROTTLE_MAX_RETRIES', '6'))
+
+FILE_HEADING_INSTRUCTIONS = "Start the feedback for each file with a heading of the form `### File: <file path>`, with the path as shown above."
 
-if not PROJECT_ENDPOINT or not MODEL_DEPLOYMENT_NAME:
-    raise EnvironmentError("PROJECT_ENDPOINT and MODEL_DEPLOYMENT_NAME must be set in the environment.")
+DOCUMENTATION_AGENT_INSTRUCTIONS = """You are a technical documentation expert. Your task is to:\n1. Take multiple code review feedbacks and format them into clear markdown\n2. Create a well-structured document with sections per language\n3. Include code examples where relevant\n4. Add an executive summary at the top\nImportant formatting rules:\n- Use proper markdown heading levels\n- For code examples, use appropriate language tags"""
 
 # Initialize tracer
 tracer = trace.get_tracer(__name__)
 
-# Setup Azure Monitor tracing
-with tracer.start_as_current_span("setup-tracing") as setup_span:
-    try:
-        # For AgentsClient, we'll setup basic Azure Monitor tracing
-        # Note: This assumes you have Application Insights configured
-        connection_string = os.getenv('APPLICATIONINSIGHTS_CONNECTION_STRING')
-        if connection_string:
-            configure_azure_monitor(connection_string=connection_string)
-            setup_span.set_attribute("tracing.enabled", True)
-            print("Azure Monitor tracing configured successfully.")
-        else:
-            print("APPLICATIONINSIGHTS_CONNECTION_STRING not set. Tracing will be local only.")
-            setup_span.set_attribute("tracing.enabled", False)
-    except Exception as e:
-        print(f"Warning: Could not configure Azure Monitor tracing: {e}")
-        setup_span.set_attribute("tracing.error", str(e))
-
-# Main execution wrapped in tracing span
-with tracer.start_as_current_span("code-review-agent-team") as main_span:
-    main_span.set_attribute("project.endpoint", PROJECT_ENDPOINT)
-    main_span.set_attribute("model.deployment", MODEL_DEPLOYMENT_NAME)
-    
+def configure_tracing() -> None:
+    # Setup Azure Monitor tracing
+    set_policy(TracingPolicy(max_content_chars=TRACE_CONTENT_MAX_CHARS, sample_ratio=TRACE_CONTENT_SAMPLE_RATIO))
+    # Batch span processor settings are read from the environment when the tracer provider is created
+    export_settings = apply_export_defaults()
+    with tracer.start_as_current_span("setup-tracing") as setup_span:
+        setup_span.set_attribute("tracing.content_max_chars", TRACE_CONTENT_MAX_CHARS)
+        setup_span.set_attribute("tracing.content_sample_ratio", TRACE_CONTENT_SAMPLE_RATIO)
+        try:
+            # For AgentsClient, we'll setup basic Azure Monitor tracing
+            # Note: This assumes you have Application Insights configured
+            connection_string = os.getenv('APPLICATIONINSIGHTS_CONNECTION_STRING')
+            if connection_string:
+                configure_azure_monitor(connection_string=connection_string)
+                setup_span.set_attribute("tracing.enabled", True)
+                for name, value in export_settings.items():
+                    setup_span.set_attribute(f"tracing.{name.lower()}", value)
+                print("Azure Monitor tracing configured successfully.")
+            else:
+                print("APPLICATIONINSIGHTS_CONNECTION_STRING not set. Tracing will be local only.")
+                setup_span.set_attribute("tracing.enabled", False)
+        except Exception as e:
+            print(f"Warning: Could not configure Azure Monitor tracing: {e}")
+            setup_span.set_attribute("tracing.error", str(e))
+
+def discover_review_files(input_dir: Path, base_ref: str = "") -> Tuple[Dict[str, List[Path]], Dict[Path, str], Dict[Path, str]]:
+    """
+    Returns the files to review grouped by language, the contents read during discovery, and the
+    changed hunks of modified files when ``base_ref`` is set.
+    """
     # File discovery and language detection
     with tracer.start_as_current_span("file-discovery") as discovery_span:
-        input_dir = Path('code-input')
-        input_dir.mkdir(exist_ok=True)
-        
+        discovery = discover_files(
+            input_dir,
+            detect_language,
+            max_file_bytes=int(REVIEW_MAX_FILE_KB * 1024),
+            ignore_patterns=REVIEW_IGNORE,
+            use_gitignore=REVIEW_USE_GITIGNORE,
+            max_workers=REVIEW_DISCOVERY_WORKERS,
+        )
+        # One event per reason keeps large trees from flooding the span; it names the first few paths
+        for reason, skipped in discovery.skipped_by_reason().items():
+            discovery_span.set_attribute(f"files.skipped.{reason}", len(skipped))
+            discovery_span.add_event(
+                "files_skipped",
+                attributes={
+                    "skip.reason": reason,
+                    "skip.count": len(skipped),
+                    "skip.paths": [str(entry.path) for entry in skipped[:SKIPPED_PATHS_PER_EVENT]],
+                },
+            )
+
         # Group files by language
         language_files: Dict[str, List[Path]] = {}
+        file_contents: Dict[Path, str] = {}
         total_files = 0
-        for file_path in input_dir.glob('**/*'):
-            if file_path.is_file():
-                language = detect_language(file_path)
-                if language != 'unknown':
-                    language_files.setdefault(language, []).append(file_path)
-                    total_files += 1
+        for discovered in discovery.files:
+            language_files.setdefault(discovered.language, []).append(discovered.path)
+            file_contents[discovered.path] = discovered.content
+            total_files += 1
+        
+        # Incremental mode: keep only changed files and send modified files as hunks
+        file_diffs: Dict[Path, str] = {}
+        if base_ref:
+            changes = get_changed_files(base_ref, input_dir, context_lines=REVIEW_DIFF_CONTEXT_LINES)
+            for language in list(language_files):
+                changed = [file_path for file_path in language_files[language] if file_path.resolve() in changes]
+                for file_path in changed:
+                    diff = changes[file_path.resolve()].diff
+                    if diff is not None:
+                        file_diffs[file_path] = diff
+                if changed:
+                    language_files[language] = changed
+                else:
+                    del language_files[language]
+            total_files = sum(len(files) for files in language_files.values())
+            discovery_span.set_attribute("diff.base_ref", base_ref)
+            discovery_span.set_attribute("diff.changed_files", total_files)
+            discovery_span.set_attribute("diff.full_files", total_files - len(file_diffs))
         
         discovery_span.set_attribute("files.total", total_files)
         discovery_span.set_attribute("languages.detected", list(language_files.keys()))
         discovery_span.set_attribute("languages.count", len(language_files))
-        
-        if not language_files:
-            raise ValueError("No supported code files found in code-input directory")
+        return language_files, file_contents, file_diffs
 
-    # Original client setup
-    credential = DefaultAzureCredential()
-    agents_client = AgentsClient(endpoint=PROJECT_ENDPOINT, credential=credential)
-    
-    # Register _create_task for function calling (required for AgentTeam delegation)
-    agents_client.enable_auto_function_calls({_create_task})
+def review_cache_key(
+    file_path: Path, language: str, file_contents: Dict[Path, str], file_diffs: Dict[Path, str]
+) -> str:
+    # Incremental reviews are keyed on the hunks that are sent instead of the whole file
+    review_content = file_diffs[file_path] if file_path in file_diffs else read_code_file(file_path, file_contents)
+    # Compaction and static analysis change what the agent is sent, so switching either one is a miss
+    settings = (
+        f"compaction={REVIEW_COMPACTION_ENABLED};"
+        f"static_analysis={REVIEW_STATIC_ANALYSIS_ENABLED};trivial_max_lines={REVIEW_TRIVIAL_MAX_LINES}"
+    )
+    return ReviewCache.make_key(review_content, LANGUAGE_CONFIGS[language]['instructions'], MODEL_DEPLOYMENT_NAME, settings)
 
-    with agents_client:
-        # Agent team setup (wrapped in span)
-        with tracer.start_as_current_span("agent-team-setup") as team_span:
-            team_span.set_attribute("team.name", "code_review_team")
-            
-            agent_team = AgentTeam("code_review_team", agents_client=agents_client)
-
-            # Add a review agent for each language
-            for language, files in language_files.items():
-                with tracer.start_as_current_span(f"create-agent-{language}") as agent_span:
-                    agent_span.set_attribute("agent.language", language)
-                    agent_span.set_attribute("agent.files_count", len(files))
-                    
-                    config = LANGUAGE_CONFIGS[language]
+def plan_language_shards(
+    language_files: Dict[str, List[Path]],
+    file_contents: Dict[Path, str],
+    file_diffs: Dict[Path, str],
+    review_cache: Optional[ReviewCache] = None,
+) -> Dict[str, int]:
+    """
+    Returns the number of review agents for each language, from ``REVIEW_SHARDS``. Only the files
+    without a review in ``review_cache`` count, so a language whose files are all cached gets one agent.
+    """
+    shards: Dict[str, int] = {}
+    for language, files in language_files.items():
+        if review_cache is not None:
+            files = [
+                file_path for file_path in files
+                if not review_cache.contains(review_cache_key(file_path, language, file_contents, file_diffs))
+            ]
+        if REVIEW_SHARDS != "auto":
+            shards[language] = max(1, min(int(REVIEW_SHARDS), len(files)))
+            continue
+        total_tokens = sum(
+            estimate_tokens(file_diffs[file_path] if file_path in file_diffs else read_code_file(file_path, file_contents))
+            for file_path in files
+        )
+        shards[language] = shard_count(total_tokens, len(files), REVIEW_SHARD_TOKENS, REVIEW_MAX_SHARDS)
+    return shards
+
+def build_review_team(
+    agents_client: AgentsClient,
+    language_files: Dict[str, List[Path]],
+    team_name: str,
+    agent_pool: Optional[AgentPool],
+    task_completed_callback,
+    language_shards: Optional[Dict[str, int]] = None,
+    output_callback=None,
+) -> AgentTeam:
+    # Agent team setup (wrapped in span)
+    with tracer.start_as_current_span("agent-team-setup") as team_span:
+        team_span.set_attribute("team.name", team_name)
+        team_span.set_attribute("team.max_workers", AGENT_TEAM_MAX_WORKERS)
+        team_span.set_attribute("team.agent_pool", agent_pool is not None)
+        team_span.set_attribute("team.streaming", AGENT_TEAM_STREAMING)
+        team_span.set_attribute("team.mode", AGENT_TEAM_MODE)
+        team_span.set_attribute("team.thread_strategy", AGENT_TEAM_THREAD_STRATEGY)
+        team_span.set_attribute("team.consolidation", REVIEW_CONSOLIDATION)
+        pipeline = Pipeline.load(AGENT_TEAM_PIPELINE) if AGENT_TEAM_MODE == "pipeline" else None
+        if REVIEW_CONSOLIDATION == "map_reduce":
+            # The request only runs the reviews; the report is consolidated from them afterwards
+            pipeline = Pipeline([PipelineStage(name="review")])
+
+        agent_team = AgentTeam(
+            team_name,
+            agents_client=agents_client,
+            max_workers=AGENT_TEAM_MAX_WORKERS,
+            agent_pool=agent_pool,
+            streaming=AGENT_TEAM_STREAMING,
+            output_callback=output_callback,
+            task_completed_callback=task_completed_callback,
+            pipeline=pipeline,
+            thread_strategy=AGENT_TEAM_THREAD_STRATEGY,
+            max_runs=AGENT_TEAM_MAX_RUNS or None,
+            max_tokens=AGENT_TEAM_MAX_TOKENS or None,
+            max_wall_seconds=AGENT_TEAM_MAX_SECONDS or None,
+        )
+
+        # Add a review agent for each language, or one per shard of a sharded language
+        for language, files in language_files.items():
+            with tracer.start_as_current_span(f"create-agent-{language}") as agent_span:
+                agent_span.set_attribute("agent.language", language)
+                agent_span.set_attribute("agent.files_count", len(files))
+                
+                config = LANGUAGE_CONFIGS[language]
+                shards = (language_shards or {}).get(language, 1)
+                for index in range(shards):
                     code_interpreter = CodeInterpreterTool()
                     toolset = ToolSet()
                     toolset.add(code_interpreter)
                     agent_team.add_agent(
                         model=MODEL_DEPLOYMENT_NAME,
-                        name=config['name'],
+                        name=shard_agent_name(config['name'], index, shards),
                         instructions=config['instructions'] + "\n\nYou will receive a list of files to review in the user request.",
                         toolset=toolset,
                         can_delegate=False,
+                        language=language,
                     )
-                    
-                    agent_span.set_attribute("agent.name", config['name'])
-
-            # Add a documentation agent
-            with tracer.start_as_current_span("create-documentation-agent") as doc_agent_span:
-                doc_instructions = """You are a technical documentation expert. Your task is to:\n1. Take multiple code review feedbacks and format them into clear markdown\n2. Create a well-structured document with sections per language\n3. Include code examples where relevant\n4. Add an executive summary at the top\nImportant formatting rules:\n- Use proper markdown heading levels\n- For code examples, use appropriate language tags"""
-                code_interpreter = CodeInterpreterTool()
-                doc_toolset = ToolSet()
-                doc_toolset.add(code_interpreter)
-                agent_team.add_agent(
-                    model=MODEL_DEPLOYMENT_NAME,
-                    name="documentation-agent",
-                    instructions=doc_instructions,
-                    toolset=doc_toolset,
-                    can_delegate=False,
-                )
                 
-                doc_agent_span.set_attribute("agent.name", "documentation-agent")
-                doc_agent_span.set_attribute("agent.type", "documentation")
-
-            agent_team.assemble_team()
-
-        # Request processing (wrapped in span)
-        with tracer.start_as_current_span("process-code-review") as review_span:
-            # Prepare the user request for the team leader
-            review_requests = []
-            for language, files in language_files.items():
-                review_requests.append(f"Review the following {language} files:\n\n" + prepare_code_review_content(files))
-            user_request = "\n\n".join(review_requests) + "\n\nAfter reviewing, consolidate all feedback into a markdown document."
+                agent_span.set_attribute("agent.name", config['name'])
+                agent_span.set_attribute("agent.shards", shards)
+
+        # Add a documentation agent
+        with tracer.start_as_current_span("create-documentation-agent") as doc_agent_span:
+            code_interpreter = CodeInterpreterTool()
+            doc_toolset = ToolSet()
+            doc_toolset.add(code_interpreter)
+            agent_team.add_agent(
+                model=MODEL_DEPLOYMENT_NAME,
+                name="documentation-agent",
+                instructions=DOCUMENTATION_AGENT_INSTRUCTIONS,
+                toolset=doc_toolset,
+                can_delegate=False,
+                join_before=True,
+            )
             
-            review_span.set_attribute("request.length", len(user_request))
-            review_span.set_attribute("request.languages", list(language_files.keys()))
+            doc_agent_span.set_attribute("agent.name", "documentation-agent")
+            doc_agent_span.set_attribute("agent.type", "documentation")
 
-            print("\nSubmitting user request to agent team...\n")
-            result = agent_team.process_request(request=user_request)
+        agent_team.assemble_team()
+        if agent_pool is not None:
+            team_span.set_attribute("pool.hits", agent_pool.hits)
+            team_span.set_attribute("pool.misses", agent_pool.misses)
+        return agent_team
 
-        # Message processing and report generation (wrapped in span)
-        with tracer.start_as_current_span("generate-report") as report_span:
-            # Fetch all agent messages from the thread
-            thread_id = agent_team._agent_thread.id
-            messages = list(agents_client.messages.list(thread_id=thread_id))
-            
-            report_span.set_attribute("messages.count", len(messages))
+def create_review_cache() -> Optional[ReviewCache]:
+    # Cached reviews change the prompts of a run, so a replay would not match its recording, and
+    # entries are keyed on the model deployment, which replay does not need to have set
+    if not REVIEW_CACHE_ENABLED or AGENT_TRANSCRIPT_MODE != "off" or not MODEL_DEPLOYMENT_NAME:
+        return None
+    return ReviewCache(
+        REVIEW_CACHE_DIR,
+        max_bytes=int(REVIEW_CACHE_MAX_MB * 1024 * 1024),
+        max_age_seconds=REVIEW_CACHE_MAX_AGE_DAYS * 24 * 3600,
+    )
+
+def process_code_review(
+    agent_team: AgentTeam,
+    language_files: Dict[str, List[Path]],
+    file_contents: Dict[Path, str],
+    file_diffs: Dict[Path, str],
+    review_task_languages: Dict[AgentTask, str],
+    review_line_maps: Optional[Dict[AgentTask, Tuple[List[str], Dict[str, List[int]]]]] = None,
+    file_reviews: Optional[Dict[str, Dict[str, str]]] = None,
+    language_shards: Optional[Dict[str, int]] = None,
+    input_dir: Optional[Path] = None,
+) -> RequestResult:
+    """
+    Reviews the files and returns the team's result. ``review_task_languages`` and ``review_line_maps``
+    are filled in for each review task, with its language and, when compaction is enabled, the files
+    it covers and the line map of each compacted one. ``file_reviews`` is filled in with the review of
+    each file by language, whether fresh or cached; a review without per-file sections is kept whole
+    under the names of the files in its batch. A language with several shards in ``language_shards``
+    has its files split between that many agents, balanced by estimated tokens. Files are named by
+    their path relative to ``input_dir`` in the tasks, the cache and ``file_reviews``.
+    """
+    # Request processing (wrapped in span)
+    with tracer.start_as_current_span("process-code-review") as review_span:
+        review_cache = create_review_cache()
+
+        # Queue review tasks per language for the files without a cached review, one task per
+        # batch that fits the token budget; the reviews are independent and run concurrently
+        review_tasks = []
+        pending_reviews = []
+        cached_reviews = []
+        cache_keys: Dict[str, str] = {}
+        tokens_saved = 0
+        duplicate_count = 0
+        pending_files: Dict[str, List[Path]] = {}
+        for language, files in language_files.items():
+            files_to_review = []
+            for file_path in files:
+                if review_cache is None:
+                    files_to_review.append(file_path)
+                    continue
+                cache_key = review_cache_key(file_path, language, file_contents, file_diffs)
+                cached_review = review_cache.get(cache_key)
+                metrics.record_lookup(
+                    metrics.review_cache_lookups,
+                    cached_review is not None,
+                    metrics.attributes(agent_team.team_name, LANGUAGE_CONFIGS[language]['name'], language),
+                )
+                if cached_review is None:
+                    files_to_review.append(file_path)
+                    cache_keys[review_file_name(file_path, input_dir)] = cache_key
+                else:
+                    file_name = review_file_name(file_path, input_dir)
+                    cached_reviews.append(f"Cached {language} review of {file_name}:\n{cached_review}")
+                    if file_reviews is not None:
+                        file_reviews.setdefault(language, {})[file_name] = cached_review
+            if files_to_review:
+                pending_files[language] = files_to_review
+
+        # Whole files are analyzed locally first, across all languages in one process pool
+        analyses = {}
+        if REVIEW_STATIC_ANALYSIS_ENABLED:
+            analyses = analyze_files(
+                [
+                    (file_path, read_code_file(file_path, file_contents), language)
+                    for language, files in pending_files.items()
+                    for file_path in files
+                    if file_path not in file_diffs
+                ],
+                max_workers=REVIEW_ANALYSIS_WORKERS,
+            )
+        trivial_files: List[str] = []
+        analysis_tokens_saved = 0
+        for language, files_to_review in pending_files.items():
+            review_contents = dict(file_contents or {})
+            notes: Dict[Path, str] = {}
+            if analyses:
+                analyzed_files = []
+                for file_path in files_to_review:
+                    analysis = analyses.get(file_path)
+                    if analysis is None:
+                        analyzed_files.append(file_path)
+                        continue
+                    code = read_code_file(file_path, file_contents)
+                    review_span.add_event(
+                        "file_analyzed",
+                        attributes={
+                            "file.path": str(file_path),
+                            "analysis.findings": len(analysis.findings),
+                            "analysis.rules": sorted({finding.rule for finding in analysis.findings}),
+                            "analysis.regions": len(analysis.regions),
+                        },
+                    )
+                    if REVIEW_TRIVIAL_MAX_LINES and analysis.is_trivial(REVIEW_TRIVIAL_MAX_LINES):
+                        file_name = review_file_name(file_path, input_dir)
+                        trivial_files.append(file_name)
+                        if file_reviews is not None:
+                            file_reviews.setdefault(language, {})[file_name] = (
+                                f"### File: {file_name}\nStatic analysis found no issues; not reviewed by an agent."
+                            )
+                        analysis_tokens_saved += estimate_tokens(code)
+                        continue
+                    analyzed_files.append(file_path)
+                    notes[file_path] = analysis.notes()
+                    if analysis.regions:
+                        review_contents[file_path] = render_regions(code, analysis.regions)
+                        notes[file_path] = (
+                            notes[file_path] + "\nOnly the regions worth a closer look are shown, each line prefixed with its line number."
+                        ).strip()
+                        analysis_tokens_saved += estimate_tokens(code) - estimate_tokens(review_contents[file_path])
+                files_to_review = analyzed_files
+                if not files_to_review:
+                    continue
+            duplicates: Dict[Path, List[Path]] = {}
+            line_maps: Dict[str, List[int]] = {}
+            if REVIEW_COMPACTION_ENABLED:
+                # Changed hunks are sent as they are, and so are files with analysis notes, whose
+                # findings refer to the original lines; other whole files are compacted and deduplicated
+                full_files = [file_path for file_path in files_to_review if file_path not in file_diffs and not notes.get(file_path)]
+                compacted_files = compact_files(
+                    full_files, {file_path: read_code_file(file_path, file_contents) for file_path in full_files}, language
+                )
+                review_contents.update({compacted.path: compacted.content for compacted in compacted_files})
+                sent = {compacted.path for compacted in compacted_files}
+                files_to_review = [file_path for file_path in files_to_review if file_path not in full_files or file_path in sent]
+                for compacted in compacted_files:
+                    line_maps[review_file_name(compacted.path, input_dir)] = compacted.line_map
+                    if compacted.duplicates:
+                        duplicates[compacted.path] = compacted.duplicates
+                    tokens_saved += compacted.tokens_saved
+                    duplicate_count += len(compacted.duplicates)
+                    review_span.add_event(
+                        "file_compacted",
+                        attributes={
+                            "file.path": str(compacted.path),
+                            "tokens.original": compacted.original_tokens * (1 + len(compacted.duplicates)),
+                            "tokens.compacted": compacted.tokens,
+                            "tokens.saved": compacted.tokens_saved,
+                            "file.duplicates": [str(duplicate) for duplicate in compacted.duplicates],
+                        },
+                    )
+            shards = (language_shards or {}).get(language, 1)
+            shard_tokens = {
+                file_path: estimate_tokens(
+                    file_diffs[file_path] if file_path in file_diffs else read_code_file(file_path, review_contents)
+                )
+                for file_path in files_to_review
+            }
+            batches: List[Tuple[str, ReviewBatch]] = []
+            for index, shard_files in enumerate(balance_shards(files_to_review, shard_tokens, shards)):
+                if not shard_files:
+                    continue
+                recipient = shard_agent_name(LANGUAGE_CONFIGS[language]['name'], index, shards)
+                shard_batches = prepare_code_review_content(
+                    shard_files, file_diffs, contents=review_contents, duplicates=duplicates, notes=notes, input_dir=input_dir
+                )
+                batches.extend((recipient, batch) for batch in shard_batches)
+                if shards > 1:
+                    review_span.add_event(
+                        "shard_planned",
+                        attributes={
+                            "agent.name": recipient,
+                            "shard.files": len(shard_files),
+                            "shard.tokens": sum(shard_tokens[file_path] for file_path in shard_files),
+                        },
+                    )
+            for recipient, batch in batches:
+                task_description = f"Review the following {language} files:\n\n" + batch.content + FILE_HEADING_INSTRUCTIONS
+                if len(batches) > 1:
+                    task_description += f"\nThe {language} files are reviewed in {len(batches)} parts; review only the code shown here."
+                task = AgentTask(
+                    recipient=recipient,
+                    task_description=task_description,
+                    requestor="user",
+                )
+                review_tasks.append(task)
+                review_task_languages[task] = language
+                task_line_maps = {name: line_maps[name] for name in batch.file_names if name in line_maps}
+                if review_line_maps is not None and task_line_maps:
+                    review_line_maps[task] = (batch.file_names, task_line_maps)
+                pending_reviews.append((task, batch))
+        # The team leader picks up once every review has completed
+        user_request = "The language review agents have reviewed the code and their feedback is in the thread. Consolidate all feedback into a markdown document."
+        if trivial_files:
+            user_request += "\n\nThese files are small and static analysis found no issues, so they were not reviewed by an agent: " + ", ".join(trivial_files)
+        # Cached reviews reach the team as context messages of at most a batch each, not in the request
+        cached_context = ["\n\n".join(group) for group in pack_texts(cached_reviews, REVIEW_BATCH_MAX_TOKENS)]
+        if cached_reviews:
+            user_request += (
+                f"\n\n{len(cached_reviews)} files are unchanged since an earlier review. Their cached feedback is "
+                "in the messages starting with 'Cached'; include it in the document."
+            )
+
+        review_span.set_attribute("request.length", len(user_request) + sum(len(task.task_description) for task in review_tasks))
+        review_span.set_attribute("request.languages", list(language_files.keys()))
+        review_span.set_attribute("request.review_tasks", len(review_tasks))
+        review_span.set_attribute("request.max_batch_tokens", max((batch.tokens for _, batch in pending_reviews), default=0))
+        review_span.set_attribute("request.cached_context_messages", len(cached_context))
+        if REVIEW_STATIC_ANALYSIS_ENABLED:
+            review_span.set_attribute("static_analysis.files", len(analyses))
+            review_span.set_attribute("static_analysis.findings", sum(len(analysis.findings) for analysis in analyses.values()))
+            review_span.set_attribute("static_analysis.trivial_files", len(trivial_files))
+            review_span.set_attribute("static_analysis.tokens_saved", analysis_tokens_saved)
+        if REVIEW_COMPACTION_ENABLED:
+            review_span.set_attribute("compaction.tokens_saved", tokens_saved)
+            review_span.set_attribute("compaction.duplicates", duplicate_count)
+
+        print("\nSubmitting user request to agent team...\n")
+        result = agent_team.process_request(request=user_request, tasks=review_tasks, context=cached_context)
+
+        # Split each fresh review into per-file sections. A file that was split into parts is only
+        # cached once a section was found for every part.
+        file_sections: Dict[str, List[str]] = {}
+        file_parts: Dict[str, int] = {}
+        for task, batch in pending_reviews:
+            for chunk in batch.chunks:
+                file_parts[chunk.file_name] = chunk.parts
+            if not task.result:
+                continue
+            sections = split_review_by_file(task.result, batch.file_names)
+            for file_name, file_review in sections.items():
+                file_sections.setdefault(file_name, []).append(file_review)
+                if file_reviews is not None:
+                    language_reviews = file_reviews.setdefault(review_task_languages[task], {})
+                    language_reviews[file_name] = "\n\n".join(file_sections[file_name])
+            unsectioned = [file_name for file_name in batch.file_names if file_name not in sections]
+            if unsectioned:
+                # The agent left out the ### File: headings for these files, so their feedback cannot
+                # be cached per file; a review with no sections at all is kept whole for the batch
+                review_span.add_event(
+                    "review_unsectioned",
+                    attributes={"agent.name": task.recipient, "files": unsectioned, "review.sections": len(sections)},
+                )
+                print(f"Review by '{task.recipient}' has no section for {', '.join(unsectioned)}; not cached.")
+                if not sections and file_reviews is not None:
+                    file_reviews.setdefault(review_task_languages[task], {})[", ".join(batch.file_names)] = task.result.strip()
+        if review_cache is not None:
+            # Store the per-file reviews for the next run
+            for file_name, sections in file_sections.items():
+                if file_name in cache_keys and len(sections) == file_parts[file_name]:
+                    review_cache.put(cache_keys[file_name], "\n\n".join(sections), file_name=file_name)
+            review_cache.evict()
+            review_span.set_attribute("cache.hits", review_cache.hits)
+            review_span.set_attribute("cache.misses", review_cache.misses)
+            review_span.set_attribute("cache.evictions", review_cache.evictions)
+            print(f"Review cache: {review_cache.hits} hits, {review_cache.misses} misses.")
+        return result
+
+def generate_report(
+    result: RequestResult, report_writer: IncrementalReportWriter, markdown_doc: Optional[str] = None
+) -> bool:
+    # Report generation (wrapped in span)
+    with tracer.start_as_current_span("generate-report") as report_span:
+        if markdown_doc is None:
+            # The report is the documentation agent's final answer, taken straight from its task
+            markdown_doc = result.final_result("documentation-agent")
+        report_span.set_attribute("request.tasks", len(result.tasks))
+        report_span.set_attribute("request.duration", result.duration)
+        report_span.set_attribute("request.stop_reason", result.stop_reason)
+        report_span.set_attribute("request.tokens", result.tokens)
+        print(f"Request stopped ({result.stop_reason}) after {len(result.tasks)} tasks and {result.tokens} tokens.")
+        for task in result.tasks:
+            print(f"Task for '{task.recipient}': run {task.run_id} on thread {task.thread_id}, {task.duration or 0:.1f}s")
+
+        report_generated = False
+        if markdown_doc:
+            report_writer.write_final(markdown_doc.strip())
+            print(f"\nMarkdown document saved as '{report_writer.path}'")
+            report_generated = True
+        else:
+            print(f"The documentation agent produced no report. '{report_writer.path}' keeps the per-language reviews.")
+        
+        report_span.set_attribute("report.generated", report_generated)
+        if report_generated:
+            report_span.set_attribute("report.filename", report_writer.path)
+        return report_generated
 
-            # Debug: print the full message object for each message
-            for msg in messages:
-                print(msg)
+def run_code_review(
+    agents_client: AgentsClient,
+    input_dir: Path = Path('code-input'),
+    report_path: str = "code_review_report.md",
+    base_ref: str = REVIEW_BASE_REF,
+    team_name: str = "code_review_team",
+    agent_pool: Optional[AgentPool] = None,
+) -> bool:
+    """
+    Reviews the code under ``input_dir`` and writes the report to ``report_path``. Returns False if
+    there was nothing to review. The client, credential and agent pool can be shared between
+    reviews; ``team_name`` must be unique among the reviews running at the same time.
+    """
+    # Main execution wrapped in tracing span
+    with tracer.start_as_current_span("code-review-agent-team") as main_span:
+        main_span.set_attribute("project.endpoint", PROJECT_ENDPOINT)
+        main_span.set_attribute("model.deployment", MODEL_DEPLOYMENT_NAME)
+        main_span.set_attribute("review.input_dir", str(input_dir))
 
-            # Heuristic: find the first substantial markdown message from any agent or assistant
-            def is_documentation_message(msg):
-                if hasattr(msg, 'content') and msg.content:
-                    text = str(msg.content).strip()
-                    return (msg.role in ("agent", "assistant")) and (text.startswith("#") or "Code Review" in text or "Overview" in text)
+        language_files, file_contents, file_diffs = discover_review_files(input_dir, base_ref)
+        if not language_files:
+            if base_ref:
+                print(f"No supported code files changed since '{base_ref}'. Nothing to review.")
                 return False
+            raise ValueError(f"No supported code files found in {input_dir} directory")
 
-            doc_message = next((msg for msg in messages if is_documentation_message(msg)), None)
-
-            # Fallback: find the longest markdown message with headings
-            if not doc_message:
-                markdown_candidates = [msg for msg in messages if hasattr(msg, 'content') and msg.content and (str(msg.content).strip().startswith("#") or "Code Review" in str(msg.content) or "Overview" in str(msg.content))]
-                if markdown_candidates:
-                    doc_message = max(markdown_candidates, key=lambda m: len(str(m.content)))
-
-            # Helper to extract markdown from various content structures
-            def extract_markdown_content(content):
-                # If content is a list, concatenate all markdown strings found
-                if isinstance(content, list):
-                    markdowns = []
-                    for item in content:
-                        if isinstance(item, dict) and 'text' in item and 'value' in item['text']:
-                            markdowns.append(item['text']['value'])
-                    if markdowns:
-                        return "\n\n".join(markdowns)
-                # If content is a dict with 'text'->'value'
-                if isinstance(content, dict) and 'text' in content and 'value' in content['text']:
-                    return content['text']['value']
-                # If content is a string that looks like a list/dict, parse and extract
-                if isinstance(content, str) and content.strip().startswith("[{"):
-                    try:
-                        parsed = ast.literal_eval(content)
-                        return extract_markdown_content(parsed)
-                    except Exception:
-                        pass
-                # If content is a string, return as is
-                if isinstance(content, str):
-                    return content
-                return str(content)
-
-            # Helper to clean up and normalize markdown text
-            def reformat_to_markdown(text):
-                text = text.strip()
-                # Replace escaped newlines with real newlines
-                text = text.replace("\\n", "\n")
-                # Optionally, fix double-escaped code blocks, etc.
-                text = re.sub(r"```+", "```", text)
-                # Remove any remaining single quotes at start/end
-                text = text.strip("'")
-                return text
-
-            report_generated = False
-            if doc_message:
-                markdown_doc = extract_markdown_content(doc_message.content)
-                markdown_doc = reformat_to_markdown(markdown_doc)
-                with open("code_review_report.md", "w") as f:
-                    f.write(markdown_doc)
-                print("\nMarkdown document saved as 'code_review_report.md'")
-                report_generated = True
-            else:
-                print("No documentation agent response found in thread.")
-            
-            report_span.set_attribute("report.generated", report_generated)
-            if report_generated:
-                report_span.set_attribute("report.filename", "code_review_report.md")
-
-        # Cleanup (wrapped in span) - MOVED INSIDE agents_client context
-        with tracer.start_as_current_span("cleanup") as cleanup_span:
-            agent_team.dismantle_team()
-            cleanup_span.set_attribute("cleanup.completed", True)
-            print("All agents dismantled.") 
\ No newline at end of file
+        # Each language review is written to the report as soon as it completes
+        report_writer = IncrementalReportWriter(report_path)
+        review_task_languages: Dict[AgentTask, str] = {}
+        review_line_maps: Dict[AgentTask, Tuple[List[str], Dict[str, List[int]]]] = {}
+
+        # Streamed text is printed line by line as it arrives
+        stream_printer = StreamPrinter()
+
+        def write_review_section(task: AgentTask) -> None:
+            stream_printer.flush(task)
+            if task in review_line_maps and task.result:
+                # Findings in reviews of compacted files point at the original lines from here on
+                file_names, line_maps = review_line_maps[task]
+                task.result = remap_line_references(task.result, line_maps, file_names)
+            language = review_task_languages.get(task)
+            if language is not None and task.result:
+                report_writer.add_section(f"{language.capitalize()} review", task.result)
+                print(f"\n{language} review written to '{report_path}'")
+
+        language_shards = plan_language_shards(language_files, file_contents, file_diffs, create_review_cache())
+        main_span.set_attribute("review.shards", [f"{language}={shards}" for language, shards in language_shards.items()])
+        agent_team = build_review_team(
+            agents_client,
+            language_files,
+            team_name,
+            agent_pool,
+            write_review_section,
+            language_shards,
+            output_callback=stream_printer.write if AGENT_TEAM_STREAMING else None,
+        )
+        try:
+            file_reviews: Dict[str, Dict[str, str]] = {}
+            result = process_code_review(
+                agent_team,
+                language_files,
+                file_contents,
+                file_diffs,
+                review_task_languages,
+                review_line_maps,
+                file_reviews,
+                language_shards,
+                input_dir,
+            )
+            markdown_doc = None
+            if REVIEW_CONSOLIDATION == "map_reduce":
+                consolidator = ReportConsolidator(
+                    agent_team,
+                    "documentation-agent",
+                    MODEL_DEPLOYMENT_NAME,
+                    cache=create_review_cache(),
+                    max_input_tokens=REVIEW_BATCH_MAX_TOKENS,
+                    passthrough_chars=REVIEW_SUMMARY_MIN_CHARS,
+                )
+                markdown_doc = consolidator.consolidate(file_reviews)
+            generate_report(result, report_writer, markdown_doc)
+        finally:
+            # Cleanup (wrapped in span)
+            with tracer.start_as_current_span("cleanup") as cleanup_span:
+                agent_team.dismantle_team()
+                cleanup_span.set_attribute("cleanup.completed", True)
+                print("All agents released." if agent_pool is not None else "All agents dismantled.")
+        return True
+
+def create_agents_client(credential) -> AgentsClient:
+    """
+    Creates the client the review teams use, wrapped in a ThrottledAgentsClient unless throttling is
+    disabled. Teams sharing the returned client also share its concurrency limit and quota. In
+    transcript record mode the client is also wrapped in a RecordingAgentsClient, and in replay mode
+    a ReplayAgentsClient is returned instead.
+    """
+    if AGENT_TRANSCRIPT_MODE == "replay":
+        # Recorded runs are served locally, so there is nothing to throttle
+        agents_client = ReplayAgentsClient.load(AGENT_TRANSCRIPT_PATH)
+    else:
+        agents_client = AgentsClient(endpoint=PROJECT_ENDPOINT, credential=credential)
+        if AGENT_THROTTLE_ENABLED:
+            controller = ThrottleController(
+                max_concurrency=AGENT_THROTTLE_MAX_CONCURRENCY,
+                requests_per_minute=AGENT_THROTTLE_RPM,
+                tokens_per_minute=AGENT_THROTTLE_TPM,
+                max_retries=AGENT_THROTTLE_MAX_RETRIES,
+            )
+            agents_client = ThrottledAgentsClient(agents_client, controller)
+        if AGENT_TRANSCRIPT_MODE == "record":
+            # Outside the throttled client, so retried calls are recorded once
+            agents_client = RecordingAgentsClient(agents_client, AGENT_TRANSCRIPT_PATH)
+    # Register _create_task for function calling (required for AgentTeam delegation)
+    agents_client.enable_auto_function_calls({_create_task})
+    return agents_client  # type: ignore[return-value]
+
+def main() -> None:
+    if AGENT_TRANSCRIPT_MODE != "replay" and (not PROJECT_ENDPOINT or not MODEL_DEPLOYMENT_NAME):
+        raise EnvironmentError("PROJECT_ENDPOINT and MODEL_DEPLOYMENT_NAME must be set in the environment.")
+
+    configure_tracing()
+    input_dir = Path('code-input')
+    input_dir.mkdir(exist_ok=True)
+
+    # Original client setup
+    credential = DefaultAzureCredential()
+    agents_client = create_agents_client(credential)
+
+    # Replayed agents only exist in this process, so they are never pooled
+    pool_enabled = AGENT_POOL_ENABLED and AGENT_TRANSCRIPT_MODE != "replay"
+    agent_pool = AgentPool(AGENT_POOL_PATH, ttl_seconds=AGENT_POOL_TTL_HOURS * 3600) if pool_enabled else None
+    with agents_client:
+        run_code_review(agents_client, input_dir=input_dir, agent_pool=agent_pool)
+
+if __name__ == "__main__":
+    main()
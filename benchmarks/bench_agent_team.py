@@ -0,0 +1,281 @@
+"""
+Orchestration benchmarks for AgentTeam, run against the in-process FakeAgentsClient.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_agent_team
+    python -m benchmarks.bench_agent_team --latency lognormal --output results.json
+    python -m benchmarks.bench_agent_team --baseline benchmarks/baseline.json --tolerance 0.25
+
+With the default ``zero`` latency profile the service costs nothing, so the measured time is the
+overhead of AgentTeam itself. Each scenario runs in a fresh interpreter so that team registries and
+other module state don't carry over between scenarios.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+LANGUAGES = ["python", "csharp", "typescript", "terraform", "java", "go", "rust", "sql"]
+
+LATENCY_PROFILES = ["zero", "fixed", "lognormal"]
+
+def _latencies(profile: str, scale: float) -> Dict[str, Any]:
+    from benchmarks.fake_agents_client import Latency
+
+    if profile == "zero":
+        return {}
+    if profile == "fixed":
+        return {
+            "create_agent": Latency.fixed(0.2 * scale),
+            "delete_agent": Latency.fixed(0.1 * scale),
+            "create_thread": Latency.fixed(0.05 * scale),
+            "delete_thread": Latency.fixed(0.05 * scale),
+            "create_message": Latency.fixed(0.05 * scale),
+            "get_message": Latency.fixed(0.05 * scale),
+            "run": Latency.fixed(2.0 * scale),
+        }
+    return {
+        "create_agent": Latency.lognormal(0.2 * scale, 0.3),
+        "delete_agent": Latency.lognormal(0.1 * scale, 0.3),
+        "create_thread": Latency.lognormal(0.05 * scale, 0.3),
+        "delete_thread": Latency.lognormal(0.05 * scale, 0.3),
+        "create_message": Latency.lognormal(0.05 * scale, 0.3),
+        "get_message": Latency.lognormal(0.05 * scale, 0.3),
+        "run": Latency.lognormal(2.0 * scale, 0.6),
+    }
+
+def _make_files(language: str, file_count: int, lines_per_file: int) -> List[Any]:
+    code = "".join(f"def function_{index}(value):\n    return value + {index}\n\n" for index in range(lines_per_file // 3))
+    return [(f"{language}_{index}.src", code) for index in range(file_count)]
+
+def _build_scenario(scenario: Dict[str, Any], client: Any, team_class: Any) -> Any:
+    from utils.agent_team import AgentTask
+    from utils.chunking import pack_chunks, split_code
+    from utils.pipeline import Pipeline, PipelineStage
+
+    languages = LANGUAGES[:scenario["languages"]]
+    pipeline = None
+    if scenario["mode"] == "pipeline":
+        pipeline = Pipeline(
+            [PipelineStage("review"), PipelineStage("document", recipient="documentation-agent", depends_on=["review"])]
+        )
+    team = team_class(
+        "benchmark_team",
+        agents_client=client,
+        max_workers=scenario["max_workers"],
+        streaming=scenario["streaming"],
+        pipeline=pipeline,
+        thread_strategy=scenario["thread_strategy"],
+    )
+    tasks = []
+    for language in languages:
+        team.add_agent(
+            model="fake-model", name=f"{language}-agent", instructions=f"Review {language} code.", can_delegate=False, language=language
+        )
+        chunks = []
+        for file_name, code in _make_files(language, scenario["files_per_language"], scenario["lines_per_file"]):
+            chunks.extend(split_code(file_name, language, code, language, scenario["max_tokens"]))
+        for batch in pack_chunks(chunks, scenario["max_tokens"]):
+            content = "\n".join(chunk.content for chunk in batch.chunks)
+            tasks.append(AgentTask(recipient=f"{language}-agent", task_description=content, requestor="user"))
+    team.add_agent(
+        model="fake-model", name="documentation-agent", instructions="Write the report.", can_delegate=False, join_before=True
+    )
+    return team, tasks
+
+def _responses(languages: int) -> Dict[str, Any]:
+    from benchmarks.fake_agents_client import route_once
+
+    responses: Dict[str, Any] = {
+        "TeamLeader": route_once(
+            {
+                "team_name": "benchmark_team",
+                "recipient": "documentation-agent",
+                "request": "Consolidate the reviews into a report.",
+                "requestor": "TeamLeader",
+            }
+        ),
+        "documentation-agent": "# Code Review\n\n" + "Consolidated feedback.\n" * 20,
+    }
+    for language in LANGUAGES[:languages]:
+        responses[f"{language}-agent"] = f"### File: {language}_0.src\n\n" + "Looks fine.\n" * 10
+    return responses
+
+def _run_sync(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    from benchmarks.fake_agents_client import FakeAgentsClient
+    from utils.agent_team import AgentTeam, _create_task
+
+    client = FakeAgentsClient(_responses(scenario["languages"]), _latencies(scenario["latency"], scenario["scale"]), seed=scenario["seed"])
+    client.enable_auto_function_calls({_create_task})
+    timings: Dict[str, float] = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        team, tasks = _build_scenario(scenario, client, AgentTeam)
+        timings["setup_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        team.assemble_team()
+        timings["assemble_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        request_result = team.process_request("Review the code and write a report.", tasks=tasks)
+        timings["process_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        team.dismantle_team()
+        timings["dismantle_s"] = time.perf_counter() - start
+    return _result(scenario, client, request_result, tasks, timings)
+
+def _run_async(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    from benchmarks.fake_agents_client import AsyncFakeAgentsClient
+    from utils.async_agent_team import AsyncAgentTeam, _create_task
+
+    async def run() -> Dict[str, Any]:
+        client = AsyncFakeAgentsClient(
+            _responses(scenario["languages"]), _latencies(scenario["latency"], scenario["scale"]), seed=scenario["seed"]
+        )
+        client.enable_auto_function_calls({_create_task})
+        timings: Dict[str, float] = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            team, tasks = _build_scenario(scenario, client, AsyncAgentTeam)
+            timings["setup_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            await team.assemble_team()
+            timings["assemble_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            request_result = await team.process_request("Review the code and write a report.", tasks=tasks)
+            timings["process_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            await team.dismantle_team()
+            timings["dismantle_s"] = time.perf_counter() - start
+        return _result(scenario, client, request_result, tasks, timings)
+
+    return asyncio.run(run())
+
+def _result(scenario: Dict[str, Any], client: Any, request_result: Any, tasks: List[Any], timings: Dict[str, float]) -> Dict[str, Any]:
+    timings["total_s"] = sum(timings.values())
+    simulated = sum(client.state.simulated_seconds.values())
+    return {
+        "name": scenario["name"],
+        **timings,
+        "review_tasks": len(tasks),
+        "completed_tasks": len(request_result.tasks),
+        "runs": client.state.calls.get("run", 0),
+        "service_calls": sum(client.state.calls.values()),
+        "prompt_tokens": client.state.prompt_tokens,
+        "simulated_service_s": simulated,
+    }
+
+def run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    return _run_async(scenario) if scenario["async"] else _run_sync(scenario)
+
+def build_scenarios(latency: str, scale: float, seed: int) -> List[Dict[str, Any]]:
+    base = {
+        "mode": "leader",
+        "languages": 4,
+        "files_per_language": 10,
+        "lines_per_file": 120,
+        "max_tokens": 12000,
+        "max_workers": 4,
+        "streaming": False,
+        "async": False,
+        "thread_strategy": "shared",
+        "latency": latency,
+        "scale": scale,
+        "seed": seed,
+    }
+    scenarios = []
+    for languages in (1, 2, 4, 8):
+        scenarios.append({**base, "name": f"languages={languages}", "languages": languages})
+    for files in (10, 100, 400):
+        # A small token budget gives one task per few files, so task count grows with file count
+        scenarios.append({**base, "name": f"files={files}", "files_per_language": files // 4, "max_tokens": 2000})
+    for max_workers in (1, 8):
+        scenarios.append({**base, "name": f"max_workers={max_workers}", "max_workers": max_workers})
+    scenarios.append({**base, "name": "pipeline", "mode": "pipeline"})
+    scenarios.append({**base, "name": "streaming", "streaming": True})
+    for thread_strategy in ("shared", "per_task", "pruned"):
+        # The strategies differ in what the join points (team leader and documentation agent) are sent
+        scenarios.append(
+            {**base, "name": f"threads={thread_strategy}", "thread_strategy": thread_strategy, "max_workers": 1, "files_per_language": 25}
+        )
+    scenarios.append({**base, "name": "async", "async": True})
+    scenarios.append({**base, "name": "async+pipeline", "async": True, "mode": "pipeline"})
+    return scenarios
+
+def run_benchmarks(scenarios: List[Dict[str, Any]], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+        for scenario in scenarios:
+            runs = [executor.submit(run_scenario, scenario).result() for _ in range(repeat)]
+            # Report the median of each timing across repeats
+            result = dict(runs[0])
+            for key in result:
+                if key.endswith("_s"):
+                    result[key] = statistics.median(run[key] for run in runs)
+            results.append(result)
+            print(
+                f"{result['name']:<18} total {result['total_s']:8.3f}s  assemble {result['assemble_s']:7.3f}s  "
+                f"process {result['process_s']:8.3f}s  dismantle {result['dismantle_s']:7.3f}s  "
+                f"tasks {result['review_tasks']:4d}  runs {result['runs']:4d}  calls {result['service_calls']:5d}  "
+                f"prompt tokens {result['prompt_tokens']:8d}"
+            )
+    return results
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline_path: str, tolerance: float, min_seconds: float) -> List[str]:
+    """
+    Returns a message for each scenario whose total time grew by more than ``tolerance`` (a fraction)
+    over the baseline. Differences below ``min_seconds`` are ignored as timer noise.
+    """
+    with open(baseline_path, "r") as baseline_file:
+        baseline = {result["name"]: result for result in json.load(baseline_file)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous is None:
+            continue
+        limit = previous["total_s"] * (1 + tolerance)
+        if result["total_s"] > limit and result["total_s"] - previous["total_s"] > min_seconds:
+            regressions.append(
+                f"{result['name']}: {result['total_s']:.3f}s vs baseline {previous['total_s']:.3f}s "
+                f"(+{(result['total_s'] / previous['total_s'] - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark AgentTeam orchestration against a fake AgentsClient.")
+    parser.add_argument("--latency", choices=LATENCY_PROFILES, default="zero", help="simulated service latency profile")
+    parser.add_argument("--scale", type=float, default=0.01, help="multiplier for simulated latencies")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the median is reported")
+    parser.add_argument("--seed", type=int, default=0, help="seed for sampled latencies")
+    parser.add_argument("--only", help="only run scenarios whose name contains this text")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="fail if a scenario is slower than in this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline, as a fraction")
+    parser.add_argument("--min-seconds", type=float, default=0.02, help="ignore slowdowns smaller than this, in seconds")
+    args = parser.parse_args(argv)
+
+    scenarios = build_scenarios(args.latency, args.scale, args.seed)
+    if args.only:
+        scenarios = [scenario for scenario in scenarios if args.only in scenario["name"]]
+    results = run_benchmarks(scenarios, args.repeat)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"latency": args.latency, "scale": args.scale, "results": results}, output_file, indent=2)
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance, args.min_seconds)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
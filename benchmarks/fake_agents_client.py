@@ -0,0 +1,559 @@
+import asyncio
+import inspect
+import itertools
+import math
+import random
+import threading
+import time
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Union
+from azure.core.exceptions import ResourceNotFoundError
+from azure.ai.agents.models import (
+    Agent,
+    AgentEventHandler,
+    AgentThread,
+    MessageDeltaChunk,
+    MessageTextContent,
+    ThreadMessage,
+    ThreadRun,
+)
+
+class Latency:
+    """
+    A latency distribution for a simulated service call, in seconds.
+    """
+    def __init__(self, sampler: Callable[[random.Random], float]) -> None:
+        self._sampler = sampler
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, self._sampler(rng))
+
+    @staticmethod
+    def zero() -> "Latency":
+        return Latency(lambda rng: 0.0)
+
+    @staticmethod
+    def fixed(seconds: float) -> "Latency":
+        return Latency(lambda rng: seconds)
+
+    @staticmethod
+    def uniform(low: float, high: float) -> "Latency":
+        return Latency(lambda rng: rng.uniform(low, high))
+
+    @staticmethod
+    def lognormal(median: float, sigma: float = 0.5) -> "Latency":
+        # LLM run times are right-skewed: most runs are close to the median, a few are much slower
+        return Latency(lambda rng: rng.lognormvariate(math.log(median), sigma))
+
+    @staticmethod
+    def samples(values: List[float]) -> "Latency":
+        return Latency(lambda rng: rng.choice(values))
+
+class FakeRun:
+    """
+    The context passed to a scripted response: the agent being run, its thread and a way to call the
+    functions registered with ``enable_auto_function_calls``, as the service does for tool calls.
+    """
+    def __init__(self, client: "_FakeAgentsState", agent: Agent, thread_id: str, call_number: int) -> None:
+        self.client = client
+        self.agent = agent
+        self.thread_id = thread_id
+        self.call_number = call_number
+        self.tool_calls: List[Dict[str, Any]] = []
+
+    @property
+    def messages(self) -> List[ThreadMessage]:
+        return list(self.client.thread_messages[self.thread_id])
+
+    @property
+    def last_user_message(self) -> str:
+        for message in reversed(self.client.thread_messages[self.thread_id]):
+            if message.role == "user":
+                return message.text_messages[-1].text.value
+        return ""
+
+    def call_function(self, name: str, **arguments: Any) -> None:
+        """
+        Records a tool call. The function runs after the response is produced, in the thread (or
+        task) that is processing the run, like the SDK's automatic function calls.
+        """
+        if name not in self.client.functions:
+            raise ValueError(f"Function '{name}' is not enabled for automatic function calls.")
+        self.tool_calls.append({"name": name, "arguments": arguments})
+
+Response = Union[str, Callable[[FakeRun], str]]
+
+def route_once(*tool_calls: Dict[str, Any], text: str = "Tasks created.", then: str = "The request is complete.") -> Callable[[FakeRun], str]:
+    """
+    A scripted team leader response: calls ``_create_task`` for each of ``tool_calls`` on the first run
+    and only answers with ``then`` on later runs, such as completeness checks.
+    """
+    def respond(run: FakeRun) -> str:
+        if run.call_number > 1:
+            return then
+        for arguments in tool_calls:
+            run.call_function("_create_task", **arguments)
+        return text
+    return respond
+
+class _FakeAgentsState:
+    """
+    The in-memory service shared by the sync and async fake clients. It never waits itself; the
+    clients wait for the latency returned by ``_record`` before each operation.
+    """
+    def __init__(
+        self,
+        responses: Optional[Dict[str, Response]] = None,
+        latency: Optional[Dict[str, Latency]] = None,
+        run_latency: Optional[Dict[str, Latency]] = None,
+        usage_per_char: float = 0.25,
+        seed: int = 0,
+    ) -> None:
+        self.responses: Dict[str, Response] = responses or {}
+        self.latency: Dict[str, Latency] = latency or {}
+        self.run_latency: Dict[str, Latency] = run_latency or {}
+        self.usage_per_char = usage_per_char
+        self.agents: Dict[str, Agent] = {}
+        self.thread_messages: Dict[str, List[ThreadMessage]] = {}
+        self.functions: Dict[str, Callable[..., Any]] = {}
+        self.calls: Dict[str, int] = {}
+        self.simulated_seconds: Dict[str, float] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.thread_runs: Dict[str, List[ThreadRun]] = {}
+        self._agent_calls: Dict[str, int] = {}
+        self._active_runs: set = set()
+        self._ids = itertools.count(1)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids)}"
+
+    def _record(self, operation: str, agent_name: Optional[str] = None) -> float:
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            distribution = self.run_latency.get(agent_name or "") if operation == "run" else None
+            distribution = distribution or self.latency.get(operation) or Latency.zero()
+            seconds = distribution.sample(self._rng)
+            self.simulated_seconds[operation] = self.simulated_seconds.get(operation, 0.0) + seconds
+            return seconds
+
+    def enable_auto_function_calls(self, tools: Any) -> None:
+        functions = getattr(tools, "_functions", None)
+        if isinstance(functions, dict):
+            self.functions.update(functions)
+            return
+        for function in tools:
+            self.functions[function.__name__] = function
+
+    def create_agent(self, model: str, name: str, instructions: str = "", **kwargs: Any) -> Agent:
+        agent = Agent({"id": self._next_id("asst"), "object": "assistant", "name": name, "model": model, "instructions": instructions})
+        with self._lock:
+            self.agents[agent.id] = agent
+        return agent
+
+    def get_agent(self, agent_id: str) -> Agent:
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            raise ResourceNotFoundError(f"No agent with ID '{agent_id}'.")
+        return agent
+
+    def delete_agent(self, agent_id: str) -> None:
+        with self._lock:
+            self.agents.pop(agent_id, None)
+
+    def create_thread(self, messages: Optional[List[Any]] = None) -> AgentThread:
+        thread = AgentThread({"id": self._next_id("thread"), "object": "thread", "created_at": int(time.time())})
+        with self._lock:
+            self.thread_messages[thread.id] = []
+        for message in messages or []:
+            self.create_message(thread.id, str(message.role), message.content)
+        return thread
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.thread_messages.pop(thread_id, None)
+
+    def create_message(self, thread_id: str, role: Any, content: str) -> ThreadMessage:
+        with self._lock:
+            if thread_id in self._active_runs:
+                raise RuntimeError(f"Can't add messages to {thread_id} while a run is active.")
+            message = self._build_message(thread_id, role, content)
+            self.thread_messages[thread_id].append(message)
+        return message
+
+    def _build_message(self, thread_id: str, role: Any, content: str, agent_id: Optional[str] = None) -> ThreadMessage:
+        return ThreadMessage(
+            {
+                "id": self._next_id("msg"),
+                "object": "thread.message",
+                "created_at": int(time.time()),
+                "thread_id": thread_id,
+                "status": "completed",
+                "role": "assistant" if str(role) in ("assistant", "agent", "MessageRole.AGENT") else "user",
+                "content": [{"type": "text", "text": {"value": content, "annotations": []}}],
+                "assistant_id": agent_id,
+                "attachments": [],
+                "metadata": {},
+            }
+        )
+
+    def list_messages(self, thread_id: str) -> List[ThreadMessage]:
+        # Newest first, like the service's default order
+        return list(reversed(self.thread_messages[thread_id]))
+
+    def get_last_message_text_by_role(self, thread_id: str, role: Any) -> Optional[MessageTextContent]:
+        wanted = "assistant" if str(role) in ("assistant", "agent", "MessageRole.AGENT") else "user"
+        for message in reversed(self.thread_messages[thread_id]):
+            if message.role == wanted and message.text_messages:
+                return message.text_messages[-1]
+        return None
+
+    def start_run(self, thread_id: str, agent_id: str) -> FakeRun:
+        with self._lock:
+            if thread_id in self._active_runs:
+                raise RuntimeError(f"Thread {thread_id} already has an active run.")
+            self._active_runs.add(thread_id)
+            agent = self.agents[agent_id]
+            # Counted per agent rather than per name, so teams sharing the client each see their own first run
+            call_number = self._agent_calls.get(agent.id, 0) + 1
+            self._agent_calls[agent.id] = call_number
+        return FakeRun(self, agent, thread_id, call_number)
+
+    def respond(self, run: FakeRun) -> str:
+        response = self.responses.get(run.agent.name, f"{run.agent.name} finished the task.")
+        return response(run) if callable(response) else response
+
+    def finish_run(self, run: FakeRun, text: str) -> ThreadRun:
+        with self._lock:
+            prompt_chars = sum(len(message.text_messages[-1].text.value) for message in self.thread_messages[run.thread_id])
+            message = self._build_message(run.thread_id, "assistant", text, agent_id=run.agent.id)
+            self.thread_messages[run.thread_id].append(message)
+            self._active_runs.discard(run.thread_id)
+            prompt_tokens = int(prompt_chars * self.usage_per_char)
+            completion_tokens = int(len(text) * self.usage_per_char)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        thread_run = ThreadRun(
+            {
+                "id": self._next_id("run"),
+                "object": "thread.run",
+                "thread_id": run.thread_id,
+                "assistant_id": run.agent.id,
+                "status": "completed",
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+        with self._lock:
+            self.thread_runs.setdefault(run.thread_id, []).append(thread_run)
+        return thread_run
+
+    def get_run(self, thread_id: str, run_id: str) -> ThreadRun:
+        for thread_run in self.thread_runs.get(thread_id, []):
+            if thread_run.id == run_id:
+                return thread_run
+        raise KeyError(f"Run {run_id} not found on thread {thread_id}.")
+
+    def list_runs(self, thread_id: str) -> List[ThreadRun]:
+        # Newest first, like the service's default order
+        return list(reversed(self.thread_runs.get(thread_id, [])))
+
+    def reply_message(self, run: FakeRun) -> ThreadMessage:
+        return self.thread_messages[run.thread_id][-1]
+
+def _delta_chunks(message: ThreadMessage, chunk_size: int = 16) -> Iterator[MessageDeltaChunk]:
+    text = message.text_messages[-1].text.value
+    for start in range(0, len(text), chunk_size):
+        yield MessageDeltaChunk(
+            {
+                "id": message.id,
+                "object": "thread.message.delta",
+                "delta": {
+                    "role": "assistant",
+                    "content": [{"index": 0, "type": "text", "text": {"value": text[start:start + chunk_size], "annotations": []}}],
+                },
+            }
+        )
+
+class _Operations:
+    pass
+
+class FakeAgentsClient:
+    """
+    An in-process stand-in for ``azure.ai.agents.AgentsClient`` that covers the agents, threads,
+    messages and runs operations used by ``AgentTeam``, so orchestration can be exercised and timed
+    without an Azure endpoint.
+
+    :param responses: Scripted responses keyed on agent name, either a fixed text or a callable that
+        receives a :class:`FakeRun` and may call the enabled functions, such as ``_create_task``.
+    :param latency: Latency distributions keyed on operation: ``create_agent``, ``delete_agent``,
+        ``create_thread``, ``delete_thread``, ``create_message``, ``get_message``, ``run``, ``get_run`` and
+        ``tool_call``.
+    :param run_latency: Run latency distributions keyed on agent name, overriding ``latency["run"]``.
+    """
+    def __init__(
+        self,
+        responses: Optional[Dict[str, Response]] = None,
+        latency: Optional[Dict[str, Latency]] = None,
+        run_latency: Optional[Dict[str, Latency]] = None,
+        seed: int = 0,
+    ) -> None:
+        self.state = _FakeAgentsState(responses, latency, run_latency, seed=seed)
+        self.threads = _Operations()
+        self.threads.create = self._create_thread
+        self.threads.delete = self._delete_thread
+        self.messages = _Operations()
+        self.messages.create = self._create_message
+        self.messages.list = self._list_messages
+        self.messages.get_last_message_text_by_role = self._get_last_message_text_by_role
+        self.runs = _FakeRuns(self)
+
+    def __enter__(self) -> "FakeAgentsClient":
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        pass
+
+    def _wait(self, operation: str, agent_name: Optional[str] = None) -> None:
+        seconds = self.state._record(operation, agent_name)
+        if seconds:
+            time.sleep(seconds)
+
+    def enable_auto_function_calls(self, tools: Any) -> None:
+        self.state.enable_auto_function_calls(tools)
+
+    def create_agent(self, model: str, name: str, instructions: str = "", **kwargs: Any) -> Agent:
+        self._wait("create_agent")
+        return self.state.create_agent(model, name, instructions, **kwargs)
+
+    def get_agent(self, agent_id: str) -> Agent:
+        self._wait("get_agent")
+        return self.state.get_agent(agent_id)
+
+    def delete_agent(self, agent_id: str) -> None:
+        self._wait("delete_agent")
+        self.state.delete_agent(agent_id)
+
+    def _create_thread(self, messages: Optional[List[Any]] = None, **kwargs: Any) -> AgentThread:
+        self._wait("create_thread")
+        return self.state.create_thread(messages)
+
+    def _delete_thread(self, thread_id: str) -> None:
+        self._wait("delete_thread")
+        self.state.delete_thread(thread_id)
+
+    def _create_message(self, thread_id: str, role: Any, content: str, **kwargs: Any) -> ThreadMessage:
+        self._wait("create_message")
+        return self.state.create_message(thread_id, role, content)
+
+    def _list_messages(self, thread_id: str, **kwargs: Any) -> List[ThreadMessage]:
+        self._wait("get_message")
+        return self.state.list_messages(thread_id)
+
+    def _get_last_message_text_by_role(self, thread_id: str, role: Any) -> Optional[MessageTextContent]:
+        self._wait("get_message")
+        return self.state.get_last_message_text_by_role(thread_id, role)
+
+    def _process_run(self, thread_id: str, agent_id: str) -> tuple:
+        run = self.state.start_run(thread_id, agent_id)
+        try:
+            self._wait("run", run.agent.name)
+            text = self.state.respond(run)
+            for tool_call in run.tool_calls:
+                self._wait("tool_call")
+                self.state.functions[tool_call["name"]](**tool_call["arguments"])
+        except Exception:
+            self.state.finish_run(run, "")
+            raise
+        return run, self.state.finish_run(run, text)
+
+class _FakeRuns:
+    """
+    The runs operations of :class:`FakeAgentsClient`. A run is processed to completion when it is
+    created, and ``create_and_process`` creates the run and polls it with ``get``, as the SDK does.
+    """
+    def __init__(self, client: FakeAgentsClient) -> None:
+        self._client = client
+
+    def create(self, thread_id: str, agent_id: str, **kwargs: Any) -> ThreadRun:
+        return self._client._process_run(thread_id, agent_id)[1]
+
+    def get(self, thread_id: str, run_id: str, **kwargs: Any) -> ThreadRun:
+        self._client._wait("get_run")
+        return self._client.state.get_run(thread_id, run_id)
+
+    def list(self, thread_id: str, **kwargs: Any) -> List[ThreadRun]:
+        self._client._wait("get_run")
+        return self._client.state.list_runs(thread_id)
+
+    def create_and_process(self, thread_id: str, agent_id: str, polling_interval: float = 1, **kwargs: Any) -> ThreadRun:
+        run = self.create(thread_id=thread_id, agent_id=agent_id, **kwargs)
+        while run.status in ("queued", "in_progress", "requires_action"):
+            time.sleep(polling_interval)
+            run = self.get(thread_id=thread_id, run_id=run.id)
+        return run
+
+    def stream(self, thread_id: str, agent_id: str, event_handler: AgentEventHandler, **kwargs: Any) -> "_FakeStream":
+        return _FakeStream(self._client, thread_id, agent_id, event_handler)
+
+class _FakeStream:
+    def __init__(self, client: FakeAgentsClient, thread_id: str, agent_id: str, event_handler: AgentEventHandler) -> None:
+        self._client = client
+        self._thread_id = thread_id
+        self._agent_id = agent_id
+        self._event_handler = event_handler
+
+    def __enter__(self) -> "_FakeStream":
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        pass
+
+    def until_done(self) -> None:
+        run, thread_run = self._client._process_run(self._thread_id, self._agent_id)
+        message = self._client.state.reply_message(run)
+        for chunk in _delta_chunks(message):
+            self._event_handler.on_message_delta(chunk)
+        self._event_handler.on_thread_message(message)
+        self._event_handler.on_thread_run(thread_run)
+        self._event_handler.on_done()
+
+class AsyncFakeAgentsClient:
+    """
+    The ``azure.ai.agents.aio.AgentsClient`` counterpart of :class:`FakeAgentsClient`. Latency is
+    simulated with ``asyncio.sleep`` and coroutine functions are awaited when called as tools.
+    """
+    def __init__(
+        self,
+        responses: Optional[Dict[str, Response]] = None,
+        latency: Optional[Dict[str, Latency]] = None,
+        run_latency: Optional[Dict[str, Latency]] = None,
+        seed: int = 0,
+    ) -> None:
+        self.state = _FakeAgentsState(responses, latency, run_latency, seed=seed)
+        self.threads = _Operations()
+        self.threads.create = self._create_thread
+        self.threads.delete = self._delete_thread
+        self.messages = _Operations()
+        self.messages.create = self._create_message
+        self.messages.list = self._list_messages
+        self.messages.get_last_message_text_by_role = self._get_last_message_text_by_role
+        self.runs = _AsyncFakeRuns(self)
+
+    async def __aenter__(self) -> "AsyncFakeAgentsClient":
+        return self
+
+    async def __aexit__(self, *exc_details: Any) -> None:
+        pass
+
+    async def _wait(self, operation: str, agent_name: Optional[str] = None) -> None:
+        seconds = self.state._record(operation, agent_name)
+        await asyncio.sleep(seconds)
+
+    def enable_auto_function_calls(self, tools: Any) -> None:
+        self.state.enable_auto_function_calls(tools)
+
+    async def create_agent(self, model: str, name: str, instructions: str = "", **kwargs: Any) -> Agent:
+        await self._wait("create_agent")
+        return self.state.create_agent(model, name, instructions, **kwargs)
+
+    async def get_agent(self, agent_id: str) -> Agent:
+        await self._wait("get_agent")
+        return self.state.get_agent(agent_id)
+
+    async def delete_agent(self, agent_id: str) -> None:
+        await self._wait("delete_agent")
+        self.state.delete_agent(agent_id)
+
+    async def _create_thread(self, messages: Optional[List[Any]] = None, **kwargs: Any) -> AgentThread:
+        await self._wait("create_thread")
+        return self.state.create_thread(messages)
+
+    async def _delete_thread(self, thread_id: str) -> None:
+        await self._wait("delete_thread")
+        self.state.delete_thread(thread_id)
+
+    async def _create_message(self, thread_id: str, role: Any, content: str, **kwargs: Any) -> ThreadMessage:
+        await self._wait("create_message")
+        return self.state.create_message(thread_id, role, content)
+
+    async def _list_messages(self, thread_id: str, **kwargs: Any) -> List[ThreadMessage]:
+        await self._wait("get_message")
+        return self.state.list_messages(thread_id)
+
+    async def _get_last_message_text_by_role(self, thread_id: str, role: Any) -> Optional[MessageTextContent]:
+        await self._wait("get_message")
+        return self.state.get_last_message_text_by_role(thread_id, role)
+
+    async def _process_run(self, thread_id: str, agent_id: str) -> tuple:
+        run = self.state.start_run(thread_id, agent_id)
+        try:
+            await self._wait("run", run.agent.name)
+            text = self.state.respond(run)
+            for tool_call in run.tool_calls:
+                await self._wait("tool_call")
+                result = self.state.functions[tool_call["name"]](**tool_call["arguments"])
+                if inspect.isawaitable(result):
+                    await result
+        except Exception:
+            self.state.finish_run(run, "")
+            raise
+        return run, self.state.finish_run(run, text)
+
+class _AsyncFakeRuns:
+    def __init__(self, client: AsyncFakeAgentsClient) -> None:
+        self._client = client
+
+    async def create(self, thread_id: str, agent_id: str, **kwargs: Any) -> ThreadRun:
+        return (await self._client._process_run(thread_id, agent_id))[1]
+
+    async def get(self, thread_id: str, run_id: str, **kwargs: Any) -> ThreadRun:
+        await self._client._wait("get_run")
+        return self._client.state.get_run(thread_id, run_id)
+
+    def list(self, thread_id: str, **kwargs: Any) -> AsyncIterator[ThreadRun]:
+        # Not a coroutine: like the SDK's AsyncItemPaged, the runs are iterated with async for
+        async def runs() -> AsyncIterator[ThreadRun]:
+            await self._client._wait("get_run")
+            for run in self._client.state.list_runs(thread_id):
+                yield run
+        return runs()
+
+    async def create_and_process(
+        self, thread_id: str, agent_id: str, polling_interval: float = 1, **kwargs: Any
+    ) -> ThreadRun:
+        run = await self.create(thread_id=thread_id, agent_id=agent_id, **kwargs)
+        while run.status in ("queued", "in_progress", "requires_action"):
+            await asyncio.sleep(polling_interval)
+            run = await self.get(thread_id=thread_id, run_id=run.id)
+        return run
+
+    async def stream(self, thread_id: str, agent_id: str, event_handler: Any, **kwargs: Any) -> "_AsyncFakeStream":
+        return _AsyncFakeStream(self._client, thread_id, agent_id, event_handler)
+
+class _AsyncFakeStream:
+    def __init__(self, client: AsyncFakeAgentsClient, thread_id: str, agent_id: str, event_handler: Any) -> None:
+        self._client = client
+        self._thread_id = thread_id
+        self._agent_id = agent_id
+        self._event_handler = event_handler
+
+    async def __aenter__(self) -> "_AsyncFakeStream":
+        return self
+
+    async def __aexit__(self, *exc_details: Any) -> None:
+        pass
+
+    async def until_done(self) -> None:
+        run, thread_run = await self._client._process_run(self._thread_id, self._agent_id)
+        message = self._client.state.reply_message(run)
+        for chunk in _delta_chunks(message):
+            await self._event_handler.on_message_delta(chunk)
+        await self._event_handler.on_thread_message(message)
+        await self._event_handler.on_thread_run(thread_run)
+        await self._event_handler.on_done()
@@ -0,0 +1,282 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from azure.identity import DefaultAzureCredential
+from azure.ai.agents import AgentsClient
+from utils.agent_pool import AgentPool
+
+from agent_team_code_review import (
+    AGENT_POOL_PATH,
+    AGENT_POOL_TTL_HOURS,
+    AGENT_TRANSCRIPT_MODE,
+    MODEL_DEPLOYMENT_NAME,
+    PROJECT_ENDPOINT,
+    configure_tracing,
+    create_agents_client,
+    run_code_review,
+)
+
+# Service mode: one process that accepts review jobs over HTTP and runs a bounded number at a time
+REVIEW_SERVICE_HOST = os.getenv('REVIEW_SERVICE_HOST', '127.0.0.1')
+REVIEW_SERVICE_PORT = int(os.getenv('REVIEW_SERVICE_PORT', '8080'))
+REVIEW_SERVICE_MAX_JOBS = int(os.getenv('REVIEW_SERVICE_MAX_JOBS', '2'))
+# Reports are only written under this directory; a job's report_path is taken relative to it
+REVIEW_SERVICE_REPORT_DIR = os.getenv('REVIEW_SERVICE_REPORT_DIR', 'review-reports')
+# Finished jobs are forgotten after this long, or sooner once more than REVIEW_SERVICE_MAX_FINISHED_JOBS are kept
+REVIEW_SERVICE_JOB_TTL_MINUTES = float(os.getenv('REVIEW_SERVICE_JOB_TTL_MINUTES', '60'))
+REVIEW_SERVICE_MAX_FINISHED_JOBS = int(os.getenv('REVIEW_SERVICE_MAX_FINISHED_JOBS', '100'))
+
+# Statuses of jobs that will not change any more
+FINISHED_STATUSES = ("completed", "skipped", "failed")
+
+class ReviewJob:
+    """
+    A request to review the code under ``path``. The report is written to ``report_path``, inside the
+    service's report directory.
+    """
+    def __init__(self, job_id: str, path: Path, report_path: Path, base_ref: str = "") -> None:
+        self.job_id = job_id
+        self.path = path
+        self.report_path = report_path
+        self.base_ref = base_ref
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "path": str(self.path),
+            "report_path": str(self.report_path),
+            "base_ref": self.base_ref,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class ReviewService:
+    """
+    Runs review jobs from a queue on ``max_jobs`` worker threads. All jobs share one AgentsClient,
+    credential and agent pool, so startup costs are paid once per process instead of once per review.
+
+    Each worker runs its jobs as a team named after the worker, which keeps team names unique among
+    concurrent jobs while letting the worker's next job reuse the same pooled agents.
+
+    Reports are written under ``report_dir`` only. Finished jobs are kept for status queries for
+    ``finished_job_ttl_seconds``, and only the ``max_finished_jobs`` most recent ones.
+    """
+    def __init__(
+        self,
+        agents_client: AgentsClient,
+        agent_pool: Optional[AgentPool] = None,
+        max_jobs: int = 2,
+        report_dir: str = "review-reports",
+        max_finished_jobs: int = 100,
+        finished_job_ttl_seconds: float = 3600,
+    ) -> None:
+        if max_jobs < 1:
+            raise ValueError("max_jobs must be at least 1.")
+        self._agents_client = agents_client
+        self._agent_pool = agent_pool
+        self.report_dir = Path(report_dir).resolve()
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        self._max_finished_jobs = max_finished_jobs
+        self._finished_job_ttl_seconds = finished_job_ttl_seconds
+        self._queue: "queue.Queue[Optional[ReviewJob]]" = queue.Queue()
+        self._jobs: Dict[str, ReviewJob] = {}
+        self._jobs_lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._workers = [
+            threading.Thread(target=self._work, args=(index,), name=f"review-worker-{index}", daemon=True)
+            for index in range(1, max_jobs + 1)
+        ]
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self) -> None:
+        """
+        Lets the workers finish their current jobs and stops them. Queued jobs are not run.
+        """
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def _report_path(self, report_path: Optional[str], job_id: str) -> Path:
+        """
+        Resolves a requested report path under the report directory. Absolute paths and paths that
+        leave the directory are rejected.
+        """
+        if not report_path:
+            return self.report_dir / f"code_review_report-{job_id}.md"
+        requested = Path(report_path)
+        if requested.is_absolute() or ".." in requested.parts:
+            raise ValueError(f"report_path '{report_path}' must be a relative path inside the report directory.")
+        resolved = (self.report_dir / requested).resolve()
+        # Symbolic links inside the report directory must not lead out of it either
+        if not resolved.is_relative_to(self.report_dir) or resolved == self.report_dir:
+            raise ValueError(f"report_path '{report_path}' must be a relative path inside the report directory.")
+        return resolved
+
+    def _evict_finished_jobs(self) -> None:
+        # Called with the jobs lock held
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status in FINISHED_STATUSES),
+            key=lambda job: job.finished_at or 0,
+        )
+        expired_before = time.time() - self._finished_job_ttl_seconds
+        excess = len(finished) - self._max_finished_jobs
+        for index, job in enumerate(finished):
+            if index < excess or (job.finished_at or 0) < expired_before:
+                del self._jobs[job.job_id]
+
+    def submit(self, path: str, base_ref: str = "", report_path: Optional[str] = None) -> ReviewJob:
+        input_dir = Path(path).resolve()
+        if not input_dir.is_dir():
+            raise ValueError(f"'{path}' is not a directory.")
+        with self._jobs_lock:
+            job_id = f"job-{next(self._job_ids)}"
+            job = ReviewJob(job_id, input_dir, self._report_path(report_path, job_id), base_ref)
+            job.report_path.parent.mkdir(parents=True, exist_ok=True)
+            self._evict_finished_jobs()
+            self._jobs[job_id] = job
+        self._queue.put(job)
+        print(f"Queued {job_id} for '{input_dir}'")
+        return job
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        with self._jobs_lock:
+            self._evict_finished_jobs()
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[ReviewJob]:
+        with self._jobs_lock:
+            self._evict_finished_jobs()
+            return list(self._jobs.values())
+
+    def health(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"status": "ok"}
+        controller = getattr(self._agents_client, "controller", None)
+        if controller is not None:
+            # Concurrency limit, runs in flight and throttle counts shared by all jobs
+            status["throttle"] = controller.snapshot()
+        return status
+
+    def _work(self, worker_index: int) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                reviewed = run_code_review(
+                    self._agents_client,
+                    input_dir=job.path,
+                    report_path=str(job.report_path),
+                    base_ref=job.base_ref,
+                    team_name=f"code_review_team_{worker_index}",
+                    agent_pool=self._agent_pool,
+                )
+                job.status = "completed" if reviewed else "skipped"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                traceback.print_exc()
+            job.finished_at = time.time()
+            print(f"{job.job_id} {job.status}")
+
+class _ReviewRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs with a JSON body {"path": ..., "base_ref": ..., "report_path": ...} queues a review;
+    GET /jobs and GET /jobs/<id> report job status.
+    """
+    service: ReviewService
+
+    def _send_json(self, status: int, body: Any) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if self.path == "/healthz":
+            self._send_json(200, self.service.health())
+        elif self.path == "/jobs":
+            self._send_json(200, [job.as_dict() for job in self.service.list_jobs()])
+        elif self.path.startswith("/jobs/"):
+            job = self.service.get(self.path[len("/jobs/"):])
+            if job is None:
+                self._send_json(404, {"error": "job not found"})
+            else:
+                self._send_json(200, job.as_dict())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.service.submit(
+                request["path"], base_ref=request.get("base_ref", ""), report_path=request.get("report_path")
+            )
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, job.as_dict())
+
+def main() -> None:
+    if AGENT_TRANSCRIPT_MODE != "replay" and (not PROJECT_ENDPOINT or not MODEL_DEPLOYMENT_NAME):
+        raise EnvironmentError("PROJECT_ENDPOINT and MODEL_DEPLOYMENT_NAME must be set in the environment.")
+
+    configure_tracing()
+    credential = DefaultAzureCredential()
+    agents_client = create_agents_client(credential)
+    # The pool is what lets jobs reuse each other's agents, so the service uses one unless it replays
+    # a transcript, whose agents only exist in this process
+    agent_pool = None
+    if AGENT_TRANSCRIPT_MODE != "replay":
+        agent_pool = AgentPool(AGENT_POOL_PATH, ttl_seconds=AGENT_POOL_TTL_HOURS * 3600)
+
+    with agents_client:
+        service = ReviewService(
+            agents_client,
+            agent_pool=agent_pool,
+            max_jobs=REVIEW_SERVICE_MAX_JOBS,
+            report_dir=REVIEW_SERVICE_REPORT_DIR,
+            max_finished_jobs=REVIEW_SERVICE_MAX_FINISHED_JOBS,
+            finished_job_ttl_seconds=REVIEW_SERVICE_JOB_TTL_MINUTES * 60,
+        )
+        service.start()
+        _ReviewRequestHandler.service = service
+        server = ThreadingHTTPServer((REVIEW_SERVICE_HOST, REVIEW_SERVICE_PORT), _ReviewRequestHandler)
+        print(f"Review service listening on http://{REVIEW_SERVICE_HOST}:{REVIEW_SERVICE_PORT} with {REVIEW_SERVICE_MAX_JOBS} workers")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.stop()
+
+if __name__ == "__main__":
+    main()
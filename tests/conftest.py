@@ -0,0 +1,89 @@
+import os
+import re
+import sys
+
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+# agent_team_code_review reads language_agents.yaml from the working directory when it is imported
+os.chdir(REPO_ROOT)
+
+@pytest.fixture
+def review_module(monkeypatch, tmp_path):
+    """
+    The code review module with its settings at their defaults, a model deployment set and the
+    review cache in a temporary directory. Tests change settings with ``monkeypatch.setattr``.
+    """
+    import agent_team_code_review
+
+    monkeypatch.setattr(agent_team_code_review, "MODEL_DEPLOYMENT_NAME", "test-model")
+    monkeypatch.setattr(agent_team_code_review, "REVIEW_CACHE_ENABLED", True)
+    monkeypatch.setattr(agent_team_code_review, "REVIEW_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(agent_team_code_review, "AGENT_TEAM_STREAMING", False)
+    monkeypatch.setattr(agent_team_code_review, "AGENT_TEAM_MODE", "leader")
+    monkeypatch.setattr(agent_team_code_review, "AGENT_TRANSCRIPT_MODE", "off")
+    monkeypatch.setattr(agent_team_code_review, "REVIEW_CONSOLIDATION", "single")
+    monkeypatch.setattr(agent_team_code_review, "REVIEW_SHARDS", "1")
+    return agent_team_code_review
+
+@pytest.fixture
+def code_dir(tmp_path):
+    """
+    A small tree to review: two Python files with the same name in different directories and a
+    TypeScript file.
+    """
+    root = tmp_path / "code"
+    (root / "api").mkdir(parents=True)
+    (root / "jobs").mkdir()
+    (root / "api" / "handlers.py").write_text("def get(request):\n    return request.args\n")
+    (root / "jobs" / "handlers.py").write_text("def run(job):\n    job.start()\n    return job.id\n")
+    (root / "client.ts").write_text("export function call(url: string) {\n  return fetch(url);\n}\n")
+    return root
+
+def _review_by_file(run) -> str:
+    # A section for every file in the request, in the form the review agents are asked for
+    names = re.findall(r"^File: (\S+)", run.last_user_message, re.MULTILINE)
+    return "\n\n".join(f"### File: {name}\nLine 1 of {name} needs a docstring." for name in names)
+
+@pytest.fixture
+def review_responses():
+    """
+    Scripted responses for a review team on the fake client: the language agents review every file
+    they are sent, the team leader hands the consolidation to the documentation agent once, and the
+    documentation agent reports every message in its thread.
+    """
+    from benchmarks.fake_agents_client import route_once
+
+    return {
+        "TeamLeader": route_once(
+            {
+                "team_name": "code_review_team",
+                "recipient": "documentation-agent",
+                "request": "Write the code review report.",
+                "requestor": "TeamLeader",
+            }
+        ),
+        "python-review-agent": _review_by_file,
+        "typescript-review-agent": _review_by_file,
+        "documentation-agent": lambda run: "# Report\n\n" + "\n\n".join(
+            sorted(message.content[0].text.value for message in run.messages)
+        ),
+    }
+
+@pytest.fixture(scope="session")
+def metric_reader():
+    """
+    An in-memory reader for the metrics the team records. The instruments in ``utils.metrics`` are
+    created on the global meter, so the SDK meter provider is installed once for the whole session and
+    points are cumulative: tests tell their points apart by team name.
+    """
+    from opentelemetry import metrics
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+    reader = InMemoryMetricReader()
+    metrics.set_meter_provider(MeterProvider(metric_readers=[reader]))
+    return reader
@@ -0,0 +1,116 @@
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fake_agents_client import FakeAgentsClient
+from utils.agent_pool import AgentPool
+from utils.agent_team import AgentTeam, RequestResult, _create_task
+
+def _age_entry(path, key: str, seconds: float) -> None:
+    with open(path) as pool_file:
+        state = json.load(pool_file)
+    state["agents"][key]["last_used"] -= seconds
+    with open(path, "w") as pool_file:
+        json.dump(state, pool_file)
+
+def test_agents_unused_for_the_ttl_expire(tmp_path):
+    path = tmp_path / "pool.json"
+    pool = AgentPool(str(path), ttl_seconds=60)
+    pool.release("reviewer", "asst_1", "reviewer")
+    pool.release("writer", "asst_2", "writer")
+
+    assert pool.acquire("reviewer") == "asst_1"
+    assert pool.pop_expired() == []
+
+    _age_entry(path, "reviewer", 120)
+    _age_entry(path, "writer", 120)
+    # A stale agent is retired on lookup, an unused one when the pool is swept
+    assert pool.acquire("reviewer") is None
+    assert pool.pop_expired() == ["asst_1", "asst_2"]
+    assert pool.pop_expired() == []
+    assert (pool.hits, pool.misses) == (1, 1)
+
+def test_replaced_agents_are_retired(tmp_path):
+    pool = AgentPool(str(tmp_path / "pool.json"))
+    pool.release("reviewer", "asst_1", "reviewer")
+    pool.release("reviewer", "asst_1", "reviewer")
+    pool.release("reviewer", "asst_2", "reviewer")
+
+    assert pool.acquire("reviewer") == "asst_2"
+    assert pool.pop_expired() == ["asst_1"]
+
+def _run_pooled_team(client: FakeAgentsClient, pool: AgentPool) -> RequestResult:
+    team = AgentTeam("pool_team", agents_client=client, agent_pool=pool)
+    team.add_agent(model="fake-model", name="documentation-agent", instructions="Write the report.", can_delegate=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        team.assemble_team()
+        try:
+            return team.process_request("Write the report.")
+        finally:
+            team.dismantle_team()
+
+def _pool_client() -> FakeAgentsClient:
+    # A pooled team leader is reused across requests: it routes each request, then answers its completeness check
+    routes = itertools.cycle([True, False])
+
+    def team_leader(run):
+        if not next(routes):
+            return "The request is complete."
+        run.call_function(
+            "_create_task", team_name="pool_team", recipient="documentation-agent", request="Write the report.", requestor="TeamLeader"
+        )
+        return "Tasks created."
+
+    client = FakeAgentsClient({"TeamLeader": team_leader, "documentation-agent": "Report"})
+    client.enable_auto_function_calls({_create_task})
+    return client
+
+def test_agents_are_reused_across_runs(tmp_path):
+    client = _pool_client()
+    pool = AgentPool(str(tmp_path / "pool.json"))
+
+    _run_pooled_team(client, pool)
+    agent_ids = set(client.state.agents)
+    result = _run_pooled_team(client, pool)
+
+    assert client.state.calls["create_agent"] == 2
+    assert set(client.state.agents) == agent_ids
+    assert (pool.hits, pool.misses) == (2, 2)
+    assert result.final_result("documentation-agent") == "Report"
+
+def test_agents_deleted_from_the_service_are_replaced(tmp_path):
+    client = _pool_client()
+    pool = AgentPool(str(tmp_path / "pool.json"))
+    _run_pooled_team(client, pool)
+    documentation_agent_id = next(agent.id for agent in client.state.agents.values() if agent.name == "documentation-agent")
+    client.delete_agent(documentation_agent_id)
+
+    result = _run_pooled_team(client, pool)
+
+    # Only the missing agent is created again, and the pool holds the new one
+    assert client.state.calls["create_agent"] == 3
+    assert (pool.hits, pool.misses) == (1, 3)
+    assert result.final_result("documentation-agent") == "Report"
+    new_agent_id = next(agent.id for agent in client.state.agents.values() if agent.name == "documentation-agent")
+    assert new_agent_id != documentation_agent_id
+    assert documentation_agent_id not in pool.pop_expired()
+    assert new_agent_id in {entry["agent_id"] for entry in json.loads((tmp_path / "pool.json").read_text())["agents"].values()}
+
+def _release_agents(path: str, worker: int) -> None:
+    pool = AgentPool(path)
+    for index in range(20):
+        pool.release(f"agent-{worker}-{index}", f"asst_{worker}_{index}", "reviewer")
+
+def test_processes_sharing_the_pool_file_keep_every_agent(tmp_path):
+    path = str(tmp_path / "pool.json")
+
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("spawn")) as executor:
+        list(executor.map(_release_agents, [path] * 4, range(4)))
+
+    with open(path) as pool_file:
+        agents = json.load(pool_file)["agents"]
+    assert len(agents) == 80
@@ -0,0 +1,297 @@
+import asyncio
+import contextlib
+import io
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from benchmarks.fake_agents_client import AsyncFakeAgentsClient, FakeAgentsClient, Latency, route_once
+from utils.agent_team import (
+    STOP_CONVERGED,
+    STOP_MAX_RUNS,
+    STOP_MAX_TOKENS,
+    STOP_MAX_WALL_TIME,
+    STOP_REPEATED_TASK,
+    AgentTask,
+    AgentTeam,
+    RequestResult,
+    _create_task,
+)
+from utils.async_agent_team import AsyncAgentTeam
+from utils.async_agent_team import _create_task as _create_task_async
+
+TASKS = [("python-agent", "def f(): pass"), ("typescript-agent", "let x = 1;")]
+
+def _responses(seen: Dict[str, List[List[str]]]) -> Dict[str, Any]:
+    # Every response records the messages its run saw, per agent
+    def respond(text):
+        def response(run):
+            seen.setdefault(run.agent.name, []).append([message.content[0].text.value for message in run.messages])
+            return text(run) if callable(text) else text
+        return response
+
+    return {
+        "TeamLeader": respond(
+            route_once(
+                {
+                    "team_name": "join_team",
+                    "recipient": "documentation-agent",
+                    "request": "Write the report.",
+                    "requestor": "TeamLeader",
+                }
+            )
+        ),
+        "python-agent": respond("Python review"),
+        "typescript-agent": respond("TypeScript review"),
+        "documentation-agent": respond("Report"),
+    }
+
+def _add_agents(team: AgentTeam) -> List[AgentTask]:
+    for name, _ in TASKS:
+        team.add_agent(model="fake-model", name=name, instructions="Review code.", can_delegate=False)
+    team.add_agent(model="fake-model", name="documentation-agent", instructions="Write the report.", can_delegate=False, join_before=True)
+    return [AgentTask(recipient=name, task_description=code, requestor="user") for name, code in TASKS]
+
+def _run_team(thread_strategy: str, max_workers: int) -> Dict[str, List[List[str]]]:
+    """
+    Runs two review tasks and a documentation task through a team on the fake client and returns,
+    per agent, the messages each of its runs saw.
+    """
+    seen: Dict[str, List[List[str]]] = {}
+    client = FakeAgentsClient(_responses(seen))
+    client.enable_auto_function_calls({_create_task})
+    team = AgentTeam("join_team", agents_client=client, max_workers=max_workers, thread_strategy=thread_strategy)
+    tasks = _add_agents(team)
+    with contextlib.redirect_stdout(io.StringIO()):
+        team.assemble_team()
+        try:
+            team.process_request("Review the code.", tasks=tasks)
+        finally:
+            team.dismantle_team()
+    return seen
+
+def _run_async_team(thread_strategy: str, max_workers: int) -> Dict[str, List[List[str]]]:
+    seen: Dict[str, List[List[str]]] = {}
+
+    async def run() -> None:
+        client = AsyncFakeAgentsClient(_responses(seen))
+        client.enable_auto_function_calls({_create_task_async})
+        team = AsyncAgentTeam("join_team", agents_client=client, max_workers=max_workers, thread_strategy=thread_strategy)
+        tasks = _add_agents(team)
+        with contextlib.redirect_stdout(io.StringIO()):
+            await team.assemble_team()
+            try:
+                await team.process_request("Review the code.", tasks=tasks)
+            finally:
+                await team.dismantle_team()
+
+    asyncio.run(run())
+    return seen
+
+@pytest.mark.parametrize("run_team", [_run_team, _run_async_team])
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_per_task_threads_only_seed_join_points(run_team, max_workers):
+    seen = run_team("per_task", max_workers)
+
+    # Review tasks see only their own task, whatever the number of workers
+    assert seen["python-agent"] == [["def f(): pass"]]
+    assert seen["typescript-agent"] == [["let x = 1;"]]
+    # The documentation agent is a join point and is seeded with the review results
+    documentation_messages = "\n".join(seen["documentation-agent"][0])
+    assert "Python review" in documentation_messages
+    assert "TypeScript review" in documentation_messages
+    assert "def f(): pass" not in documentation_messages
+
+@pytest.mark.parametrize("run_team", [_run_team, _run_async_team])
+def test_shared_thread_with_one_worker_only_receives_results(run_team):
+    seen = run_team("shared", 1)
+
+    # Reviews run one at a time on threads of their own, and only their results reach the team thread
+    assert seen["typescript-agent"] == [["let x = 1;"]]
+    documentation_messages = "\n".join(seen["documentation-agent"][0])
+    assert "Python review" in documentation_messages
+    assert "TypeScript review" in documentation_messages
+    assert "def f(): pass" not in documentation_messages
+
+def test_concurrent_teams_keep_their_tasks_apart():
+    team_names = ["first_team", "second_team"]
+    # Both team leaders create their task at the same time, and both name the second team
+    barrier = threading.Barrier(len(team_names))
+
+    def run_team(team_name: str):
+        route = route_once(
+            {"team_name": team_names[1], "recipient": "documentation-agent", "request": "Write the report.", "requestor": "TeamLeader"}
+        )
+
+        def team_leader(run):
+            if run.call_number == 1:
+                barrier.wait(timeout=5)
+            return route(run)
+
+        client = FakeAgentsClient({"TeamLeader": team_leader, "documentation-agent": f"Report of {team_name}"})
+        client.enable_auto_function_calls({_create_task})
+        team = AgentTeam(team_name, agents_client=client)
+        team.add_agent(model="fake-model", name="documentation-agent", instructions="Write the report.", can_delegate=False)
+        team.assemble_team()
+        try:
+            return team.process_request("Write the report.")
+        finally:
+            team.dismantle_team()
+
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=len(team_names)) as executor:
+        futures = [executor.submit(run_team, team_name) for team_name in team_names]
+        results = [future.result() for future in futures]
+
+    for team_name, result in zip(team_names, results):
+        # The task the team leader created went to its own team, not the one the model named
+        assert [task.recipient for task in result.tasks] == ["TeamLeader", "documentation-agent", "TeamLeader"]
+        assert result.final_result("documentation-agent") == f"Report of {team_name}"
+        assert result.tasks_for("documentation-agent")[0].parent is result.tasks[0]
+
+def _delegate(request):
+    # A team leader that hands the documentation agent a task on every run, including completeness checks
+    def team_leader(run):
+        run.call_function(
+            "_create_task",
+            team_name="budget_team",
+            recipient="documentation-agent",
+            request=request(run),
+            requestor="TeamLeader",
+        )
+        return "Tasks created."
+    return team_leader
+
+def _run_budgeted_team(team_leader, run_latency: float = 0.0, **budgets) -> RequestResult:
+    client = FakeAgentsClient(
+        {"TeamLeader": team_leader, "documentation-agent": "Report"}, latency={"run": Latency.fixed(run_latency)}
+    )
+    client.enable_auto_function_calls({_create_task})
+    team = AgentTeam("budget_team", agents_client=client, **budgets)
+    team.add_agent(model="fake-model", name="documentation-agent", instructions="Write the report.", can_delegate=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        team.assemble_team()
+        try:
+            return team.process_request("Write the report.")
+        finally:
+            team.dismantle_team()
+
+def test_request_stops_after_max_runs():
+    result = _run_budgeted_team(_delegate(lambda run: f"Write part {run.call_number}."), max_runs=5)
+
+    assert result.stop_reason == STOP_MAX_RUNS
+    assert len(result.tasks) == 5
+
+def test_request_stops_after_max_tokens():
+    result = _run_budgeted_team(_delegate(lambda run: f"Write part {run.call_number}."), max_tokens=300)
+
+    assert result.stop_reason == STOP_MAX_TOKENS
+    # The run that crossed the budget completes, nothing starts after it
+    assert result.tokens >= 300
+    assert result.tokens - result.tasks[-1].tokens < 300
+
+def test_request_stops_after_max_wall_seconds():
+    result = _run_budgeted_team(_delegate(lambda run: f"Write part {run.call_number}."), run_latency=0.02, max_wall_seconds=0.1)
+
+    assert result.stop_reason == STOP_MAX_WALL_TIME
+    assert 0.1 <= result.duration < 1.0
+
+def test_request_stops_when_the_team_leader_repeats_a_task():
+    result = _run_budgeted_team(_delegate(lambda run: "Write the report."), max_runs=20)
+
+    assert result.stop_reason == STOP_REPEATED_TASK
+    # The repeated task asked for in the completeness check is dropped
+    assert [task.recipient for task in result.tasks] == ["TeamLeader", "documentation-agent", "TeamLeader"]
+
+def test_request_converges_when_the_team_leader_creates_no_task():
+    team_leader = route_once({"team_name": "budget_team", "recipient": "documentation-agent", "request": "Write the report.", "requestor": "TeamLeader"})
+
+    result = _run_budgeted_team(team_leader, max_runs=20)
+
+    assert result.stop_reason == STOP_CONVERGED
+    assert result.final_result("documentation-agent") == "Report"
+
+def _run_streaming_team(run_async: bool) -> Tuple[RequestResult, Dict[AgentTask, List[str]]]:
+    """
+    Runs the review and documentation tasks with streaming on and returns the result and, per task,
+    the text deltas passed to the output callback.
+    """
+    deltas: Dict[AgentTask, List[str]] = {}
+    lock = threading.Lock()
+
+    def collect(task: AgentTask, text: str) -> None:
+        with lock:
+            deltas.setdefault(task, []).append(text)
+
+    responses = _responses({})
+    responses["python-agent"] = "Python review: line 1 of the function needs a docstring."
+    if run_async:
+        async def run() -> RequestResult:
+            client = AsyncFakeAgentsClient(responses)
+            client.enable_auto_function_calls({_create_task_async})
+            team = AsyncAgentTeam("join_team", agents_client=client, max_workers=2, streaming=True, output_callback=collect)
+            tasks = _add_agents(team)
+            await team.assemble_team()
+            try:
+                return await team.process_request("Review the code.", tasks=tasks)
+            finally:
+                await team.dismantle_team()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(run()), deltas
+    client = FakeAgentsClient(responses)
+    client.enable_auto_function_calls({_create_task})
+    team = AgentTeam("join_team", agents_client=client, max_workers=2, streaming=True, output_callback=collect)
+    tasks = _add_agents(team)
+    with contextlib.redirect_stdout(io.StringIO()):
+        team.assemble_team()
+        try:
+            return team.process_request("Review the code.", tasks=tasks), deltas
+        finally:
+            team.dismantle_team()
+
+@pytest.mark.parametrize("run_async", [False, True], ids=["sync", "async"])
+def test_streamed_runs_forward_deltas_and_keep_the_final_text(run_async):
+    result, deltas = _run_streaming_team(run_async)
+
+    python_task = result.tasks_for("python-agent")[0]
+    assert python_task.result == "Python review: line 1 of the function needs a docstring."
+    # The long result arrives in several deltas that add up to it
+    assert len(deltas[python_task]) > 1
+    assert "".join(deltas[python_task]) == python_task.result
+    for task in result.tasks:
+        assert "".join(deltas[task]) == task.result
+    assert result.final_result("documentation-agent") == "Report"
+    assert all(task.run_id is not None for task in result.tasks)
+
+def test_request_result_reports_tasks_results_and_usage():
+    client = FakeAgentsClient(_responses({}))
+    client.enable_auto_function_calls({_create_task})
+    team = AgentTeam("join_team", agents_client=client, max_workers=1)
+    tasks = _add_agents(team)
+    with contextlib.redirect_stdout(io.StringIO()):
+        team.assemble_team()
+        try:
+            result = team.process_request("Review the code.", tasks=tasks)
+        finally:
+            team.dismantle_team()
+
+    assert result.request == "Review the code."
+    assert result.stop_reason == STOP_CONVERGED
+    # Tasks are listed in the order they completed, each with its run and usage
+    assert [task.recipient for task in result.tasks] == [
+        "python-agent", "typescript-agent", "TeamLeader", "documentation-agent", "TeamLeader"
+    ]
+    assert [task.completion_index for task in result.tasks] == list(range(5))
+    assert [task.result for task in result.tasks_for("python-agent")] == ["Python review"]
+    assert result.final_result("documentation-agent") == "Report"
+    assert result.final_result("TeamLeader") == "The request is complete."
+    assert result.final_result("unknown-agent") is None
+    for task in result.tasks:
+        assert task.run_id is not None and task.thread_id is not None
+        assert task.tokens is not None and task.tokens > 0
+        assert task.duration is not None and 0 <= task.duration <= result.duration
+    assert result.tokens == sum(task.tokens for task in result.tasks) == client.state.prompt_tokens + client.state.completion_tokens
@@ -0,0 +1,67 @@
+from utils.chunking import estimate_tokens, pack_chunks, split_code
+
+def _python_module(functions: int, body_lines: int) -> str:
+    return "".join(
+        f"def function_{index}(value):\n" + "".join(f"    value = value + {line}\n" for line in range(body_lines)) + "\n"
+        for index in range(functions)
+    )
+
+def test_small_file_is_one_chunk():
+    code = "def f():\n    return 1\n"
+
+    chunks = split_code("f.py", "python", code, "python", max_tokens=100)
+
+    assert len(chunks) == 1
+    assert (chunks[0].start_line, chunks[0].end_line, chunks[0].parts) == (1, 2, 1)
+    assert chunks[0].content == code
+
+def test_python_file_is_split_on_function_boundaries():
+    code = _python_module(functions=6, body_lines=8)
+    lines = code.splitlines(keepends=True)
+
+    chunks = split_code("module.py", "python", code, "python", max_tokens=150)
+
+    assert len(chunks) > 1
+    assert [chunk.part for chunk in chunks] == list(range(1, len(chunks) + 1))
+    assert all(chunk.parts == len(chunks) for chunk in chunks)
+    # Chunks cover the file in order without gaps, each starts at a function and fits the budget
+    assert "".join(chunk.content for chunk in chunks) == code
+    assert chunks[0].start_line == 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start_line == previous.end_line + 1
+    for chunk in chunks:
+        assert lines[chunk.start_line - 1].startswith("def ")
+        assert chunk.tokens <= 150
+
+def test_oversized_function_is_split_by_lines():
+    code = _python_module(functions=1, body_lines=200)
+
+    chunks = split_code("big.py", "python", code, "python", max_tokens=200)
+
+    assert len(chunks) > 1
+    assert "".join(chunk.content for chunk in chunks) == code
+    assert all(chunk.tokens <= 200 for chunk in chunks)
+
+def test_typescript_is_split_on_declarations():
+    code = "".join(
+        f"export function handler{index}(input: string) {{\n" + "  console.log(input);\n" * 10 + "}\n"
+        for index in range(4)
+    )
+
+    chunks = split_code("handlers.ts", "typescript", code, "typescript", max_tokens=estimate_tokens(code) // 2)
+
+    assert len(chunks) > 1
+    assert all(chunk.content.startswith("export function") for chunk in chunks)
+
+def test_pack_chunks_fills_the_first_batch_with_room():
+    chunks = (
+        split_code("a.py", "python", "a = 1\n" * 40, "python", max_tokens=1000)
+        + split_code("b.py", "python", "b = 2\n" * 10, "python", max_tokens=1000)
+        + split_code("c.py", "python", "c = 3\n" * 20, "python", max_tokens=1000)
+    )
+    tokens = [chunk.tokens for chunk in chunks]
+
+    batches = pack_chunks(chunks, max_tokens=tokens[0] + tokens[1])
+
+    assert [batch.file_names for batch in batches] == [["a.py", "b.py"], ["c.py"]]
+    assert [batch.tokens for batch in batches] == [tokens[0] + tokens[1], tokens[2]]
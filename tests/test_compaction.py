@@ -0,0 +1,60 @@
+from utils.compaction import compact_code, remap_line_references
+
+def test_compact_code_maps_lines_to_the_original():
+    code = "# Copyright (c) Example Corp.\n# Licensed under the MIT License.\n\nimport os\n\n\n\ndef f():   \n    return os.sep\n"
+
+    compacted, line_map = compact_code(code, "python")
+
+    assert compacted == "import os\n\ndef f():\n    return os.sep"
+    assert line_map == [4, 5, 8, 9]
+
+def test_single_file_review_is_remapped_as_a_whole():
+    review = "Line 3 shadows a builtin, see also lines 1-2 and L4."
+
+    remapped = remap_line_references(review, {"a.py": [10, 11, 14, 20]}, ["a.py"])
+
+    assert remapped == "Line 14 shadows a builtin, see also lines 10-11 and L20."
+
+def test_only_the_compacted_files_section_is_remapped():
+    review = (
+        "Both files need tests, line 1.\n\n"
+        "### File: api/handlers.py\nLine 2 returns raw arguments.\n\n"
+        "### File: jobs/handlers.py\nLine 2 ignores failures.\n"
+    )
+
+    remapped = remap_line_references(review, {"api/handlers.py": [5, 9]}, ["api/handlers.py", "jobs/handlers.py"])
+
+    assert remapped == (
+        "Both files need tests, line 1.\n\n"
+        "### File: api/handlers.py\nLine 9 returns raw arguments.\n\n"
+        "### File: jobs/handlers.py\nLine 2 ignores failures.\n"
+    )
+
+def test_line_numbers_outside_the_map_are_kept():
+    review = "### File: a.py\nLine 7 is past the end.\n### File: a.py (also b.py)\nline 1."
+
+    remapped = remap_line_references(review, {"a.py": [3]}, ["a.py", "b.py"])
+
+    assert remapped == "### File: a.py\nLine 7 is past the end.\n### File: a.py (also b.py)\nline 3."
+
+def test_shared_team_thread_gets_remapped_line_numbers(review_module, monkeypatch, code_dir, review_responses, tmp_path):
+    from benchmarks.fake_agents_client import FakeAgentsClient
+    from utils.agent_team import _create_task
+
+    monkeypatch.setattr(review_module, "REVIEW_COMPACTION_ENABLED", True)
+    monkeypatch.setattr(review_module, "AGENT_TEAM_MAX_WORKERS", 1)
+    monkeypatch.setattr(review_module, "AGENT_TEAM_THREAD_STRATEGY", "shared")
+    # The licence header is dropped, so line 1 of the compacted file is line 4 of the original
+    (code_dir / "api" / "handlers.py").write_text(
+        "# Copyright (c) Example Corp.\n# Licensed under the MIT License.\n\ndef get(request):\n    return request.args\n"
+    )
+    agents_client = FakeAgentsClient(review_responses)
+    agents_client.enable_auto_function_calls({_create_task})
+
+    review_module.run_code_review(agents_client, input_dir=code_dir, report_path=str(tmp_path / "report.md"))
+
+    # The documentation agent reads the team thread, so its report shows what the thread holds
+    report = (tmp_path / "report.md").read_text()
+    documentation_report = report[report.index("# Report"):]
+    assert "Line 4 of api/handlers.py" in documentation_report
+    assert "Line 1 of api/handlers.py" not in documentation_report
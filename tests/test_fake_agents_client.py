@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from benchmarks.bench_agent_team import build_scenarios, compare_to_baseline, run_scenario
+from benchmarks.fake_agents_client import FakeAgentsClient, Latency, route_once
+
+def _record_call(calls):
+    def _create_task(**arguments):
+        calls.append(arguments)
+        return "True"
+    return _create_task
+
+def test_runs_answer_with_scripted_responses_and_report_usage():
+    calls = []
+    client = FakeAgentsClient(
+        {"reviewer": "Looks fine.", "leader": route_once({"recipient": "reviewer"}, text="Routed.", then="Done.")},
+        latency={"run": Latency.fixed(0)},
+    )
+    client.enable_auto_function_calls({_record_call(calls)})
+    reviewer = client.create_agent(model="fake-model", name="reviewer")
+    leader = client.create_agent(model="fake-model", name="leader")
+    thread = client.threads.create()
+    client.messages.create(thread_id=thread.id, role="user", content="x" * 40)
+
+    run = client.runs.create_and_process(thread_id=thread.id, agent_id=reviewer.id)
+    first = client.runs.create_and_process(thread_id=thread.id, agent_id=leader.id)
+    second = client.runs.create_and_process(thread_id=thread.id, agent_id=leader.id)
+
+    assert run.status == "completed"
+    # Usage is a quarter token per character of the thread and of the reply
+    assert (run.usage.prompt_tokens, run.usage.completion_tokens) == (10, 2)
+    assert client.messages.get_last_message_text_by_role(thread_id=thread.id, role="assistant").text.value == "Done."
+    assert calls == [{"recipient": "reviewer"}]
+    assert [thread_run.id for thread_run in client.runs.list(thread_id=thread.id)] == [second.id, first.id, run.id]
+    assert client.state.calls["run"] == 3
+
+def test_functions_must_be_enabled():
+    client = FakeAgentsClient({"leader": route_once({"recipient": "reviewer"})})
+    leader = client.create_agent(model="fake-model", name="leader")
+    thread = client.threads.create()
+
+    with pytest.raises(ValueError):
+        client.runs.create_and_process(thread_id=thread.id, agent_id=leader.id)
+    # A failed run does not leave the thread locked
+    client.messages.create(thread_id=thread.id, role="user", content="again")
+
+@pytest.mark.parametrize("name", ["languages=2", "pipeline", "async"])
+def test_benchmark_scenarios_complete(name):
+    scenario = next(scenario for scenario in build_scenarios("zero", 0.0, seed=0) if scenario["name"] == name)
+
+    result = run_scenario(scenario)
+
+    assert result["completed_tasks"] >= result["review_tasks"] > 0
+    assert result["runs"] == result["completed_tasks"]
+    assert result["prompt_tokens"] > 0
+
+def test_compare_to_baseline_flags_slowdowns(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": [{"name": "fast", "total_s": 1.0}, {"name": "noisy", "total_s": 0.01}]}))
+    results = [{"name": "fast", "total_s": 1.5}, {"name": "noisy", "total_s": 0.02}, {"name": "new", "total_s": 9.0}]
+
+    regressions = compare_to_baseline(results, str(baseline), tolerance=0.25, min_seconds=0.02)
+
+    assert len(regressions) == 1 and regressions[0].startswith("fast:")
@@ -0,0 +1,19 @@
+from utils.file_discovery import discover_files
+
+def _detect_language(path):
+    return "python" if path.suffix == ".py" else "unknown"
+
+def test_discovery_skips_vendored_directories_but_not_build_names(tmp_path):
+    for directory in ("node_modules/left_pad", ".venv/lib", "build", "packages/core", "src"):
+        (tmp_path / directory).mkdir(parents=True)
+        (tmp_path / directory / "module.py").write_text("VALUE = 1\n")
+    (tmp_path / ".gitignore").write_text("packages/\n")
+
+    result = discover_files(tmp_path, _detect_language)
+
+    found = sorted(discovered.path.relative_to(tmp_path).as_posix() for discovered in result.files)
+    assert found == ["build/module.py", "src/module.py"]
+    by_reason = result.skipped_by_reason()
+    assert sorted(skipped.path.name for skipped in by_reason["vendored"]) == [".venv", "node_modules"]
+    assert [skipped.detail for skipped in by_reason["ignored"]] == ["packages/"]
+    assert result.skip_counts() == {"vendored": 2, "ignored": 1, "unsupported": 1}
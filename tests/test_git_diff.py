@@ -0,0 +1,63 @@
+import subprocess
+
+from utils.git_diff import get_changed_files
+
+def _git(repository, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=repository, check=True, capture_output=True,
+    )
+
+def test_changed_files_come_with_their_hunks(tmp_path):
+    (tmp_path / "sub dir").mkdir()
+    for name in ("sub dir/app.py", "tab\tname.py", "removed.py", "script.py"):
+        (tmp_path / name).write_text("".join(f"line {number}\n" for number in range(1, 31)))
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "base")
+
+    (tmp_path / "sub dir/app.py").write_text((tmp_path / "sub dir/app.py").read_text().replace("line 15\n", "line fifteen\n"))
+    (tmp_path / "tab\tname.py").write_text("line 1\n")
+    (tmp_path / "removed.py").unlink()
+    (tmp_path / "script.py").chmod(0o755)
+    (tmp_path / "added.py").write_text("print('new')\n")
+
+    changes = get_changed_files("HEAD", tmp_path, context_lines=2)
+
+    assert sorted(path.relative_to(tmp_path.resolve()).as_posix() for path in changes) == [
+        "added.py", "sub dir/app.py", "tab\tname.py",
+    ]
+    app = changes[(tmp_path / "sub dir/app.py").resolve()]
+    assert app.status == "M"
+    assert app.diff.startswith("@@ -13,5 +13,5 @@")
+    assert "-line 15\n+line fifteen\n" in app.diff
+    assert "line 10\n" not in app.diff
+    assert changes[(tmp_path / "added.py").resolve()].diff is None
+
+def test_incremental_review_only_sends_changed_hunks(review_module, code_dir, review_responses, tmp_path):
+    from benchmarks.fake_agents_client import FakeAgentsClient
+    from utils.agent_team import _create_task
+
+    _git(code_dir, "init", "-q")
+    _git(code_dir, "add", ".")
+    _git(code_dir, "commit", "-q", "-m", "base")
+    (code_dir / "jobs" / "handlers.py").write_text("def run(job):\n    job.start()\n    return job.result\n")
+    requests = []
+
+    def review_python(run):
+        requests.append(run.last_user_message)
+        return review_responses["python-review-agent"](run)
+
+    agents_client = FakeAgentsClient({**review_responses, "python-review-agent": review_python})
+    agents_client.enable_auto_function_calls({_create_task})
+    assert review_module.run_code_review(agents_client, input_dir=code_dir, report_path=str(tmp_path / "report.md"), base_ref="HEAD")
+
+    assert len(requests) == 1
+    assert "jobs/handlers.py" in requests[0]
+    assert "api/handlers.py" not in requests[0]
+    assert "+    return job.result" in requests[0]
+    assert "client.ts" not in (tmp_path / "report.md").read_text()
+
+    # Nothing changed since the new commit, so there is nothing to review
+    _git(code_dir, "commit", "-q", "-am", "change")
+    assert not review_module.run_code_review(agents_client, input_dir=code_dir, report_path=str(tmp_path / "empty.md"), base_ref="HEAD")
@@ -0,0 +1,56 @@
+import contextlib
+import io
+
+from typing import Any, Dict, List
+
+from benchmarks.fake_agents_client import FakeAgentsClient, Latency, route_once
+from utils.agent_team import AgentTeam, _create_task
+
+def _points(reader, name: str, team_name: str) -> Dict[str, Any]:
+    """
+    The data points of metric ``name`` recorded for ``team_name``, by agent.
+    """
+    points: Dict[str, Any] = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                if metric.name != name:
+                    continue
+                for point in metric.data.data_points:
+                    if point.attributes.get("agent_team.name") == team_name:
+                        points[point.attributes.get("agent_team.agent")] = point
+    return points
+
+def test_request_records_runs_tokens_and_latency(metric_reader):
+    client = FakeAgentsClient(
+        {
+            "TeamLeader": route_once(
+                {"team_name": "metrics_team", "recipient": "documentation-agent", "request": "Write the report.", "requestor": "TeamLeader"}
+            ),
+            "documentation-agent": "Report",
+        },
+        latency={"run": Latency.fixed(0.01)},
+    )
+    client.enable_auto_function_calls({_create_task})
+    team = AgentTeam("metrics_team", agents_client=client)
+    team.add_agent(model="fake-model", name="documentation-agent", instructions="Write the report.", can_delegate=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        team.assemble_team()
+        try:
+            result = team.process_request("Write the report.")
+        finally:
+            team.dismantle_team()
+
+    durations = _points(metric_reader, "agent_team.run.duration", "metrics_team")
+    prompt_tokens = _points(metric_reader, "agent_team.run.prompt_tokens", "metrics_team")
+    completion_tokens = _points(metric_reader, "agent_team.run.completion_tokens", "metrics_team")
+    tasks_created = _points(metric_reader, "agent_team.tasks.created", "metrics_team")
+
+    # One duration per run, labeled by agent, each at least the simulated latency
+    assert {agent: point.count for agent, point in durations.items()} == {"TeamLeader": 2, "documentation-agent": 1}
+    assert all(point.min >= 0.01 for point in durations.values())
+    assert {agent: point.count for agent, point in prompt_tokens.items()} == {"TeamLeader": 2, "documentation-agent": 1}
+    recorded_tokens: List[float] = [point.sum for point in list(prompt_tokens.values()) + list(completion_tokens.values())]
+    assert sum(recorded_tokens) == result.tokens > 0
+    assert tasks_created["documentation-agent"].value == 1
+    assert sum(point.count for point in _points(metric_reader, "agent_team.task.queue_wait", "metrics_team").values()) == 3
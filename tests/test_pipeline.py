@@ -0,0 +1,52 @@
+import pytest
+
+from utils.pipeline import Pipeline, PipelineStage
+
+def _wave_names(pipeline: Pipeline):
+    return [[stage.name for stage in wave] for wave in pipeline.waves]
+
+def test_stages_are_grouped_into_waves_by_dependency():
+    pipeline = Pipeline(
+        [
+            PipelineStage(name="document", recipient="documentation-agent", depends_on=["security", "style"]),
+            PipelineStage(name="review"),
+            PipelineStage(name="security", recipient="security-agent", depends_on=["review"]),
+            PipelineStage(name="style", recipient="style-agent", depends_on=["review"]),
+            PipelineStage(name="summary", recipient="summary-agent"),
+        ]
+    )
+
+    # Stages with no dependencies left run together, in the order they were declared
+    assert _wave_names(pipeline) == [["review", "summary"], ["security", "style"], ["document"]]
+
+def test_review_pipeline_config_loads():
+    pipeline = Pipeline.load("review_pipeline.yaml")
+
+    assert _wave_names(pipeline) == [["review"], ["document"]]
+    assert pipeline.waves[1][0].recipient == "documentation-agent"
+    assert "{upstream_results}" in pipeline.waves[1][0].request
+
+def test_cyclic_config_is_rejected(tmp_path):
+    config = tmp_path / "pipeline.yaml"
+    config.write_text(
+        "stages:\n"
+        "  - name: review\n"
+        "  - name: fix\n    recipient: fix-agent\n    depends_on: [review, check]\n"
+        "  - name: check\n    recipient: check-agent\n    depends_on: [fix]\n"
+    )
+
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline.load(str(config))
+
+@pytest.mark.parametrize(
+    "stages",
+    [
+        [PipelineStage(name="review"), PipelineStage(name="review", recipient="documentation-agent")],
+        [PipelineStage(name="review"), PipelineStage(name="tests")],
+        [PipelineStage(name="document", recipient="documentation-agent", depends_on=["review"])],
+    ],
+    ids=["duplicate-name", "two-task-stages", "unknown-dependency"],
+)
+def test_invalid_stages_are_rejected(stages):
+    with pytest.raises(ValueError):
+        Pipeline(stages)
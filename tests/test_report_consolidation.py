@@ -0,0 +1,98 @@
+import contextlib
+import io
+
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.fake_agents_client import FakeAgentsClient
+from utils.agent_team import AgentTeam
+from utils.report_consolidation import (
+    FILE_SUMMARY_INSTRUCTIONS,
+    LANGUAGE_SUMMARY_INSTRUCTIONS,
+    LEVEL_FILE,
+    LEVEL_LANGUAGE,
+    LEVEL_REPORT,
+    ReportConsolidator,
+)
+from utils.review_cache import ReviewCache
+
+LEVELS = (LEVEL_FILE, LEVEL_LANGUAGE, LEVEL_REPORT)
+
+def _consolidate(
+    file_reviews: Dict[str, Dict[str, str]], requests: List[str], **options
+) -> Tuple[ReportConsolidator, Optional[str]]:
+    """
+    Consolidates ``file_reviews`` with a documentation agent on the fake client, collecting the
+    requests it is sent in ``requests``.
+    """
+    def summarize(run) -> str:
+        requests.append(run.last_user_message)
+        # Keeps the headings and the last finding, so a changed review changes the summaries above it
+        lines = run.last_user_message.splitlines()
+        return "Summary of " + ", ".join(line for line in lines if line.startswith("##")) + f" ({lines[-1]})"
+
+    agents_client = FakeAgentsClient({"documentation-agent": summarize})
+    team = AgentTeam("consolidation_team", agents_client=agents_client, max_workers=4)
+    team.add_agent(model="fake-model", name="documentation-agent", instructions="Write the report.", can_delegate=False)
+    consolidator = ReportConsolidator(team, "documentation-agent", "fake-model", **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        team.assemble_team()
+        try:
+            report = consolidator.consolidate(file_reviews)
+        finally:
+            team.dismantle_team()
+    return consolidator, report
+
+def _review(file_name: str, finding: str) -> str:
+    return f"### File: {file_name}\n" + f"Line 1: {finding}.\n" * 5
+
+def _per_level(counts: Dict[str, int]) -> List[int]:
+    return [counts.get(level, 0) for level in LEVELS]
+
+def test_map_reduce_reruns_only_what_changed(tmp_path):
+    cache = ReviewCache(str(tmp_path))
+    file_reviews = {
+        "python": {
+            "api/handlers.py": _review("api/handlers.py", "validate input"),
+            "jobs/handlers.py": _review("jobs/handlers.py", "handle errors"),
+        },
+        "typescript": {"client.ts": _review("client.ts", "check the status"), "short.ts": "Fine."},
+    }
+    requests: List[str] = []
+
+    first, first_report = _consolidate(file_reviews, requests, cache=cache, passthrough_chars=50)
+
+    # Three long reviews are summarized and the short one is passed through, then one summary per
+    # language and the report
+    assert _per_level(first.summaries_run) == [3, 2, 1]
+    file_requests = [request for request in requests if request.startswith(FILE_SUMMARY_INSTRUCTIONS.split("`")[0])]
+    assert len(file_requests) == 3
+    assert not any("short.ts" in request for request in file_requests)
+    report_request = requests[-1]
+    assert "## Python" in report_request and "## Typescript" in report_request
+    assert first_report is not None and first_report.startswith("Summary of ## Python, ## Typescript")
+
+    requests.clear()
+    second, second_report = _consolidate(file_reviews, requests, cache=cache, passthrough_chars=50)
+    assert requests == []
+    assert _per_level(second.summaries_cached) == [3, 2, 1]
+    assert second_report == first_report
+
+    file_reviews["python"]["jobs/handlers.py"] = _review("jobs/handlers.py", "retry failed jobs")
+    third, _ = _consolidate(file_reviews, requests, cache=cache, passthrough_chars=50)
+    # Only the changed file, its language and the report are summarized again
+    assert _per_level(third.summaries_run) == [1, 1, 1]
+    assert _per_level(third.summaries_cached) == [2, 1, 0]
+    assert "retry failed jobs" in requests[0]
+
+def test_language_over_budget_is_combined_in_parts():
+    file_reviews = {"python": {f"module_{index}.py": _review(f"module_{index}.py", "x" * 400) for index in range(4)}}
+    requests: List[str] = []
+
+    # The file reviews are passed through, so the language level gets four large inputs
+    consolidator, report = _consolidate(file_reviews, requests, max_input_tokens=1200, passthrough_chars=100000)
+
+    language_requests = [request for request in requests if request.startswith(LANGUAGE_SUMMARY_INSTRUCTIONS.format(language="python"))]
+    assert consolidator.summaries_run[LEVEL_FILE] == 0
+    assert consolidator.summaries_run[LEVEL_LANGUAGE] == len(language_requests) > 1
+    assert f"## Python (part 1 of {len(language_requests)})" in requests[-1]
+    assert report is not None
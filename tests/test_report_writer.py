@@ -0,0 +1,56 @@
+from benchmarks.fake_agents_client import FakeAgentsClient
+from utils.agent_team import AgentTask, _create_task
+from utils.report_writer import IncrementalReportWriter, StreamPrinter
+
+def test_sections_are_written_as_they_are_added(tmp_path):
+    path = tmp_path / "report.md"
+    writer = IncrementalReportWriter(str(path))
+
+    writer.add_section("Python review", "Line 1 needs a docstring.\n")
+    assert path.read_text() == "# Code Review (in progress)\n\n## Python review\n\nLine 1 needs a docstring.\n\n"
+
+    writer.add_section("Typescript review", "Looks fine.")
+    writer.add_section("Python review", "Line 3 ignores errors.")
+    # Later reviews under a heading are added to it, and headings keep the order they first appeared in
+    assert path.read_text() == (
+        "# Code Review (in progress)\n\n"
+        "## Python review\n\nLine 1 needs a docstring.\n\nLine 3 ignores errors.\n\n"
+        "## Typescript review\n\nLooks fine.\n\n"
+    )
+
+    writer.write_final("# Report")
+    assert path.read_text() == "# Report"
+    assert sorted(child.name for child in tmp_path.iterdir()) == ["report.md"]
+
+def test_streamed_text_is_printed_in_whole_lines(capsys):
+    printer = StreamPrinter()
+    python_task = AgentTask(recipient="python-review-agent", task_description="", requestor="user")
+    typescript_task = AgentTask(recipient="typescript-review-agent", task_description="", requestor="user")
+
+    printer.write(python_task, "### File: a.py\nLine 1 ")
+    printer.write(typescript_task, "Looks ")
+    printer.write(python_task, "needs a docstring.\nLine 2")
+    printer.flush(typescript_task)
+    printer.flush(python_task)
+    printer.flush(python_task)
+
+    assert capsys.readouterr().out.splitlines() == [
+        "[python-review-agent] ### File: a.py",
+        "[python-review-agent] Line 1 needs a docstring.",
+        "[typescript-review-agent] Looks ",
+        "[python-review-agent] Line 2",
+    ]
+
+def test_streamed_review_output_is_printed(review_module, monkeypatch, code_dir, review_responses, tmp_path, capsys):
+    monkeypatch.setattr(review_module, "AGENT_TEAM_STREAMING", True)
+    agents_client = FakeAgentsClient(review_responses)
+    agents_client.enable_auto_function_calls({_create_task})
+
+    review_module.run_code_review(agents_client, input_dir=code_dir, report_path=str(tmp_path / "report.md"))
+
+    output = capsys.readouterr().out.splitlines()
+    assert output.count("[typescript-review-agent] ### File: client.ts") == 1
+    assert "[typescript-review-agent] Line 1 of client.ts needs a docstring." in output
+    assert "[python-review-agent] Line 1 of api/handlers.py needs a docstring." in output
+    assert "[documentation-agent] # Report" in output
+    assert (tmp_path / "report.md").read_text().startswith("# Report")
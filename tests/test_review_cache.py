@@ -0,0 +1,120 @@
+import os
+import re
+import time
+
+from benchmarks.fake_agents_client import FakeAgentsClient
+from utils.agent_team import _create_task
+from utils.review_cache import ReviewCache, split_review_by_file
+
+def test_cache_hits_and_misses(tmp_path):
+    cache = ReviewCache(str(tmp_path))
+    key = ReviewCache.make_key("def f(): pass", "Review Python.", "model-a")
+
+    assert cache.get(key) is None
+    assert not cache.contains(key)
+    cache.put(key, "Looks fine.", file_name="f.py")
+    assert cache.contains(key)
+    assert cache.get(key) == "Looks fine."
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Content, instructions, model and review settings are all part of the key
+    assert ReviewCache.make_key("def f(): return 1", "Review Python.", "model-a") != key
+    assert ReviewCache.make_key("def f(): pass", "Review code.", "model-a") != key
+    assert ReviewCache.make_key("def f(): pass", "Review Python.", "model-b") != key
+    assert ReviewCache.make_key("def f(): pass", "Review Python.", "model-a", settings="compaction=True") != key
+
+def test_expired_entries_miss_and_are_evicted(tmp_path):
+    cache = ReviewCache(str(tmp_path), max_age_seconds=60)
+    key = ReviewCache.make_key("code", "instructions", "model")
+    cache.put(key, "review")
+    past = time.time() - 120
+    os.utime(os.path.join(str(tmp_path), f"{key}.json"), (past, past))
+
+    assert not cache.contains(key)
+    assert cache.get(key) is None
+    assert cache.evict() == 1
+    assert os.listdir(str(tmp_path)) == []
+
+def test_split_review_tells_files_with_the_same_name_apart():
+    review = (
+        "Overall the handlers look fine.\n\n"
+        "### File: api/handlers.py\nLine 2 returns raw arguments.\n\n"
+        "### File: `jobs/handlers.py`\nLine 3 ignores failures.\n\n"
+        "### File: other.py\nNot part of this batch.\n"
+    )
+
+    sections = split_review_by_file(review, ["api/handlers.py", "jobs/handlers.py"])
+
+    assert sections == {
+        "api/handlers.py": "### File: api/handlers.py\nLine 2 returns raw arguments.",
+        "jobs/handlers.py": "### File: `jobs/handlers.py`\nLine 3 ignores failures.",
+    }
+    # A review of one file is that file's review, headings or not
+    assert split_review_by_file("Looks fine.\n", ["api/handlers.py"]) == {"api/handlers.py": "Looks fine."}
+
+def _run_review(review_module, code_dir, responses, report_path):
+    agents_client = FakeAgentsClient(responses)
+    agents_client.enable_auto_function_calls({_create_task})
+    review_module.run_code_review(agents_client, input_dir=code_dir, report_path=str(report_path))
+
+def test_rerun_only_reviews_changed_files(review_module, code_dir, review_responses, tmp_path):
+    reviewed = []
+
+    def review_python(run):
+        reviewed.extend(re.findall(r"^File: (\S+)", run.last_user_message, re.MULTILINE))
+        return review_responses["python-review-agent"](run)
+
+    responses = {**review_responses, "python-review-agent": review_python}
+
+    _run_review(review_module, code_dir, responses, tmp_path / "first.md")
+    assert sorted(reviewed) == ["api/handlers.py", "jobs/handlers.py"]
+
+    reviewed.clear()
+    _run_review(review_module, code_dir, responses, tmp_path / "second.md")
+    assert reviewed == []
+
+    (code_dir / "jobs" / "handlers.py").write_text("def run(job):\n    return job.start()\n")
+    _run_review(review_module, code_dir, responses, tmp_path / "third.md")
+    assert reviewed == ["jobs/handlers.py"]
+    # The cached review of the unchanged file with the same name still makes it into the report
+    report = (tmp_path / "third.md").read_text()
+    assert "Line 1 of api/handlers.py" in report
+    assert "Line 1 of jobs/handlers.py" in report
+
+def test_cached_reviews_reach_the_team_as_bounded_messages(review_module, monkeypatch, code_dir, review_responses, tmp_path):
+    _run_review(review_module, code_dir, review_responses, tmp_path / "first.md")
+    leader_threads = []
+
+    def team_leader(run):
+        leader_threads.append((run.last_user_message, [message.content[0].text.value for message in run.messages]))
+        return review_responses["TeamLeader"](run)
+
+    monkeypatch.setattr(review_module, "REVIEW_BATCH_MAX_TOKENS", 40)
+    _run_review(review_module, code_dir, {**review_responses, "TeamLeader": team_leader}, tmp_path / "second.md")
+
+    request, messages = leader_threads[0]
+    # The request only says how many files are cached; the cached reviews arrive in messages under the budget
+    assert "3 files are unchanged" in request
+    assert "Line 1 of" not in request
+    cached_messages = [message for message in messages if message.startswith("Cached")]
+    assert len(cached_messages) == 3
+    assert all("Line 1 of" in message for message in cached_messages)
+    assert "Line 1 of client.ts" in (tmp_path / "second.md").read_text()
+
+def test_changing_review_settings_misses_the_cache(review_module, monkeypatch, code_dir, review_responses, tmp_path):
+    reviewed = []
+
+    def review_typescript(run):
+        reviewed.extend(re.findall(r"^File: (\S+)", run.last_user_message, re.MULTILINE))
+        return review_responses["typescript-review-agent"](run)
+
+    responses = {**review_responses, "typescript-review-agent": review_typescript}
+    # Small files are still sent with static analysis on
+    monkeypatch.setattr(review_module, "REVIEW_TRIVIAL_MAX_LINES", 0)
+    _run_review(review_module, code_dir, responses, tmp_path / "first.md")
+    assert reviewed == ["client.ts"]
+
+    for setting in ("REVIEW_COMPACTION_ENABLED", "REVIEW_STATIC_ANALYSIS_ENABLED"):
+        reviewed.clear()
+        monkeypatch.setattr(review_module, setting, not getattr(review_module, setting))
+        _run_review(review_module, code_dir, responses, tmp_path / f"{setting}.md")
+        assert reviewed == ["client.ts"], setting
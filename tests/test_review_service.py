@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+from review_service import ReviewService
+
+@pytest.fixture
+def service(tmp_path):
+    # The workers are not started, so submitted jobs stay queued
+    return ReviewService(agents_client=None, report_dir=str(tmp_path / "reports"), max_finished_jobs=2)
+
+def test_reports_stay_in_the_report_directory(service, code_dir, tmp_path):
+    job = service.submit(str(code_dir))
+    assert job.report_path == service.report_dir / f"code_review_report-{job.job_id}.md"
+    job = service.submit(str(code_dir), report_path="team/report.md")
+    assert job.report_path == service.report_dir / "team" / "report.md"
+    assert job.report_path.parent.is_dir()
+
+    (service.report_dir / "outside").symlink_to(tmp_path)
+    for report_path in ("/tmp/report.md", "../report.md", "team/../../report.md", "outside/report.md"):
+        with pytest.raises(ValueError):
+            service.submit(str(code_dir), report_path=report_path)
+
+def test_finished_jobs_are_evicted(service, code_dir):
+    jobs = [service.submit(str(code_dir)) for _ in range(4)]
+    for index, job in enumerate(jobs[:3]):
+        job.status = "completed"
+        job.finished_at = time.time() + index
+    assert [job.job_id for job in service.list_jobs()] == [job.job_id for job in jobs[1:]]
+
+    jobs[1].finished_at = time.time() - 7200
+    assert service.get(jobs[1].job_id) is None
+    assert service.get(jobs[3].job_id) is jobs[3]
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from utils.review_cache import ReviewCache
+from utils.sharding import balance_shards, shard_agent_name, shard_count
+
+def test_shard_count_follows_tokens_within_limits():
+    assert shard_count(100000, 10, 24000, 4) == 4
+    assert shard_count(30000, 10, 24000, 4) == 2
+    assert shard_count(100000, 3, 24000, 8) == 3
+    assert shard_count(100000, 1, 24000, 4) == 1
+
+def test_balance_shards_evens_out_tokens_and_keeps_order():
+    files = [Path(f"f{index}.py") for index in range(5)]
+    tokens = dict(zip(files, [50, 40, 30, 20, 10]))
+    shards = balance_shards(files, tokens, 2)
+    assert sorted(sum(tokens[file_path] for file_path in shard) for shard in shards) == [70, 80]
+    assert all(shard == sorted(shard, key=files.index) for shard in shards)
+    assert balance_shards(files[:1], tokens, 3)[1:] == [[], []]
+
+def test_shard_agent_name():
+    assert shard_agent_name("python-review-agent", 0, 1) == "python-review-agent"
+    assert shard_agent_name("python-review-agent", 1, 3) == "python-review-agent-2"
+
+def test_cached_files_do_not_add_shards(review_module, monkeypatch, tmp_path):
+    files = []
+    for index in range(4):
+        file_path = tmp_path / f"module{index}.py"
+        file_path.write_text(f"def function{index}():\n    return {index}\n")
+        files.append(file_path)
+    monkeypatch.setattr(review_module, "REVIEW_SHARDS", "4")
+    cache = ReviewCache(str(tmp_path / "cache"))
+    for file_path in files[:3]:
+        cache.put(review_module.review_cache_key(file_path, "python", {}, {}), "cached review")
+
+    assert review_module.plan_language_shards({"python": files}, {}, {}) == {"python": 4}
+    assert review_module.plan_language_shards({"python": files}, {}, {}, cache) == {"python": 1}
+    assert cache.hits == 0 and cache.misses == 0
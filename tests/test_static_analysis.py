@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from utils.static_analysis import analyze_code, analyze_files, render_regions
+
+def _module_with_findings() -> str:
+    # 100 lines: findings at the top and a bare except at the bottom, with plain assignments between
+    head = ["import os", "import json", "", "def load(items=[]):", "    return eval(os.sep)"]
+    filler = [f"value_{index} = {index}" for index in range(91)]
+    tail = ["try:", "    load()", "except:", "    pass"]
+    return "\n".join(head + filler + tail) + "\n"
+
+def test_python_rules_report_their_lines():
+    analysis = analyze_code(Path("module.py"), _module_with_findings(), "python")
+
+    assert [(finding.rule, finding.line) for finding in analysis.findings] == [
+        ("unused-import", 2),
+        ("mutable-default", 4),
+        ("eval", 5),
+        ("bare-except", 99),
+    ]
+    assert "line 2: unused-import: 'json' is imported but not used" in analysis.notes()
+
+def test_findings_close_together_share_a_region():
+    analysis = analyze_code(Path("module.py"), _module_with_findings(), "python")
+
+    # The findings on lines 2-5 merge into one region with their context, the bare except gets its own
+    assert analysis.regions == [(1, 8), (96, 100)]
+
+def test_small_clean_files_are_trivial():
+    clean = analyze_code(Path("clean.py"), "# Returns one.\ndef one():\n    return 1\n", "python")
+    flagged = analyze_code(Path("flagged.py"), "import os\n", "python")
+
+    # Comments do not count as code lines
+    assert clean.code_lines == 2
+    assert clean.is_trivial(2)
+    assert not clean.is_trivial(1)
+    assert not flagged.is_trivial(20)
+
+def test_render_regions_marks_left_out_lines():
+    code = "".join(f"line {number}\n" for number in range(1, 101))
+
+    rendered = render_regions(code, [(1, 5), (91, 98)]).splitlines()
+
+    assert rendered[:5] == [f"{number:>3} | line {number}" for number in range(1, 6)]
+    assert rendered[5] == "..."
+    assert rendered[6:14] == [f"{number:>3} | line {number}" for number in range(91, 99)]
+    assert rendered[14:] == ["..."]
+
+def test_process_pool_matches_in_process_analysis():
+    files = [
+        (Path("module.py"), _module_with_findings(), "python"),
+        (Path("clean.py"), "def one():\n    return 1\n", "python"),
+        (Path("client.ts"), "let result: any = eval(input);\n", "typescript"),
+    ]
+
+    # Workers are spawned, so they import the analysis module afresh instead of inheriting this process
+    pooled = analyze_files(files, max_workers=2)
+    in_process = analyze_files(files, max_workers=1)
+
+    assert list(pooled) == [path for path, _, _ in files]
+    for path, analysis in pooled.items():
+        assert [finding.describe() for finding in analysis.findings] == [finding.describe() for finding in in_process[path].findings]
+        assert analysis.regions == in_process[path].regions
+    assert {finding.rule for finding in pooled[Path("client.ts")].findings} == {"any-type", "eval"}
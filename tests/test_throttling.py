@@ -0,0 +1,139 @@
+import asyncio
+
+from azure.ai.agents.models import ThreadRun
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
+
+from benchmarks.fake_agents_client import AsyncFakeAgentsClient, FakeAgentsClient
+from utils.throttling import AsyncThrottledAgentsClient, ThrottleController, ThrottledAgentsClient
+
+def _http_error(status_code):
+    error = HttpResponseError(message=f"HTTP {status_code}")
+    error.status_code = status_code
+    return error
+
+def _queued(run):
+    # The run as the service reports it right after it was created
+    return ThreadRun({**run.as_dict(), "status": "queued"})
+
+def _start(agents_client):
+    agent = agents_client.create_agent(model="test-model", name="python-review-agent")
+    thread = agents_client.threads.create()
+    agents_client.messages.create(thread_id=thread.id, role="user", content="Review this.")
+    return agent, thread
+
+def _throttled(agents_client):
+    return ThrottledAgentsClient(agents_client, ThrottleController(base_delay=0.001, seed=0))
+
+def test_failed_poll_is_retried_without_a_second_run():
+    agents_client = FakeAgentsClient()
+    agent, thread = _start(agents_client)
+    create, get = agents_client.runs.create, agents_client.runs.get
+    polls = []
+
+    def failing_get(**kwargs):
+        polls.append(kwargs)
+        if len(polls) == 1:
+            raise _http_error(500)
+        return get(**kwargs)
+
+    agents_client.runs.create = lambda **kwargs: _queued(create(**kwargs))
+    agents_client.runs.get = failing_get
+    throttled = _throttled(agents_client)
+
+    run = throttled.runs.create_and_process(thread_id=thread.id, agent_id=agent.id, polling_interval=0)
+
+    assert run.status == "completed"
+    assert len(polls) == 2
+    assert len(agents_client.state.thread_runs[thread.id]) == 1
+    assert throttled.controller.throttle_counts == {"500": 1}
+
+def test_rejected_create_is_retried():
+    agents_client = FakeAgentsClient()
+    agent, thread = _start(agents_client)
+    create = agents_client.runs.create
+    attempts = []
+
+    def rejected_once(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) == 1:
+            raise _http_error(429)
+        return create(**kwargs)
+
+    agents_client.runs.create = rejected_once
+    run = _throttled(agents_client).runs.create_and_process(thread_id=thread.id, agent_id=agent.id)
+
+    assert run.status == "completed"
+    assert len(attempts) == 2
+    assert len(agents_client.state.thread_runs[thread.id]) == 1
+
+def test_run_started_by_a_failed_create_is_picked_up():
+    agents_client = FakeAgentsClient()
+    agent, thread = _start(agents_client)
+    create = agents_client.runs.create
+    started = []
+
+    def lost_response(**kwargs):
+        if not started:
+            # The run starts, but the connection drops before the response arrives
+            started.append(create(**kwargs))
+            raise ServiceRequestError("connection reset")
+        return create(**kwargs)
+
+    agents_client.runs.create = lost_response
+    agents_client.runs.list = lambda **kwargs: [_queued(started[0])]
+    run = _throttled(agents_client).runs.create_and_process(thread_id=thread.id, agent_id=agent.id, polling_interval=0)
+
+    assert run.id == started[0].id
+    assert len(agents_client.state.thread_runs[thread.id]) == 1
+
+def test_rate_limited_run_is_run_again():
+    agents_client = FakeAgentsClient()
+    agent, thread = _start(agents_client)
+    create = agents_client.runs.create
+    runs = []
+
+    def rate_limited_once(**kwargs):
+        run = create(**kwargs)
+        if not runs:
+            run = ThreadRun(
+                {**run.as_dict(), "status": "failed", "last_error": {"code": "rate_limit_exceeded", "message": "Try again in 0 seconds."}}
+            )
+        runs.append(run)
+        return run
+
+    agents_client.runs.create = rate_limited_once
+    throttled = _throttled(agents_client)
+    run = throttled.runs.create_and_process(thread_id=thread.id, agent_id=agent.id)
+
+    assert run.status == "completed"
+    assert len(runs) == 2
+    assert throttled.controller.retries == 1
+
+def test_async_failed_poll_is_retried_without_a_second_run():
+    async def review():
+        agents_client = AsyncFakeAgentsClient()
+        agent = await agents_client.create_agent(model="test-model", name="python-review-agent")
+        thread = await agents_client.threads.create()
+        await agents_client.messages.create(thread_id=thread.id, role="user", content="Review this.")
+        create, get = agents_client.runs.create, agents_client.runs.get
+        polls = []
+
+        async def queued_create(**kwargs):
+            return _queued(await create(**kwargs))
+
+        async def failing_get(**kwargs):
+            polls.append(kwargs)
+            if len(polls) == 1:
+                raise _http_error(503)
+            return await get(**kwargs)
+
+        agents_client.runs.create = queued_create
+        agents_client.runs.get = failing_get
+        throttled = AsyncThrottledAgentsClient(agents_client, ThrottleController(base_delay=0.001, seed=0))
+        run = await throttled.runs.create_and_process(thread_id=thread.id, agent_id=agent.id, polling_interval=0)
+        return run, polls, agents_client.state.thread_runs[thread.id]
+
+    run, polls, thread_runs = asyncio.run(review())
+    assert run.status == "completed"
+    assert len(polls) == 2
+    assert len(thread_runs) == 1
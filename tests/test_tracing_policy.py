@@ -0,0 +1,69 @@
+import hashlib
+import os
+
+import pytest
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import NonRecordingSpan, SpanContext, TraceFlags
+
+from utils.tracing_policy import EXPORT_DEFAULTS, TracingPolicy, apply_export_defaults
+
+tracer = TracerProvider().get_tracer(__name__)
+
+def _span_in_trace(trace_id: int):
+    # A recording span whose trace ID is set by its sampled remote parent
+    parent = NonRecordingSpan(SpanContext(trace_id=trace_id, span_id=1, is_remote=True, trace_flags=TraceFlags(TraceFlags.SAMPLED)))
+    return tracer.start_span("task", context=trace.set_span_in_context(parent))
+
+def test_long_content_is_truncated_and_hashed_in_full():
+    policy = TracingPolicy(max_content_chars=10)
+    content = "x" * 25
+
+    attributes = policy.content_attributes("task.result", content, _span_in_trace(1))
+
+    assert attributes == {
+        "task.result.length": 25,
+        "task.result.sha256": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        "task.result": "x" * 10 + "\n[... 15 characters omitted]",
+    }
+    assert policy.truncate("short") == "short"
+
+def test_content_is_not_recorded_when_disabled_or_not_recording():
+    policy = TracingPolicy(max_content_chars=0)
+
+    # Length and hash are still recorded without the content itself
+    assert set(policy.content_attributes("task.result", "review", _span_in_trace(1))) == {"task.result.length", "task.result.sha256"}
+    assert TracingPolicy().content_attributes("task.result", "review", NonRecordingSpan(SpanContext(1, 1, False))) == {}
+
+def test_sampling_is_decided_by_the_low_bits_of_the_trace_id():
+    policy = TracingPolicy(sample_ratio=0.5)
+    high_bits = 0xFFFF << 64
+
+    sampled = _span_in_trace(high_bits | 1)
+    unsampled = _span_in_trace(high_bits | ((1 << 63) + 1))
+
+    assert policy.records_content(sampled)
+    assert not policy.records_content(unsampled)
+    assert "task.result" in policy.content_attributes("task.result", "review", sampled)
+    assert "task.result" not in policy.content_attributes("task.result", "review", unsampled)
+    # Every span of a trace gets the same decision
+    assert policy.records_content(_span_in_trace(high_bits | 1))
+    assert not TracingPolicy(sample_ratio=0.0).records_content(sampled)
+
+def test_invalid_policies_are_rejected():
+    with pytest.raises(ValueError):
+        TracingPolicy(max_content_chars=-1)
+    with pytest.raises(ValueError):
+        TracingPolicy(sample_ratio=1.5)
+
+def test_export_defaults_fill_in_unset_variables_only(monkeypatch):
+    for name in EXPORT_DEFAULTS:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OTEL_BSP_SCHEDULE_DELAY", "500")
+
+    effective = apply_export_defaults()
+
+    assert effective == {**EXPORT_DEFAULTS, "OTEL_BSP_SCHEDULE_DELAY": "500"}
+    assert os.environ["OTEL_BSP_SCHEDULE_DELAY"] == "500"
+    assert os.environ["OTEL_BSP_MAX_QUEUE_SIZE"] == EXPORT_DEFAULTS["OTEL_BSP_MAX_QUEUE_SIZE"]
@@ -0,0 +1,44 @@
+import pytest
+
+from benchmarks.fake_agents_client import FakeAgentsClient
+from utils.agent_team import _create_task
+from utils.transcript import RecordingAgentsClient, ReplayAgentsClient
+
+def test_replay_rebuilds_the_recorded_report(review_module, monkeypatch, code_dir, review_responses, tmp_path):
+    transcript_path = str(tmp_path / "transcript.json.gz")
+
+    monkeypatch.setattr(review_module, "AGENT_TRANSCRIPT_MODE", "record")
+    recording_client = RecordingAgentsClient(FakeAgentsClient(review_responses), transcript_path)
+    recording_client.enable_auto_function_calls({_create_task})
+    with recording_client:
+        review_module.run_code_review(recording_client, input_dir=code_dir, report_path=str(tmp_path / "recorded.md"))
+
+    # Replay needs no model deployment, and the cache filled by an earlier review must not change the prompts
+    agents_client = FakeAgentsClient(review_responses)
+    agents_client.enable_auto_function_calls({_create_task})
+    review_module.run_code_review(agents_client, input_dir=code_dir, report_path=str(tmp_path / "cached.md"))
+    monkeypatch.setattr(review_module, "AGENT_TRANSCRIPT_MODE", "replay")
+    monkeypatch.setattr(review_module, "MODEL_DEPLOYMENT_NAME", None)
+    replay_client = ReplayAgentsClient.load(transcript_path)
+    replay_client.enable_auto_function_calls({_create_task})
+    with replay_client:
+        review_module.run_code_review(replay_client, input_dir=code_dir, report_path=str(tmp_path / "replayed.md"))
+
+    assert replay_client.replayed_runs == len(recording_client.transcript.runs)
+    assert (tmp_path / "replayed.md").read_text() == (tmp_path / "recorded.md").read_text()
+    assert "api/handlers.py" in (tmp_path / "replayed.md").read_text()
+
+def test_replay_without_a_recording_raises(review_module, monkeypatch, code_dir, review_responses, tmp_path):
+    transcript_path = str(tmp_path / "transcript.json.gz")
+    monkeypatch.setattr(review_module, "AGENT_TRANSCRIPT_MODE", "record")
+    recording_client = RecordingAgentsClient(FakeAgentsClient(review_responses), transcript_path)
+    recording_client.enable_auto_function_calls({_create_task})
+    with recording_client:
+        review_module.run_code_review(recording_client, input_dir=code_dir, report_path=str(tmp_path / "recorded.md"))
+
+    (code_dir / "client.ts").write_text("export const changed = true;\n")
+    monkeypatch.setattr(review_module, "AGENT_TRANSCRIPT_MODE", "replay")
+    replay_client = ReplayAgentsClient.load(transcript_path)
+    replay_client.enable_auto_function_calls({_create_task})
+    with replay_client, pytest.raises(LookupError):
+        review_module.run_code_review(replay_client, input_dir=code_dir, report_path=str(tmp_path / "replayed.md"))
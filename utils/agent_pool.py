@@ -0,0 +1,126 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the pool file is still replaced atomically, but processes sharing it are not serialized
+    fcntl = None  # type: ignore[assignment]
+
+class AgentPool:
+    """
+    A local registry of warm agents that outlive a single run.
+
+    Agents are keyed on their name, model and a hash of their extended instructions and toolset, so a
+    pooled agent is only reused when it is configured exactly as a freshly created one would be.
+    Teams release their agents back to the pool instead of deleting them; agents that have not been
+    used for ``ttl_seconds`` are handed back for deletion by :meth:`pop_expired`.
+
+    The pool file may be shared by several processes: every read-modify-write holds an exclusive
+    lock on a ``.lock`` file next to it, and the file is replaced atomically.
+    """
+    def __init__(self, path: str, ttl_seconds: float = 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name: str, model: str, instructions: str, toolset: Optional[Any] = None) -> str:
+        tools: List[Any] = []
+        resources: Dict[str, Any] = {}
+        if toolset is not None:
+            tools = [definition.as_dict() for definition in toolset.definitions]
+            resources = toolset.resources.as_dict()
+        fingerprint = json.dumps(
+            {"instructions": instructions, "tools": tools, "tool_resources": resources}, sort_keys=True, default=str
+        )
+        return f"{name}:{model}:{hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()}"
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    # Released when the lock file is closed
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                yield
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r") as pool_file:
+                state = json.load(pool_file)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("agents", {})
+        state.setdefault("retired", [])
+        return state
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as pool_file:
+            json.dump(state, pool_file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def acquire(self, key: str) -> Optional[str]:
+        """
+        Returns the ID of a pooled agent for ``key``, or None if there is no fresh one. A stale
+        agent is retired so the next :meth:`pop_expired` deletes it.
+        """
+        with self._locked():
+            state = self._load()
+            entry = state["agents"].get(key)
+            if entry is not None and time.time() - entry["last_used"] <= self.ttl_seconds:
+                self.hits += 1
+                return entry["agent_id"]
+            if entry is not None:
+                state["retired"].append(state["agents"].pop(key)["agent_id"])
+                self._save(state)
+            self.misses += 1
+            return None
+
+    def evict(self, key: str, agent_id: str) -> None:
+        """
+        Drops ``agent_id`` from the pool once the service no longer has it, so it is neither reused
+        nor deleted. The lookup that returned it counts as a miss.
+        """
+        with self._locked():
+            state = self._load()
+            entry = state["agents"].get(key)
+            if entry is not None and entry["agent_id"] == agent_id:
+                del state["agents"][key]
+                self._save(state)
+            self.hits -= 1
+            self.misses += 1
+
+    def release(self, key: str, agent_id: str, name: str) -> None:
+        with self._locked():
+            state = self._load()
+            previous = state["agents"].get(key)
+            if previous is not None and previous["agent_id"] != agent_id:
+                state["retired"].append(previous["agent_id"])
+            state["agents"][key] = {"agent_id": agent_id, "name": name, "last_used": time.time()}
+            self._save(state)
+
+    def pop_expired(self) -> List[str]:
+        """
+        Removes agents that have not been used within the TTL, along with retired agents, and returns
+        their IDs so the caller can delete them from the service.
+        """
+        with self._locked():
+            state = self._load()
+            now = time.time()
+            expired = [key for key, entry in state["agents"].items() if now - entry["last_used"] > self.ttl_seconds]
+            agent_ids = state["retired"] + [state["agents"].pop(key)["agent_id"] for key in expired]
+            state["retired"] = []
+            if agent_ids:
+                self._save(state)
+            return agent_ids
@@ -1,20 +1,79 @@
 import os
+import time
+import threading
+import contextlib
+import contextvars
 import yaml  # type: ignore
 
 from opentelemetry import trace
 from opentelemetry.trace import Span  # noqa: F401 # pylint: disable=unused-import
-from typing import Any, Dict, Optional, Set, List
+from opentelemetry import context as otel_context
+from typing import Any, Callable, Dict, Iterator, Optional, Set, List, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import FunctionTool, ToolSet, MessageRole, Agent, AgentThread
+from azure.core.exceptions import ResourceNotFoundError
+from azure.ai.agents.models import (
+    FunctionTool,
+    ToolSet,
+    MessageRole,
+    Agent,
+    AgentThread,
+    AgentEventHandler,
+    MessageDeltaChunk,
+    ThreadMessage,
+    ThreadMessageOptions,
+    ThreadRun,
+)
+from utils import metrics, tracing_policy
+from utils.agent_pool import AgentPool
+from utils.pipeline import Pipeline, PipelineStage
 
 tracer = trace.get_tracer(__name__)
 
+# The team and task whose agent run is in progress in the current thread or asyncio task. Tool calls
+# are made from the same thread or task as the run, so _create_task can tell which team they are for.
+_active_run: contextvars.ContextVar[Optional[Tuple["AgentTeam", "AgentTask"]]] = contextvars.ContextVar(
+    "agent_team_active_run", default=None
+)
+
+@contextlib.contextmanager
+def _bind_run(team: "AgentTeam", task: "AgentTask") -> Iterator[None]:
+    token = _active_run.set((team, task))
+    try:
+        yield
+    finally:
+        _active_run.reset(token)
+
+THREAD_STRATEGIES = ("shared", "per_task", "pruned")
+
+# Why process_request stopped. The first three mean the queue drained; the others that a budget ran out
+# and the remaining queued tasks were dropped.
+STOP_COMPLETED = "completed"
+STOP_CONVERGED = "converged"
+STOP_REPEATED_TASK = "repeated_task"
+STOP_MAX_RUNS = "max_runs"
+STOP_MAX_TOKENS = "max_tokens"
+STOP_MAX_WALL_TIME = "max_wall_time"
+
+# Steps of the task scheduler, see AgentTeam._next_scheduled_task
+_STEP_RUN_ALONE = "run_alone"
+_STEP_START = "start"
+_STEP_WAIT = "wait"
+_STEP_DONE = "done"
+
 class _AgentTeamMember:
     """
     Represents an individual agent on a team.
     """
     def __init__(
-        self, model: str, name: str, instructions: str, toolset: Optional[ToolSet] = None, can_delegate: bool = True
+        self,
+        model: str,
+        name: str,
+        instructions: str,
+        toolset: Optional[ToolSet] = None,
+        can_delegate: bool = True,
+        join_before: bool = False,
+        language: Optional[str] = None,
     ) -> None:
         self.model = model
         self.name = name
@@ -22,6 +81,9 @@ class _AgentTeamMember:
         self.agent_instance: Optional[Agent] = None
         self.toolset: Optional[ToolSet] = toolset
         self.can_delegate = can_delegate
+        self.join_before = join_before
+        self.language = language
+        self.pool_key: Optional[str] = None
 
 class AgentTask:
     """
@@ -31,31 +93,181 @@ class AgentTask:
         self.recipient = recipient
         self.task_description = task_description
         self.requestor = requestor
+        self.result: Optional[str] = None
+        self.completion_index: Optional[int] = None
+        self.run_id: Optional[str] = None
+        self.thread_id: Optional[str] = None
+        # time.monotonic() timestamps
+        self.queued_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        # The task whose run created this one through _create_task, if any
+        self.parent: Optional["AgentTask"] = None
+        # Total tokens used by the task's run, when the service reports them
+        self.tokens: Optional[int] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None or self.completed_at is None:
+            return None
+        return self.completed_at - self.started_at
+
+class RequestResult:
+    """
+    The outcome of ``AgentTeam.process_request``: every task that ran, in the order they completed,
+    with its recipient, run ID, thread ID, timing and final text, and why the request stopped (one of
+    the ``STOP_*`` reasons).
+    """
+    def __init__(
+        self, request: str, tasks: List[AgentTask], duration: float, stop_reason: str = STOP_COMPLETED
+    ) -> None:
+        self.request = request
+        self.tasks = tasks
+        self.duration = duration
+        self.stop_reason = stop_reason
+
+    @property
+    def tokens(self) -> int:
+        return sum(task.tokens or 0 for task in self.tasks)
+
+    def tasks_for(self, recipient: str) -> List[AgentTask]:
+        return [task for task in self.tasks if task.recipient == recipient]
+
+    def final_result(self, recipient: str) -> Optional[str]:
+        """
+        Returns the text of the last completed task for ``recipient`` that produced one.
+        """
+        for task in reversed(self.tasks_for(recipient)):
+            if task.result:
+                return task.result
+        return None
+
+class _TaskStreamHandler(AgentEventHandler):
+    """
+    Collects a streamed run's final text and forwards text deltas to the team's output callback.
+    """
+    def __init__(self, task: AgentTask, output_callback: Optional[Callable[[AgentTask, str], None]] = None) -> None:
+        super().__init__()
+        self.task = task
+        self.output_callback = output_callback
+        self.run: Optional[ThreadRun] = None
+        self.text: Optional[str] = None
+
+    def on_message_delta(self, delta: MessageDeltaChunk) -> None:
+        if self.output_callback is not None and delta.text:
+            self.output_callback(self.task, delta.text)
+
+    def on_thread_message(self, message: ThreadMessage) -> None:
+        if message.status == "completed" and message.text_messages:
+            self.text = message.text_messages[-1].text.value
+
+    def on_thread_run(self, run: ThreadRun) -> None:
+        self.run = run
 
 class AgentTeam:
     """
     A class that represents a team of agents.
+
+    Tasks are drained from the queue by a scheduler. With ``max_workers`` greater than one, tasks for
+    independent members run at the same time, each on its own thread, and their results are posted back
+    to the team thread once they complete. Tasks for the team leader and for members added with
+    ``join_before=True`` act as join points: they wait for every in-flight task and run on the team thread.
+    Other tasks always run on threads of their own, one at a time with a single worker. The team thread
+    only receives their results, posted after ``task_completed_callback``, so a callback that rewrites
+    ``task.result`` also rewrites what the join points read.
+
+    With ``streaming``, runs are consumed as event streams and text deltas are forwarded to
+    ``output_callback`` as they arrive. ``task_completed_callback`` is called as soon as each task
+    finishes. Both callbacks may be called from worker threads.
+
+    With an ``agent_pool``, agents are reused across runs when their configuration matches, and
+    ``dismantle_team`` releases them back to the pool instead of deleting them.
+
+    With a ``pipeline``, the team leader is not created and requests follow the pipeline's fixed
+    stages instead of LLM routing and completeness checks.
+
+    ``thread_strategy`` controls what the join-point tasks see:
+    - ``shared``: they run on the team thread, which holds the whole conversation.
+    - ``per_task``: every task runs on its own thread. Join-point tasks are seeded with the results of
+      the tasks completed so far (the team leader's own responses only go back to the team leader).
+    - ``pruned``: every task runs on its own thread. Join-point tasks are seeded with the conversation so
+      far, keeping the last ``prune_keep_last`` messages as they are and truncating earlier ones to
+      ``prune_message_chars`` characters.
+
+    A request can be bounded by ``max_runs`` agent runs, ``max_tokens`` total tokens and
+    ``max_wall_seconds`` of wall-clock time. Once one is reached no new task starts: runs in flight
+    finish and the queued tasks are dropped. Tasks that agents create are also dropped when they repeat
+    a task of the same request, so a team leader that keeps asking for the same work converges.
     """
     _teams: Dict[str, "AgentTeam"] = {}
+    _teams_lock = threading.Lock()
     _agents_client: AgentsClient
-    _agent_thread: Optional[AgentThread] = None
-    _team_leader: Optional[_AgentTeamMember] = None
-    _members: List[_AgentTeamMember] = []
-    _tasks: List[AgentTask] = []
-    _team_name: str = ""
-    _current_request_span: Optional[Span] = None
-    _current_task_span: Optional[Span] = None
-
-    def __init__(self, team_name: str, agents_client: AgentsClient):
+    _agent_thread: Optional[AgentThread]
+    _team_leader: Optional[_AgentTeamMember]
+    _members: List[_AgentTeamMember]
+    _tasks: List[AgentTask]
+    _current_request_span: Optional[Span]
+
+    def __init__(
+        self,
+        team_name: str,
+        agents_client: AgentsClient,
+        max_workers: int = 1,
+        agent_pool: Optional[AgentPool] = None,
+        streaming: bool = False,
+        output_callback: Optional[Callable[[AgentTask, str], None]] = None,
+        task_completed_callback: Optional[Callable[[AgentTask], None]] = None,
+        pipeline: Optional[Pipeline] = None,
+        thread_strategy: str = "shared",
+        prune_keep_last: int = 4,
+        prune_message_chars: int = 500,
+        max_runs: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        max_wall_seconds: Optional[float] = None,
+    ):
         if not isinstance(team_name, str) or not team_name:
             raise ValueError("Team name must be a non-empty string.")
-        if team_name in AgentTeam._teams:
-            raise ValueError(f"A team with the name '{team_name}' already exists.")
         self.team_name = team_name
         if agents_client is None:
             raise ValueError("No AgentsClient provided.")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        if thread_strategy not in THREAD_STRATEGIES:
+            raise ValueError(f"thread_strategy must be one of {', '.join(THREAD_STRATEGIES)}.")
+        for budget_name, budget in (("max_runs", max_runs), ("max_tokens", max_tokens), ("max_wall_seconds", max_wall_seconds)):
+            if budget is not None and budget <= 0:
+                raise ValueError(f"{budget_name} must be positive.")
         self._agents_client = agents_client
-        AgentTeam._teams[team_name] = self
+        self._max_workers = max_workers
+        self._agent_pool = agent_pool
+        self._streaming = streaming
+        self._output_callback = output_callback
+        self._task_completed_callback = task_completed_callback
+        self._pipeline = pipeline
+        # All team state is per instance, so several teams can run in one process
+        self._agent_thread = None
+        self._team_leader = None
+        self._members = []
+        self._members_lock = threading.Lock()
+        self._tasks = []
+        self._current_request_span = None
+        # A team processes one request at a time; concurrent requests need a team each
+        self._request_lock = threading.Lock()
+        self._thread_strategy = thread_strategy
+        self._prune_keep_last = prune_keep_last
+        self._prune_message_chars = prune_message_chars
+        self._history: List[Tuple[str, str]] = []
+        self._context: List[str] = []
+        self._tasks_lock = threading.Lock()
+        self._task_span_var: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+            f"{team_name}_task_span", default=None
+        )
+        self._completed_tasks: List[AgentTask] = []
+        self._task_thread_ids: List[str] = []
+        self._max_runs = max_runs
+        self._max_tokens = max_tokens
+        self._max_wall_seconds = max_wall_seconds
+        self._reset_request_state()
         current_dir = os.path.dirname(os.path.abspath(__file__))
         file_path = os.path.join(current_dir, "agent_team_config.yaml")
         with open(file_path, "r") as config_file:
@@ -68,22 +280,43 @@ class AgentTeam:
             self.TEAM_MEMBER_CAN_DELEGATE_INSTRUCTIONS = config["TEAM_MEMBER_CAN_DELEGATE_INSTRUCTIONS"]
             self.TEAM_MEMBER_NO_DELEGATE_INSTRUCTIONS = config["TEAM_MEMBER_NO_DELEGATE_INSTRUCTIONS"]
             self.TEAM_LEADER_MODEL = config["TEAM_LEADER_MODEL"].strip()
+        with AgentTeam._teams_lock:
+            if team_name in AgentTeam._teams:
+                raise ValueError(f"A team with the name '{team_name}' already exists.")
+            AgentTeam._teams[team_name] = self
+
+    @property
+    def _current_task_span(self) -> Optional[Span]:
+        return self._task_span_var.get()
+
+    @_current_task_span.setter
+    def _current_task_span(self, span: Optional[Span]) -> None:
+        self._task_span_var.set(span)
 
     @staticmethod
     def get_team(team_name: str) -> "AgentTeam":
-        team = AgentTeam._teams.get(team_name)
+        with AgentTeam._teams_lock:
+            team = AgentTeam._teams.get(team_name)
         if team is None:
             raise ValueError(f"No team found with the name '{team_name}'.")
         return team
 
     @staticmethod
     def _remove_team(team_name: str) -> None:
-        if team_name not in AgentTeam._teams:
-            raise ValueError(f"No team found with the name '{team_name}'.")
-        del AgentTeam._teams[team_name]
+        with AgentTeam._teams_lock:
+            if team_name not in AgentTeam._teams:
+                raise ValueError(f"No team found with the name '{team_name}'.")
+            del AgentTeam._teams[team_name]
 
     def add_agent(
-        self, model: str, name: str, instructions: str, toolset: Optional[ToolSet] = None, can_delegate: bool = True
+        self,
+        model: str,
+        name: str,
+        instructions: str,
+        toolset: Optional[ToolSet] = None,
+        can_delegate: bool = True,
+        join_before: bool = False,
+        language: Optional[str] = None,
     ) -> None:
         if toolset is None:
             toolset = ToolSet()
@@ -100,19 +333,116 @@ class AgentTeam:
             instructions=instructions,
             toolset=toolset,
             can_delegate=can_delegate,
+            join_before=join_before,
+            language=language,
         )
-        self._members.append(member)
+        with self._members_lock:
+            self._members.append(member)
 
     def set_team_leader(self, model: str, name: str, instructions: str, toolset: Optional[ToolSet] = None) -> None:
         member = _AgentTeamMember(model=model, name=name, instructions=instructions, toolset=toolset)
-        self._team_leader = member
+        with self._members_lock:
+            self._team_leader = member
 
     def add_task(self, task: AgentTask) -> None:
-        self._tasks.append(task)
+        task.queued_at = time.monotonic()
+        with self._tasks_lock:
+            self._tasks.append(task)
+
+    def _queue_task(self, task: AgentTask) -> bool:
+        """
+        Queues a task, unless the request has stopped or an agent asked for a task it already asked for.
+        Returns whether the task was queued.
+        """
+        key = (task.recipient, task.task_description.strip())
+        with self._tasks_lock:
+            if self._stop_reason is not None:
+                return False
+            repeated = task.parent is not None and key in self._seen_tasks
+            self._seen_tasks.add(key)
+            # Convergence is judged on the last tasks created: only repeats means no new work
+            self._repeats_only = repeated
+        if repeated:
+            print(f"Dropped repeated task for agent '{task.recipient}' from '{task.requestor}'.")
+            return False
+        self._record_task_created(task)
+        self.add_task(task)
+        return True
+
+    def _reset_request_state(self) -> None:
+        self._runs_started = 0
+        self._request_tokens = 0
+        self._request_started_at = time.monotonic()
+        self._stop_reason: Optional[str] = None
+        self._seen_tasks: Set[Tuple[str, str]] = set()
+        self._repeats_only = False
+
+    def _pop_task(self) -> AgentTask:
+        with self._tasks_lock:
+            self._runs_started += 1
+            return self._tasks.pop(0)
+
+    def _exceeded_budget(self) -> Optional[str]:
+        with self._tasks_lock:
+            if self._max_runs is not None and self._runs_started >= self._max_runs:
+                return STOP_MAX_RUNS
+            if self._max_tokens is not None and self._request_tokens >= self._max_tokens:
+                return STOP_MAX_TOKENS
+        if self._max_wall_seconds is not None and time.monotonic() - self._request_started_at >= self._max_wall_seconds:
+            return STOP_MAX_WALL_TIME
+        return None
+
+    def _check_budget(self) -> bool:
+        """
+        Stops the request if a budget has run out, dropping the queued tasks. Returns whether the
+        request has stopped.
+        """
+        if self._stop_reason is not None:
+            return True
+        reason = self._exceeded_budget()
+        if reason is None:
+            return False
+        with self._tasks_lock:
+            self._stop_reason = reason
+            dropped = len(self._tasks)
+            self._tasks.clear()
+        print(f"Stopping request for team '{self.team_name}': {reason} reached, {dropped} queued tasks dropped.")
+        if self._current_request_span is not None:
+            self._current_request_span.add_event(
+                "agent_team.budget_exhausted", attributes={"agent_team.stop_reason": reason, "agent_team.tasks_dropped": dropped}
+            )
+        return True
+
+    def _final_stop_reason(self) -> str:
+        if self._stop_reason is not None:
+            return self._stop_reason
+        with self._tasks_lock:
+            last_task = self._completed_tasks[-1] if self._completed_tasks else None
+        if last_task is None or last_task.task_description != self.TEAM_LEADER_TASK_COMPLETENESS_CHECK_INSTRUCTIONS:
+            return STOP_COMPLETED
+        return STOP_REPEATED_TASK if self._repeats_only else STOP_CONVERGED
+
+    def _record_task_created(self, task: AgentTask) -> None:
+        metrics.tasks_created.add(1, self._metric_attributes(task.recipient))
+        span: Optional[Span] = None
+        if self._current_task_span is not None:
+            span = self._current_task_span
+        elif self._current_request_span is not None:
+            span = self._current_request_span
+        if span is not None:
+            _add_create_task_event(
+                span=span,
+                team_name=self.team_name,
+                requestor=task.requestor,
+                recipient=task.recipient,
+                request=task.task_description,
+            )
 
     def _create_team_leader(self) -> None:
         assert self._agents_client is not None, "agents_client must not be None"
         assert self._team_leader is not None, "team leader has not been added"
+        if self._acquire_pooled_agent(self._team_leader, self._team_leader.instructions):
+            return
         self._team_leader.agent_instance = self._agents_client.create_agent(
             model=self._team_leader.model,
             name=self._team_leader.name,
@@ -123,56 +453,122 @@ class AgentTeam:
     def _set_default_team_leader(self):
         toolset = ToolSet()
         toolset.add(default_function_tool)
-        instructions = self.TEAM_LEADER_INSTRUCTIONS.format(agent_name="TeamLeader", team_name=self.team_name) + "\n"
-        for member in self._members:
-            instructions += f"- {member.name}: {member.instructions}\n"
         self._team_leader = _AgentTeamMember(
             model=self.TEAM_LEADER_MODEL,
             name="TeamLeader",
-            instructions=instructions,
+            instructions=self._build_team_leader_instructions(),
             toolset=toolset,
             can_delegate=True,
         )
 
+    def _build_team_leader_instructions(self) -> str:
+        instructions = self.TEAM_LEADER_INSTRUCTIONS.format(agent_name="TeamLeader", team_name=self.team_name) + "\n"
+        for member in self._members:
+            instructions += f"- {member.name}: {member.instructions}\n"
+        return instructions
+
+    def _build_member_instructions(self, member: _AgentTeamMember) -> str:
+        team_description = ""
+        for other_member in self._members:
+            if other_member != member:
+                team_description += f"- {other_member.name}: {other_member.instructions}\n"
+        if member.can_delegate:
+            return self.TEAM_MEMBER_CAN_DELEGATE_INSTRUCTIONS.format(
+                name=member.name,
+                team_name=self.team_name,
+                original_instructions=member.instructions,
+                team_description=team_description,
+            )
+        return self.TEAM_MEMBER_NO_DELEGATE_INSTRUCTIONS.format(
+            name=member.name,
+            team_name=self.team_name,
+            original_instructions=member.instructions,
+            team_description=team_description,
+        )
+
     def assemble_team(self):
         assert self._agents_client is not None, "agents_client must not be None"
-        if self._team_leader is None:
-            self._set_default_team_leader()
-        self._create_team_leader()
+        if self._pipeline is None:
+            if self._team_leader is None:
+                self._set_default_team_leader()
+            self._create_team_leader()
         for member in self._members:
             if member is self._team_leader:
                 continue
-            team_description = ""
-            for other_member in self._members:
-                if other_member != member:
-                    team_description += f"- {other_member.name}: {other_member.instructions}\n"
-            if member.can_delegate:
-                extended_instructions = self.TEAM_MEMBER_CAN_DELEGATE_INSTRUCTIONS.format(
-                    name=member.name,
-                    team_name=self._team_name,
-                    original_instructions=member.instructions,
-                    team_description=team_description,
-                )
-            else:
-                extended_instructions = self.TEAM_MEMBER_NO_DELEGATE_INSTRUCTIONS.format(
-                    name=member.name,
-                    team_name=self._team_name,
-                    original_instructions=member.instructions,
-                    team_description=team_description,
-                )
+            extended_instructions = self._build_member_instructions(member)
+            if self._acquire_pooled_agent(member, extended_instructions):
+                continue
             member.agent_instance = self._agents_client.create_agent(
                 model=member.model, name=member.name, instructions=extended_instructions, toolset=member.toolset
             )
 
-    def dismantle_team(self) -> None:
-        assert self._agents_client is not None, "agents_client must not be None"
+    def _acquire_pooled_agent(self, member: _AgentTeamMember, instructions: str) -> bool:
+        """
+        Attaches a matching pooled agent to the member. Returns False if a new agent has to be created.
+        """
+        agent_id = self._pooled_agent_id(member, instructions)
+        if agent_id is None:
+            return False
+        try:
+            agent: Optional[Agent] = self._agents_client.get_agent(agent_id)
+        except ResourceNotFoundError:
+            agent = None
+        return self._attach_pooled_agent(member, agent_id, agent)
+
+    def _pooled_agent_id(self, member: _AgentTeamMember, instructions: str) -> Optional[str]:
+        if self._agent_pool is None:
+            return None
+        member.pool_key = AgentPool.make_key(member.name, member.model, instructions, member.toolset)
+        agent_id = self._agent_pool.acquire(member.pool_key)
+        if agent_id is None:
+            metrics.record_lookup(metrics.agent_pool_lookups, False, self._metric_attributes(member.name))
+        return agent_id
+
+    def _attach_pooled_agent(self, member: _AgentTeamMember, agent_id: str, agent: Optional[Agent]) -> bool:
+        """
+        Attaches the pooled agent the service returned for ``agent_id``. An agent the service no longer
+        has (``agent`` is None), for example because it was deleted outside the pool, is evicted
+        from the pool instead. Returns whether an agent was attached.
+        """
+        assert self._agent_pool is not None and member.pool_key is not None
+        metrics.record_lookup(metrics.agent_pool_lookups, agent is not None, self._metric_attributes(member.name))
+        if agent is None:
+            print(f"Pooled agent '{member.name}' no longer exists, agent ID: {agent_id}")
+            self._agent_pool.evict(member.pool_key, agent_id)
+            return False
+        member.agent_instance = agent
+        print(f"Reusing pooled agent '{member.name}', agent ID: {agent_id}")
+        return True
+
+    def _agents_to_release(self) -> List[_AgentTeamMember]:
+        agents = []
         if self._team_leader and self._team_leader.agent_instance:
-            print(f"Deleting team leader agent '{self._team_leader.name}'")
-            self._agents_client.delete_agent(self._team_leader.agent_instance.id)
+            agents.append(self._team_leader)
         for member in self._members:
             if member is not self._team_leader and member.agent_instance:
+                agents.append(member)
+        return agents
+
+    def dismantle_team(self) -> None:
+        assert self._agents_client is not None, "agents_client must not be None"
+        for member in self._agents_to_release():
+            assert member.agent_instance is not None
+            if self._agent_pool is not None and member.pool_key is not None:
+                print(f"Releasing agent '{member.name}' to the agent pool")
+                self._agent_pool.release(member.pool_key, member.agent_instance.id, member.name)
+            else:
                 print(f"Deleting agent '{member.name}'")
                 self._agents_client.delete_agent(member.agent_instance.id)
+        if self._agent_pool is not None:
+            for agent_id in self._agent_pool.pop_expired():
+                print(f"Deleting expired pooled agent '{agent_id}'")
+                try:
+                    self._agents_client.delete_agent(agent_id)
+                except ResourceNotFoundError:
+                    pass
+        for thread_id in self._task_thread_ids:
+            self._agents_client.threads.delete(thread_id)
+        self._task_thread_ids = []
         AgentTeam._remove_team(self.team_name)
 
     def _add_task_completion_event(
@@ -181,78 +577,407 @@ class AgentTeam:
         result: str,
     ) -> None:
         attributes: Dict[str, Any] = {}
-        attributes["agent_team.task.result"] = result
+        attributes.update(tracing_policy.content_attributes("agent_team.task.result", result, span))
         span.add_event(name=f"agent_team.task_completed", attributes=attributes)
 
-    def process_request(self, request: str) -> None:
-        assert self._agents_client is not None, "project client must not be None"
+    def process_request(
+        self, request: str, tasks: Optional[List[AgentTask]] = None, context: Optional[List[str]] = None
+    ) -> RequestResult:
+        """
+        Processes a request with the team and returns the tasks that ran, in completion order.
+
+        :param request: The request passed to the team leader, or to the pipeline's stage templates.
+        :param tasks: Optional tasks queued ahead of the team leader's initial request, or run by the
+            pipeline stage without a recipient. Tasks for independent members run concurrently when the
+            team has more than one worker.
+        :param context: Optional results from outside the team, such as earlier reviews. Join points
+            receive each one as a message of its own, like the results of completed tasks, and
+            pipeline stages with dependencies receive them with their upstream results.
+        """
+        if not self._request_lock.acquire(blocking=False):
+            raise RuntimeError(f"Team '{self.team_name}' is already processing a request.")
+        try:
+            assert self._agents_client is not None, "project client must not be None"
+            if self._pipeline is None:
+                assert self._team_leader is not None, "team leader must not be None"
+                if self._agent_thread is None and self._uses_shared_thread:
+                    self._agent_thread = self._agents_client.threads.create()
+                    print(f"Created thread with ID: {self._agent_thread.id}")
+            with tracer.start_as_current_span("agent_team_request") as current_request_span:
+                self._begin_request(current_request_span, context or [])
+                if self._pipeline is not None:
+                    for wave_tasks in self._pipeline_waves(request, tasks or []):
+                        self.run_tasks(wave_tasks)
+                else:
+                    if self._agent_thread is not None:
+                        for content in self._context:
+                            self._agents_client.messages.create(
+                                thread_id=self._agent_thread.id, role=MessageRole.AGENT, content=content
+                            )
+                    self._queue_initial_tasks(request, tasks or [])
+                    self._schedule_tasks()
+                return self._end_request(request)
+        finally:
+            self._request_lock.release()
+
+    # The methods below hold the request, scheduling and bookkeeping logic shared with AsyncAgentTeam,
+    # which only overrides the methods that call the agents client.
+
+    def _begin_request(self, span: Optional[Span], context: List[str]) -> None:
+        self._current_request_span = span
+        if self._current_request_span is not None:
+            self._current_request_span.set_attribute("agent_team.name", self.team_name)
+            self._current_request_span.set_attribute("agent_team.max_workers", self._max_workers)
+            self._current_request_span.set_attribute(
+                "agent_team.mode", "pipeline" if self._pipeline is not None else "leader"
+            )
+            self._current_request_span.set_attribute("agent_team.thread_strategy", self._thread_strategy)
+        self._completed_tasks = []
+        self._history = []
+        self._context = list(context)
+        for content in self._context:
+            self._record_history(MessageRole.AGENT, content)
+        self._reset_request_state()
+
+    def _end_request(self, request: str) -> RequestResult:
+        stop_reason = self._final_stop_reason()
+        if self._current_request_span is not None:
+            self._current_request_span.set_attribute(
+                "agent_team.completion_order", [task.recipient for task in self._completed_tasks]
+            )
+            self._current_request_span.set_attribute("agent_team.stop_reason", stop_reason)
+            self._current_request_span.set_attribute("agent_team.runs", self._runs_started)
+            self._current_request_span.set_attribute("agent_team.tokens", self._request_tokens)
+        self._current_request_span = None
+        duration = time.monotonic() - self._request_started_at
+        return RequestResult(request, list(self._completed_tasks), duration, stop_reason)
+
+    def _queue_initial_tasks(self, request: str, tasks: List[AgentTask]) -> None:
+        assert self._team_leader is not None, "team leader must not be None"
+        for task in tasks:
+            self._queue_task(task)
+        team_leader_request = self.TEAM_LEADER_INITIAL_REQUEST.format(original_request=request)
+        _create_task(
+            team_name=self.team_name,
+            recipient=self._team_leader.name,
+            request=team_leader_request,
+            requestor="user",
+        )
+
+    def _pipeline_waves(self, request: str, tasks: List[AgentTask]) -> Iterator[List[AgentTask]]:
+        """
+        Yields the tasks of each pipeline wave. A wave is built once the waves before it have run, so
+        its request templates see their results. Stops early when a budget runs out.
+        """
+        assert self._pipeline is not None, "pipeline must not be None"
+        stage_tasks: Dict[str, List[AgentTask]] = {}
+        for wave in self._pipeline.waves:
+            wave_tasks: List[AgentTask] = []
+            for stage in wave:
+                stage_tasks[stage.name] = self._build_stage_tasks(stage, request, tasks, stage_tasks)
+                wave_tasks.extend(stage_tasks[stage.name])
+            if self._check_budget():
+                return
+            yield wave_tasks
+
+    def _build_stage_tasks(
+        self,
+        stage: PipelineStage,
+        request: str,
+        tasks: List[AgentTask],
+        stage_tasks: Dict[str, List[AgentTask]],
+    ) -> List[AgentTask]:
+        if stage.recipient is None:
+            return list(tasks)
+        if self._get_member_by_name(stage.recipient) is None:
+            raise ValueError(f"Pipeline stage '{stage.name}' targets unknown agent '{stage.recipient}'.")
+        upstream = [
+            self._format_task_result(task)
+            for dependency in stage.depends_on
+            for task in stage_tasks[dependency]
+            if task.result
+        ]
+        upstream_results = "\n\n".join(self._context + upstream if stage.depends_on else upstream)
+        description = stage.request.format(request=request, upstream_results=upstream_results)
+        return [AgentTask(recipient=stage.recipient, task_description=description, requestor="pipeline")]
+
+    def run_tasks(self, tasks: List[AgentTask]) -> None:
+        """
+        Runs tasks directly, without the team leader or the task queue. Each task runs on its own
+        thread and up to ``max_workers`` tasks run at the same time.
+        """
+        request_context = otel_context.get_current()
+        self._start_direct_tasks(tasks)
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix=self.team_name) as executor:
+            futures = [executor.submit(self._run_isolated_task, task, request_context) for task in tasks]
+            for future in futures:
+                future.result()
+
+    def _schedule_tasks(self) -> None:
+        """
+        Drains the task queue, running independent tasks concurrently up to ``max_workers``.
+        Join-point tasks wait until nothing else is in flight and then run on the team thread, or on
+        a thread of their own seeded according to the thread strategy.
+        """
+        assert self._agent_thread is not None or not self._uses_shared_thread, "agent thread must not be None"
+        request_context = otel_context.get_current()
+        in_flight: Dict[Future, AgentTask] = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix=self.team_name) as executor:
+            while True:
+                step, task = self._next_scheduled_task(len(in_flight))
+                if step == _STEP_DONE:
+                    break
+                if step == _STEP_RUN_ALONE:
+                    assert task is not None
+                    if self._agent_thread is not None:
+                        self._run_task(task, thread_id=self._agent_thread.id)
+                    else:
+                        self._run_isolated_task(task, request_context, self._build_seed_messages(task))
+                    self._alone_task_completed(task)
+                    continue
+                if step == _STEP_START:
+                    assert task is not None
+                    in_flight[executor.submit(self._run_isolated_task, task, request_context)] = task
+                    continue
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished_task = in_flight.pop(future)
+                    future.result()
+                    result_message = self._concurrent_task_completed(finished_task)
+                    if result_message is not None and self._agent_thread is not None:
+                        self._agents_client.messages.create(
+                            thread_id=self._agent_thread.id, role=MessageRole.AGENT, content=result_message
+                        )
+                    self._queue_completeness_check(finished_task, len(in_flight))
+
+    def _start_direct_tasks(self, tasks: List[AgentTask]) -> None:
+        for task in tasks:
+            self._record_task_created(task)
+            task.queued_at = time.monotonic()
+        with self._tasks_lock:
+            self._runs_started += len(tasks)
+
+    def _next_scheduled_task(self, tasks_in_flight: int) -> Tuple[str, Optional[AgentTask]]:
+        """
+        Decides the scheduler's next step from the head of the queue and the number of tasks in flight:
+        run the task alone, start it next to the tasks in flight, wait for a task in flight to finish,
+        or stop. The task to run is popped from the queue.
+        """
+        with self._tasks_lock:
+            task = self._tasks[0] if self._tasks else None
+        if task is not None and self._check_budget():
+            # Out of budget: only the runs in flight are waited for
+            task = None
+        if task is None:
+            return (_STEP_WAIT if tasks_in_flight else _STEP_DONE), None
+        if self._is_join_task(task):
+            if tasks_in_flight:
+                return _STEP_WAIT, None
+            return _STEP_RUN_ALONE, self._pop_task()
+        if tasks_in_flight < self._max_workers:
+            return _STEP_START, self._pop_task()
+        return _STEP_WAIT, None
+
+    def _alone_task_completed(self, task: AgentTask) -> None:
+        self._record_history(MessageRole.USER, task.task_description)
+        self._record_history(MessageRole.AGENT, self._format_task_result(task))
+        self._queue_completeness_check(task, 0)
+
+    def _concurrent_task_completed(self, task: AgentTask) -> Optional[str]:
+        """
+        Records the result of a task that ran next to others. Returns the message to post to the team
+        thread, if the task produced a result.
+        """
+        if not task.result:
+            return None
+        self._record_history(MessageRole.AGENT, self._format_task_result(task))
+        return self._format_task_result(task)
+
+    def _format_task_result(self, task: AgentTask) -> str:
+        return f"Result from agent '{task.recipient}':\n{task.result}"
+
+    @property
+    def _uses_shared_thread(self) -> bool:
+        return self._pipeline is None and self._thread_strategy == "shared"
+
+    def _record_history(self, role: str, content: str) -> None:
+        if self._thread_strategy == "pruned":
+            with self._tasks_lock:
+                self._history.append((role, content))
+
+    def _build_seed_messages(self, task: AgentTask) -> List[ThreadMessageOptions]:
+        """
+        Returns the messages a join-point task's thread starts with, instead of the whole team thread.
+        """
+        if self._thread_strategy == "per_task":
+            team_leader_name = self._team_leader.name if self._team_leader is not None else None
+            with self._tasks_lock:
+                upstream = [
+                    self._format_task_result(completed)
+                    for completed in self._completed_tasks
+                    if completed.result and (task.recipient == team_leader_name or completed.recipient != team_leader_name)
+                ]
+            messages = [ThreadMessageOptions(role=MessageRole.AGENT, content=content) for content in self._context]
+            if upstream:
+                messages.append(ThreadMessageOptions(role=MessageRole.AGENT, content="\n\n".join(upstream)))
+            return messages
+        with self._tasks_lock:
+            history = list(self._history)
+        split = max(len(history) - max(self._prune_keep_last, 0), 0)
+        earlier, recent = history[:split], history[split:]
+        messages = []
+        if earlier:
+            # Threads are created with a limited number of messages, so earlier ones are combined into one
+            truncated = [self._truncate(content) for _, content in earlier]
+            messages.append(
+                ThreadMessageOptions(role=MessageRole.USER, content="Earlier in this conversation:\n\n" + "\n\n".join(truncated))
+            )
+        messages.extend(ThreadMessageOptions(role=role, content=content) for role, content in recent)
+        return messages
+
+    def _truncate(self, content: str) -> str:
+        if len(content) <= self._prune_message_chars:
+            return content
+        return f"{content[: self._prune_message_chars]}\n[... {len(content) - self._prune_message_chars} characters omitted]"
+
+    def _is_join_task(self, task: AgentTask) -> bool:
+        """
+        Join points follow the team's dependencies: the team leader and members added with
+        ``join_before=True`` depend on the results of the tasks before them.
+        """
+        if self._team_leader is None or task.recipient == self._team_leader.name:
+            return True
+        agent = self._get_member_by_name(task.recipient)
+        return agent is None or agent.join_before
+
+    def _queue_completeness_check(self, task: AgentTask, tasks_in_flight: int) -> None:
         assert self._team_leader is not None, "team leader must not be None"
-        if self._agent_thread is None:
-            self._agent_thread = self._agents_client.threads.create()
-            print(f"Created thread with ID: {self._agent_thread.id}")
-        with tracer.start_as_current_span("agent_team_request") as current_request_span:
-            self._current_request_span = current_request_span
-            if self._current_request_span is not None:
-                self._current_request_span.set_attribute("agent_team.name", self.team_name)
-            team_leader_request = self.TEAM_LEADER_INITIAL_REQUEST.format(original_request=request)
+        with self._tasks_lock:
+            queue_empty = not self._tasks
+        if queue_empty and not tasks_in_flight and not task.recipient == "TeamLeader":
+            team_leader_request = self.TEAM_LEADER_TASK_COMPLETENESS_CHECK_INSTRUCTIONS
             _create_task(
                 team_name=self.team_name,
                 recipient=self._team_leader.name,
                 request=team_leader_request,
                 requestor="user",
             )
-            while self._tasks:
-                task = self._tasks.pop(0)
-                with tracer.start_as_current_span("agent_team_task") as current_task_span:
-                    self._current_task_span = current_task_span
-                    if self._current_task_span is not None:
-                        self._current_task_span.set_attribute("agent_team.name", self.team_name)
-                        self._current_task_span.set_attribute("agent_team.task.recipient", task.recipient)
-                        self._current_task_span.set_attribute("agent_team.task.requestor", task.requestor)
-                        self._current_task_span.set_attribute("agent_team.task.description", task.task_description)
-                    print(
-                        f"Starting task for agent '{task.recipient}'. "
-                        f"Requestor: '{task.requestor}'. "
-                        f"Task description: '{task.task_description}'."
+
+    def _run_isolated_task(
+        self,
+        task: AgentTask,
+        parent_context: otel_context.Context,
+        messages: Optional[List[ThreadMessageOptions]] = None,
+    ) -> None:
+        if messages:
+            thread = self._agents_client.threads.create(messages=messages)
+        else:
+            thread = self._agents_client.threads.create()
+        with self._tasks_lock:
+            self._task_thread_ids.append(thread.id)
+        print(f"Created thread with ID: {thread.id} for task for agent '{task.recipient}'")
+        self._run_task(task, thread_id=thread.id, parent_context=parent_context)
+
+    def _run_task(
+        self, task: AgentTask, thread_id: str, parent_context: Optional[otel_context.Context] = None
+    ) -> None:
+        with tracer.start_as_current_span("agent_team_task", context=parent_context) as current_task_span, _bind_run(self, task):
+            self._start_task(task, thread_id, current_task_span)
+            message = self._agents_client.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=task.task_description,
+            )
+            print(f"Created message with ID: {message.id} for task in thread {thread_id}")
+            agent = self._get_member_by_name(task.recipient)
+            labels = self._metric_attributes(task.recipient)
+            if task.queued_at is not None:
+                metrics.queue_wait.record(time.monotonic() - task.queued_at, labels)
+            result: Optional[str] = None
+            if agent and agent.agent_instance:
+                run_started = time.monotonic()
+                if self._streaming:
+                    handler = _TaskStreamHandler(task, self._output_callback)
+                    with self._agents_client.runs.stream(
+                        thread_id=thread_id, agent_id=agent.agent_instance.id, event_handler=handler
+                    ) as stream:
+                        stream.until_done()
+                    print(f"Streamed run for agent '{agent.name}', run ID: {handler.run.id if handler.run else None}")
+                    self._record_run(task, labels, run_started, handler.run)
+                    result = handler.text
+                else:
+                    run = self._agents_client.runs.create_and_process(
+                        thread_id=thread_id, agent_id=agent.agent_instance.id
                     )
-                    message = self._agents_client.messages.create(
-                        thread_id=self._agent_thread.id,
-                        role="user",
-                        content=task.task_description,
+                    self._record_run(task, labels, run_started, run)
+                    print(f"Created and processed run for agent '{agent.name}', run ID: {run.id}")
+                    text_message = self._agents_client.messages.get_last_message_text_by_role(
+                        thread_id=thread_id, role=MessageRole.AGENT
                     )
-                    print(f"Created message with ID: {message.id} for task in thread {self._agent_thread.id}")
-                    agent = self._get_member_by_name(task.recipient)
-                    if agent and agent.agent_instance:
-                        run = self._agents_client.runs.create_and_process(
-                            thread_id=self._agent_thread.id, agent_id=agent.agent_instance.id
-                        )
-                        print(f"Created and processed run for agent '{agent.name}', run ID: {run.id}")
-                        text_message = self._agents_client.messages.get_last_message_text_by_role(
-                            thread_id=self._agent_thread.id, role=MessageRole.AGENT
-                        )
-                        if text_message and text_message.text:
-                            print(f"Agent '{agent.name}' completed task. " f"Outcome: {text_message.text.value}")
-                            if self._current_task_span is not None:
-                                self._add_task_completion_event(self._current_task_span, result=text_message.text.value)
-                    if not self._tasks and not task.recipient == "TeamLeader":
-                        team_leader_request = self.TEAM_LEADER_TASK_COMPLETENESS_CHECK_INSTRUCTIONS
-                        _create_task(
-                            team_name=self.team_name,
-                            recipient=self._team_leader.name,
-                            request=team_leader_request,
-                            requestor="user",
-                        )
-                    self._current_task_span = None
-            self._current_request_span = None
+                    if text_message and text_message.text:
+                        result = text_message.text.value
+            self._finish_task(task, result)
+
+    def _start_task(self, task: AgentTask, thread_id: str, span: Optional[Span]) -> None:
+        self._current_task_span = span
+        if self._current_task_span is not None:
+            self._current_task_span.set_attribute("agent_team.name", self.team_name)
+            self._current_task_span.set_attribute("agent_team.task.recipient", task.recipient)
+            self._current_task_span.set_attribute("agent_team.task.requestor", task.requestor)
+            self._current_task_span.set_attributes(
+                tracing_policy.content_attributes("agent_team.task.description", task.task_description, self._current_task_span)
+            )
+        task.started_at = time.monotonic()
+        task.thread_id = thread_id
+        print(
+            f"Starting task for agent '{task.recipient}'. "
+            f"Requestor: '{task.requestor}'. "
+            f"Task description: '{task.task_description}'."
+        )
+
+    def _record_run(self, task: AgentTask, labels: Dict[str, Any], run_started: float, run: Optional[ThreadRun]) -> None:
+        metrics.record_run(labels, time.monotonic() - run_started, run.usage if run else None)
+        task.run_id = run.id if run else None
+        task.tokens = _total_tokens(run)
+
+    def _finish_task(self, task: AgentTask, result: Optional[str]) -> None:
+        if result:
+            print(f"Agent '{task.recipient}' completed task. " f"Outcome: {result}")
+            task.result = result
+            if self._current_task_span is not None:
+                self._add_task_completion_event(self._current_task_span, result=result)
+        self._complete_task(task)
+        self._current_task_span = None
+
+    def _complete_task(self, task: AgentTask) -> None:
+        task.completed_at = time.monotonic()
+        with self._tasks_lock:
+            task.completion_index = len(self._completed_tasks)
+            self._completed_tasks.append(task)
+            self._request_tokens += task.tokens or 0
+        if self._current_task_span is not None:
+            self._current_task_span.set_attribute("agent_team.task.completion_index", task.completion_index)
+        if self._task_completed_callback is not None:
+            self._task_completed_callback(task)
+
+    def _metric_attributes(self, agent_name: str) -> Dict[str, Any]:
+        agent = self._get_member_by_name(agent_name)
+        return metrics.attributes(self.team_name, agent_name, agent.language if agent else None)
 
     def _get_member_by_name(self, name) -> Optional[_AgentTeamMember]:
         if name == "TeamLeader":
             return self._team_leader
-        for member in self._members:
-            if member.name == name:
-                return member
+        with self._members_lock:
+            for member in self._members:
+                if member.name == name:
+                    return member
         return None
 
+def _total_tokens(run: Optional[ThreadRun]) -> Optional[int]:
+    if run is None or run.usage is None:
+        return None
+    return run.usage.total_tokens
+
 def _add_create_task_event(
     span: Span,
     team_name: str,
@@ -264,29 +989,21 @@ def _add_create_task_event(
     attributes["agent_team.task.team_name"] = team_name
     attributes["agent_team.task.requestor"] = requestor
     attributes["agent_team.task.recipient"] = recipient
-    attributes["agent_team.task.description"] = request
+    attributes.update(tracing_policy.content_attributes("agent_team.task.description", request, span))
     span.add_event(name=f"agent_team.create_task", attributes=attributes)
 
 def _create_task(team_name: str, recipient: str, request: str, requestor: str) -> str:
     task = AgentTask(recipient=recipient, task_description=request, requestor=requestor)
-    team: Optional[AgentTeam] = None
-    try:
-        team = AgentTeam.get_team(team_name)
-        span: Optional[Span] = None
-        if team._current_task_span is not None:
-            span = team._current_task_span
-        elif team._current_request_span is not None:
-            span = team._current_request_span
-        if span is not None:
-            _add_create_task_event(
-                span=span, team_name=team_name, requestor=requestor, recipient=recipient, request=request
-            )
-    except:
-        pass
-    if team is not None:
-        team.add_task(task)
-        return "True"
-    return "False"
+    active_run = _active_run.get()
+    if active_run is not None:
+        # Called from an agent run: the task belongs to the team running it, whatever team name the model passed
+        team, task.parent = active_run
+    else:
+        try:
+            team = AgentTeam.get_team(team_name)
+        except ValueError:
+            return "False"
+    return "True" if team._queue_task(task) else "False"
 
 agent_team_default_functions: Set = {
     _create_task,
@@ -0,0 +1,338 @@
+import asyncio
+import time
+
+from opentelemetry import trace
+from typing import Callable, Dict, List, Optional, Set
+from azure.core.exceptions import ResourceNotFoundError
+from azure.ai.agents.aio import AgentsClient
+from azure.ai.agents.models import (
+    Agent,
+    AsyncAgentEventHandler,
+    AsyncFunctionTool,
+    AsyncToolSet,
+    MessageDeltaChunk,
+    MessageRole,
+    ThreadMessage,
+    ThreadMessageOptions,
+    ThreadRun,
+)
+
+from utils import metrics
+from utils.agent_pool import AgentPool
+from utils.pipeline import Pipeline
+from utils.agent_team import AgentTeam, AgentTask, RequestResult, _AgentTeamMember, _bind_run
+from utils.agent_team import _STEP_DONE, _STEP_RUN_ALONE, _STEP_START
+from utils.agent_team import _create_task as _create_task_sync
+
+tracer = trace.get_tracer(__name__)
+
+class _AsyncTaskStreamHandler(AsyncAgentEventHandler):
+    """
+    Collects a streamed run's final text and forwards text deltas to the team's output callback.
+    """
+    def __init__(self, task: AgentTask, output_callback: Optional[Callable[[AgentTask, str], None]] = None) -> None:
+        super().__init__()
+        self.task = task
+        self.output_callback = output_callback
+        self.run: Optional[ThreadRun] = None
+        self.text: Optional[str] = None
+
+    async def on_message_delta(self, delta: MessageDeltaChunk) -> None:
+        if self.output_callback is not None and delta.text:
+            self.output_callback(self.task, delta.text)
+
+    async def on_thread_message(self, message: ThreadMessage) -> None:
+        if message.status == "completed" and message.text_messages:
+            self.text = message.text_messages[-1].text.value
+
+    async def on_thread_run(self, run: ThreadRun) -> None:
+        self.run = run
+
+class AsyncAgentTeam(AgentTeam):
+    """
+    A team of agents driven by the async AgentsClient.
+
+    Team setup, task scheduling and teardown are coroutines, so many teams can share one event loop
+    without blocking a thread per call. Agents are created and deleted concurrently, and independent
+    tasks run as concurrent asyncio tasks up to ``max_workers``, with the same join-point rules as
+    :class:`AgentTeam`. Scheduling decisions, budgets and bookkeeping come from :class:`AgentTeam`;
+    only the methods that call the agents client are overridden here.
+    """
+    _agents_client: AgentsClient  # type: ignore[assignment]
+
+    def __init__(
+        self,
+        team_name: str,
+        agents_client: AgentsClient,
+        max_workers: int = 1,
+        agent_pool: Optional[AgentPool] = None,
+        streaming: bool = False,
+        output_callback: Optional[Callable[[AgentTask, str], None]] = None,
+        task_completed_callback: Optional[Callable[[AgentTask], None]] = None,
+        pipeline: Optional[Pipeline] = None,
+        thread_strategy: str = "shared",
+        prune_keep_last: int = 4,
+        prune_message_chars: int = 500,
+        max_runs: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        max_wall_seconds: Optional[float] = None,
+    ):
+        super().__init__(
+            team_name,
+            agents_client=agents_client,  # type: ignore[arg-type]
+            max_workers=max_workers,
+            agent_pool=agent_pool,
+            streaming=streaming,
+            output_callback=output_callback,
+            task_completed_callback=task_completed_callback,
+            pipeline=pipeline,
+            thread_strategy=thread_strategy,
+            prune_keep_last=prune_keep_last,
+            prune_message_chars=prune_message_chars,
+            max_runs=max_runs,
+            max_tokens=max_tokens,
+            max_wall_seconds=max_wall_seconds,
+        )
+
+    def add_agent(  # type: ignore[override]
+        self,
+        model: str,
+        name: str,
+        instructions: str,
+        toolset: Optional[AsyncToolSet] = None,
+        can_delegate: bool = True,
+        join_before: bool = False,
+        language: Optional[str] = None,
+    ) -> None:
+        if toolset is None:
+            toolset = AsyncToolSet()
+        if can_delegate:
+            try:
+                function_tool = toolset.get_tool(AsyncFunctionTool)
+                function_tool.add_functions(async_agent_team_default_functions)
+            except ValueError:
+                toolset.add(AsyncFunctionTool(async_agent_team_default_functions))
+        member = _AgentTeamMember(
+            model=model,
+            name=name,
+            instructions=instructions,
+            toolset=toolset,  # type: ignore[arg-type]
+            can_delegate=can_delegate,
+            join_before=join_before,
+            language=language,
+        )
+        with self._members_lock:
+            self._members.append(member)
+
+    def _set_default_team_leader(self):
+        toolset = AsyncToolSet()
+        toolset.add(AsyncFunctionTool(async_agent_team_default_functions))
+        self._team_leader = _AgentTeamMember(
+            model=self.TEAM_LEADER_MODEL,
+            name="TeamLeader",
+            instructions=self._build_team_leader_instructions(),
+            toolset=toolset,  # type: ignore[arg-type]
+            can_delegate=True,
+        )
+
+    async def _acquire_pooled_agent(self, member: _AgentTeamMember, instructions: str) -> bool:  # type: ignore[override]
+        agent_id = self._pooled_agent_id(member, instructions)
+        if agent_id is None:
+            return False
+        try:
+            agent: Optional[Agent] = await self._agents_client.get_agent(agent_id)
+        except ResourceNotFoundError:
+            agent = None
+        return self._attach_pooled_agent(member, agent_id, agent)
+
+    async def _create_agent(self, member: _AgentTeamMember, instructions: str) -> None:
+        if await self._acquire_pooled_agent(member, instructions):
+            return
+        member.agent_instance = await self._agents_client.create_agent(
+            model=member.model, name=member.name, instructions=instructions, toolset=member.toolset
+        )
+
+    async def assemble_team(self) -> None:  # type: ignore[override]
+        assert self._agents_client is not None, "agents_client must not be None"
+        creations = []
+        if self._pipeline is None:
+            if self._team_leader is None:
+                self._set_default_team_leader()
+            assert self._team_leader is not None, "team leader has not been added"
+            creations.append(self._create_agent(self._team_leader, self._team_leader.instructions))
+        for member in self._members:
+            if member is self._team_leader:
+                continue
+            creations.append(self._create_agent(member, self._build_member_instructions(member)))
+        await asyncio.gather(*creations)
+
+    async def _delete_expired_agent(self, agent_id: str) -> None:
+        print(f"Deleting expired pooled agent '{agent_id}'")
+        try:
+            await self._agents_client.delete_agent(agent_id)
+        except ResourceNotFoundError:
+            pass
+
+    async def dismantle_team(self) -> None:  # type: ignore[override]
+        assert self._agents_client is not None, "agents_client must not be None"
+        deletions = []
+        for member in self._agents_to_release():
+            assert member.agent_instance is not None
+            if self._agent_pool is not None and member.pool_key is not None:
+                print(f"Releasing agent '{member.name}' to the agent pool")
+                self._agent_pool.release(member.pool_key, member.agent_instance.id, member.name)
+            else:
+                print(f"Deleting agent '{member.name}'")
+                deletions.append(self._agents_client.delete_agent(member.agent_instance.id))
+        if self._agent_pool is not None:
+            for agent_id in self._agent_pool.pop_expired():
+                deletions.append(self._delete_expired_agent(agent_id))
+        for thread_id in self._task_thread_ids:
+            deletions.append(self._agents_client.threads.delete(thread_id))
+        await asyncio.gather(*deletions)
+        self._task_thread_ids = []
+        AgentTeam._remove_team(self.team_name)
+
+    async def process_request(  # type: ignore[override]
+        self, request: str, tasks: Optional[List[AgentTask]] = None, context: Optional[List[str]] = None
+    ) -> RequestResult:
+        """
+        Processes a request with the team and returns the tasks that ran, in completion order.
+
+        :param request: The request passed to the team leader, or to the pipeline's stage templates.
+        :param tasks: Optional tasks queued ahead of the team leader's initial request, or run by the
+            pipeline stage without a recipient.
+        :param context: Optional results from outside the team, as for :meth:`AgentTeam.process_request`.
+        """
+        if not self._request_lock.acquire(blocking=False):
+            raise RuntimeError(f"Team '{self.team_name}' is already processing a request.")
+        try:
+            assert self._agents_client is not None, "project client must not be None"
+            if self._pipeline is None:
+                assert self._team_leader is not None, "team leader must not be None"
+                if self._agent_thread is None and self._uses_shared_thread:
+                    self._agent_thread = await self._agents_client.threads.create()
+                    print(f"Created thread with ID: {self._agent_thread.id}")
+            with tracer.start_as_current_span("agent_team_request") as current_request_span:
+                self._begin_request(current_request_span, context or [])
+                if self._pipeline is not None:
+                    for wave_tasks in self._pipeline_waves(request, tasks or []):
+                        await self.run_tasks(wave_tasks)
+                else:
+                    if self._agent_thread is not None:
+                        for content in self._context:
+                            await self._agents_client.messages.create(
+                                thread_id=self._agent_thread.id, role=MessageRole.AGENT, content=content
+                            )
+                    self._queue_initial_tasks(request, tasks or [])
+                    await self._schedule_tasks()
+                return self._end_request(request)
+        finally:
+            self._request_lock.release()
+
+    async def run_tasks(self, tasks: List[AgentTask]) -> None:  # type: ignore[override]
+        """
+        Runs tasks directly, without the team leader or the task queue. Each task runs on its own
+        thread and up to ``max_workers`` tasks run at the same time.
+        """
+        semaphore = asyncio.Semaphore(self._max_workers)
+
+        async def run_task(task: AgentTask) -> None:
+            async with semaphore:
+                await self._run_isolated_task(task)
+
+        self._start_direct_tasks(tasks)
+        await asyncio.gather(*(run_task(task) for task in tasks))
+
+    async def _schedule_tasks(self) -> None:  # type: ignore[override]
+        assert self._agent_thread is not None or not self._uses_shared_thread, "agent thread must not be None"
+        in_flight: Dict[asyncio.Task, AgentTask] = {}
+        try:
+            while True:
+                step, task = self._next_scheduled_task(len(in_flight))
+                if step == _STEP_DONE:
+                    break
+                if step == _STEP_RUN_ALONE:
+                    assert task is not None
+                    if self._agent_thread is not None:
+                        await self._run_task(task, thread_id=self._agent_thread.id)
+                    else:
+                        await self._run_isolated_task(task, self._build_seed_messages(task))
+                    self._alone_task_completed(task)
+                    continue
+                if step == _STEP_START:
+                    assert task is not None
+                    in_flight[asyncio.create_task(self._run_isolated_task(task))] = task
+                    continue
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    finished_task = in_flight.pop(future)
+                    future.result()
+                    result_message = self._concurrent_task_completed(finished_task)
+                    if result_message is not None and self._agent_thread is not None:
+                        await self._agents_client.messages.create(
+                            thread_id=self._agent_thread.id, role=MessageRole.AGENT, content=result_message
+                        )
+                    self._queue_completeness_check(finished_task, len(in_flight))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    async def _run_isolated_task(  # type: ignore[override]
+        self, task: AgentTask, messages: Optional[List[ThreadMessageOptions]] = None
+    ) -> None:
+        if messages:
+            thread = await self._agents_client.threads.create(messages=messages)
+        else:
+            thread = await self._agents_client.threads.create()
+        with self._tasks_lock:
+            self._task_thread_ids.append(thread.id)
+        print(f"Created thread with ID: {thread.id} for task for agent '{task.recipient}'")
+        await self._run_task(task, thread_id=thread.id)
+
+    async def _run_task(self, task: AgentTask, thread_id: str) -> None:  # type: ignore[override]
+        with tracer.start_as_current_span("agent_team_task") as current_task_span, _bind_run(self, task):
+            self._start_task(task, thread_id, current_task_span)
+            message = await self._agents_client.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=task.task_description,
+            )
+            print(f"Created message with ID: {message.id} for task in thread {thread_id}")
+            agent = self._get_member_by_name(task.recipient)
+            labels = self._metric_attributes(task.recipient)
+            if task.queued_at is not None:
+                metrics.queue_wait.record(time.monotonic() - task.queued_at, labels)
+            result: Optional[str] = None
+            if agent and agent.agent_instance:
+                run_started = time.monotonic()
+                if self._streaming:
+                    handler = _AsyncTaskStreamHandler(task, self._output_callback)
+                    async with await self._agents_client.runs.stream(
+                        thread_id=thread_id, agent_id=agent.agent_instance.id, event_handler=handler
+                    ) as stream:
+                        await stream.until_done()
+                    print(f"Streamed run for agent '{agent.name}', run ID: {handler.run.id if handler.run else None}")
+                    self._record_run(task, labels, run_started, handler.run)
+                    result = handler.text
+                else:
+                    run = await self._agents_client.runs.create_and_process(
+                        thread_id=thread_id, agent_id=agent.agent_instance.id
+                    )
+                    self._record_run(task, labels, run_started, run)
+                    print(f"Created and processed run for agent '{agent.name}', run ID: {run.id}")
+                    text_message = await self._agents_client.messages.get_last_message_text_by_role(
+                        thread_id=thread_id, role=MessageRole.AGENT
+                    )
+                    if text_message and text_message.text:
+                        result = text_message.text.value
+            self._finish_task(task, result)
+
+# Async counterpart of utils.agent_team._create_task. It keeps the same name so the function tool
+# exposed to the agents is identical, and it only queues the task, so it never blocks the event loop.
+async def _create_task(team_name: str, recipient: str, request: str, requestor: str) -> str:
+    return _create_task_sync(team_name=team_name, recipient=recipient, request=request, requestor=requestor)
+
+async_agent_team_default_functions: Set = {
+    _create_task,
+}
@@ -0,0 +1,153 @@
+import ast
+import re
+
+from typing import List, Optional
+
+# Rough average for code with GPT-style tokenizers; keeps estimation dependency-free
+CHARS_PER_TOKEN = 4
+
+# Lines that usually start a top-level declaration, used to split non-Python files
+DECLARATION_PATTERNS = {
+    "diff": re.compile(r"^@@ "),
+    "terraform": re.compile(r"^(resource|data|module|variable|output|locals|provider|terraform)\b"),
+    "csharp": re.compile(
+        r"^\s{0,8}(\[|(public|private|protected|internal|static|abstract|sealed|partial|async|override|virtual)\b|(class|interface|record|struct|enum|namespace)\s)"
+    ),
+    "typescript": re.compile(
+        r"^\s{0,4}(export\s|(async\s+)?function\s|class\s|interface\s|type\s|enum\s|const\s|let\s|(public|private|protected|static)\s)"
+    ),
+}
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class CodeChunk:
+    """
+    A piece of a file to review: the whole file, or a range of its lines when the file is too large.
+    """
+    def __init__(self, file_name: str, tag: str, content: str, start_line: int, end_line: int) -> None:
+        self.file_name = file_name
+        self.tag = tag
+        self.content = content
+        self.start_line = start_line
+        self.end_line = end_line
+        self.part = 1
+        self.parts = 1
+        self.tokens = estimate_tokens(content)
+
+class ReviewBatch:
+    """
+    A group of chunks that is sent to an agent as a single task.
+    """
+    def __init__(self) -> None:
+        self.chunks: List[CodeChunk] = []
+        self.tokens = 0
+        self.content = ""
+
+    @property
+    def file_names(self) -> List[str]:
+        return list(dict.fromkeys(chunk.file_name for chunk in self.chunks))
+
+def _python_boundaries(code: str) -> Optional[List[int]]:
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    boundaries = []
+    for node in tree.body:
+        decorators = getattr(node, "decorator_list", [])
+        boundaries.append(min([node.lineno] + [decorator.lineno for decorator in decorators]))
+        if isinstance(node, ast.ClassDef):
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    child_decorators = child.decorator_list
+                    boundaries.append(min([child.lineno] + [decorator.lineno for decorator in child_decorators]))
+    return boundaries
+
+def _pattern_boundaries(lines: List[str], language: str) -> List[int]:
+    pattern = DECLARATION_PATTERNS.get(language)
+    if pattern is None:
+        return [index + 1 for index, line in enumerate(lines) if not line.strip()]
+    return [index + 1 for index, line in enumerate(lines) if pattern.match(line)]
+
+def split_code(file_name: str, tag: str, code: str, language: str, max_tokens: int) -> List[CodeChunk]:
+    """
+    Splits a file into chunks of at most ``max_tokens`` estimated tokens. Python files are split on
+    top-level function and class boundaries (and on methods of large classes) using ``ast``; other
+    languages on declaration-like lines. A segment that is still too large is split by lines.
+    """
+    lines = code.splitlines(keepends=True)
+    if estimate_tokens(code) <= max_tokens or len(lines) <= 1:
+        return [CodeChunk(file_name, tag, code, 1, max(len(lines), 1))]
+    boundaries = _python_boundaries(code) if language == "python" else None
+    if boundaries is None:
+        boundaries = _pattern_boundaries(lines, language)
+    starts = sorted({1, *[line for line in boundaries if 1 <= line <= len(lines)]})
+    segments = [(start, (starts[index + 1] if index + 1 < len(starts) else len(lines) + 1) - 1) for index, start in enumerate(starts)]
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks: List[CodeChunk] = []
+    chunk_start: Optional[int] = None
+    chunk_chars = 0
+
+    def flush(end_line: int) -> None:
+        nonlocal chunk_start, chunk_chars
+        if chunk_start is not None:
+            chunks.append(CodeChunk(file_name, tag, "".join(lines[chunk_start - 1:end_line]), chunk_start, end_line))
+        chunk_start = None
+        chunk_chars = 0
+
+    for segment_start, segment_end in segments:
+        segment_chars = sum(len(line) for line in lines[segment_start - 1:segment_end])
+        if chunk_start is not None and chunk_chars + segment_chars > max_chars:
+            flush(segment_start - 1)
+        if segment_chars > max_chars:
+            # Split an oversized segment by lines
+            for line_number in range(segment_start, segment_end + 1):
+                line_chars = len(lines[line_number - 1])
+                if chunk_start is not None and chunk_chars + line_chars > max_chars:
+                    flush(line_number - 1)
+                if chunk_start is None:
+                    chunk_start = line_number
+                chunk_chars += line_chars
+            continue
+        if chunk_start is None:
+            chunk_start = segment_start
+        chunk_chars += segment_chars
+    flush(len(lines))
+
+    for index, chunk in enumerate(chunks):
+        chunk.part = index + 1
+        chunk.parts = len(chunks)
+    return chunks
+
+def pack_chunks(chunks: List[CodeChunk], max_tokens: int) -> List[ReviewBatch]:
+    """
+    Packs chunks into batches of at most ``max_tokens`` estimated tokens, placing each chunk in the
+    first batch that still has room for it.
+    """
+    batches: List[ReviewBatch] = []
+    for chunk in chunks:
+        batch = next((batch for batch in batches if batch.tokens + chunk.tokens <= max_tokens), None)
+        if batch is None:
+            batch = ReviewBatch()
+            batches.append(batch)
+        batch.chunks.append(chunk)
+        batch.tokens += chunk.tokens
+    return batches
+
+def pack_texts(items: List[str], max_tokens: int) -> List[List[str]]:
+    """
+    Groups ``items`` in order so that each group stays under ``max_tokens``. An item larger than the
+    budget gets a group of its own.
+    """
+    groups: List[List[str]] = []
+    group_tokens = 0
+    for item in items:
+        tokens = estimate_tokens(item)
+        if not groups or group_tokens + tokens > max_tokens:
+            groups.append([])
+            group_tokens = 0
+        groups[-1].append(item)
+        group_tokens += tokens
+    return groups
@@ -0,0 +1,166 @@
+import hashlib
+import re
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from utils.chunking import estimate_tokens
+from utils.review_cache import FILE_HEADING_PATTERN
+
+# A leading comment block is only dropped when it reads like a licence or copyright notice
+LICENSE_MARKERS = re.compile(r"copyright|licen[cs]ed?\b|spdx-license-identifier|all rights reserved", re.IGNORECASE)
+
+LINE_COMMENT_PREFIXES = {
+    "python": ("#",),
+    "terraform": ("#", "//"),
+    "csharp": ("//",),
+    "typescript": ("//",),
+}
+BLOCK_COMMENT_LANGUAGES = {"terraform", "csharp", "typescript"}
+
+# Languages whose indentation is only layout, so it can be narrowed to one space per level. Python
+# indentation is syntax, and Terraform heredocs often embed indentation-sensitive YAML.
+REINDENT_LANGUAGES = {"csharp", "typescript"}
+TAB_WIDTH = 4
+
+# "line 12", "lines 12-18", "lines 12 to 18", "L12", "L12-L18"
+LINE_REFERENCE_PATTERN = re.compile(
+    r"\b(?P<word>lines?\s+|L)(?P<start>\d+)(?:(?P<separator>\s*(?:-|–|to)\s*L?)(?P<end>\d+))?\b", re.IGNORECASE
+)
+
+class CompactedFile:
+    """
+    The text of a file as it is sent for review. ``line_map[i]`` is the original line number of line
+    ``i + 1`` of ``content``. ``duplicates`` are other files with identical content that are not sent.
+    """
+    def __init__(self, path: Path, content: str, line_map: List[int], original_tokens: int) -> None:
+        self.path = path
+        self.content = content
+        self.line_map = line_map
+        self.original_tokens = original_tokens
+        self.tokens = estimate_tokens(content)
+        self.duplicates: List[Path] = []
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens * (1 + len(self.duplicates)) - self.tokens
+
+def _license_header_end(lines: List[str], language: str) -> int:
+    """
+    Returns the index of the first line after a leading licence header, or 0 if there is none.
+    """
+    start = 1 if lines and lines[0].startswith("#!") else 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    if start >= len(lines):
+        return 0
+    first = lines[start].lstrip()
+    end = start
+    if language in BLOCK_COMMENT_LANGUAGES and first.startswith("/*"):
+        while end < len(lines) and "*/" not in lines[end]:
+            end += 1
+        end += 1
+    elif language == "python" and first.startswith(('"""', "'''")):
+        quote = first[:3]
+        if quote not in first[3:]:
+            end += 1
+            while end < len(lines) and quote not in lines[end]:
+                end += 1
+        end += 1
+    else:
+        prefixes = LINE_COMMENT_PREFIXES.get(language, ())
+        while end < len(lines) and prefixes and lines[end].lstrip().startswith(prefixes):
+            end += 1
+    if end == start or end > len(lines) or not LICENSE_MARKERS.search("".join(lines[start:end])):
+        return 0
+    while end < len(lines) and not lines[end].strip():
+        end += 1
+    return end
+
+def _indent_width(line: str) -> int:
+    indentation = line[: len(line) - len(line.lstrip(" \t"))]
+    return len(indentation.expandtabs(TAB_WIDTH))
+
+def compact_code(code: str, language: str) -> Tuple[str, List[int]]:
+    """
+    Drops a leading licence header, trailing whitespace and repeated blank lines, and in
+    ``REINDENT_LANGUAGES`` narrows indentation to one space per level. Returns the compacted code and
+    the original line number of each of its lines.
+    """
+    lines = code.splitlines()
+    header_end = _license_header_end(lines, language)
+    kept: List[Tuple[int, str]] = []
+    if header_end and lines[0].startswith("#!"):
+        kept.append((1, lines[0].rstrip()))
+    for index in range(header_end, len(lines)):
+        line = lines[index].rstrip()
+        if not line and (not kept or not kept[-1][1]):
+            continue
+        kept.append((index + 1, line))
+    while kept and not kept[-1][1]:
+        kept.pop()
+    if language in REINDENT_LANGUAGES:
+        widths = [_indent_width(line) for _, line in kept if line]
+        unit = min((width for width in widths if width), default=0)
+        if unit > 1:
+            kept = [
+                (number, " " * -(-_indent_width(line) // unit) + line.lstrip(" \t")) for number, line in kept
+            ]
+    return "\n".join(line for _, line in kept), [number for number, _ in kept]
+
+def compact_files(files: List[Path], contents: Dict[Path, str], language: str) -> List[CompactedFile]:
+    """
+    Compacts ``files`` (whose text is in ``contents``). Files with identical content are sent once:
+    the first one is kept and the others are listed in its ``duplicates``.
+    """
+    compacted: List[CompactedFile] = []
+    by_hash: Dict[str, CompactedFile] = {}
+    for file_path in files:
+        code = contents[file_path]
+        digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        if digest in by_hash:
+            by_hash[digest].duplicates.append(file_path)
+            continue
+        content, line_map = compact_code(code, language)
+        compacted_file = CompactedFile(file_path, content, line_map, estimate_tokens(code))
+        by_hash[digest] = compacted_file
+        compacted.append(compacted_file)
+    return compacted
+
+def _remap_section(section: str, line_map: List[int]) -> str:
+    def original(number: str) -> str:
+        line = int(number)
+        return str(line_map[line - 1]) if 1 <= line <= len(line_map) else number
+
+    def replace(match: "re.Match[str]") -> str:
+        text = match.group("word") + original(match.group("start"))
+        if match.group("end") is not None:
+            text += match.group("separator") + original(match.group("end"))
+        return text
+    return LINE_REFERENCE_PATTERN.sub(replace, section)
+
+def _line_map_for(heading: str, line_maps: Dict[str, List[int]]) -> Optional[List[int]]:
+    for file_name, line_map in line_maps.items():
+        if heading == file_name or heading.startswith(file_name + " "):
+            return line_map
+    return None
+
+def remap_line_references(review: str, line_maps: Dict[str, List[int]], file_names: Optional[List[str]] = None) -> str:
+    """
+    Rewrites line references in a review of compacted files to the original line numbers. Each
+    ``### File: <name>`` section is remapped with the line map of its file, and text outside those
+    sections is left as it is. A review of a single file (``file_names`` holds only that file) is
+    remapped as a whole.
+    """
+    if file_names is not None and len(file_names) == 1:
+        line_map = line_maps.get(file_names[0])
+        return _remap_section(review, line_map) if line_map is not None else review
+    matches = list(FILE_HEADING_PATTERN.finditer(review))
+    if not matches:
+        return review
+    remapped = review[: matches[0].start()]
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(review)
+        section = review[match.start():end]
+        line_map = _line_map_for(match.group(1).strip(), line_maps)
+        remapped += _remap_section(section, line_map) if line_map is not None else section
+    return remapped
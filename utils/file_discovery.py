@@ -0,0 +1,237 @@
+import fnmatch
+import os
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+# Directories that only ever hold third-party code, virtual environments or tool caches. Names that
+# projects also use for their own code, such as build/, packages/ or bin/, are left to .gitignore.
+VENDORED_DIRECTORIES = {
+    ".git", ".hg", ".svn", ".terraform", ".venv", "venv", "__pycache__", ".mypy_cache", ".pytest_cache",
+    ".ruff_cache", ".tox", "node_modules", "bower_components", "jspm_packages", "vendor", ".next", ".nuxt",
+}
+
+# File names that are generated or minified
+GENERATED_FILE_PATTERNS = [
+    "*.min.js", "*.min.css", "*.bundle.js", "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.g.cs",
+    "*.designer.cs", "*.Designer.cs", "*.generated.*", "*.gen.*", "package-lock.json", "yarn.lock",
+    "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock", "*.tfstate", "*.tfstate.backup",
+]
+
+# Markers that code generators put near the top of a file
+GENERATED_MARKER = re.compile(
+    r"@generated|<auto-generated|auto-generated by|autogenerated by|code generated .* do not edit|"
+    r"this file (was|is) (automatically )?generated|do not edit this file",
+    re.IGNORECASE,
+)
+
+GENERATED_MARKER_BYTES = 2048
+BINARY_SNIFF_BYTES = 8192
+
+class DiscoveredFile:
+    """
+    A file selected for review, with its text already read.
+    """
+    def __init__(self, path: Path, language: str, size: int, content: str) -> None:
+        self.path = path
+        self.language = language
+        self.size = size
+        self.content = content
+
+class SkippedFile:
+    """
+    A file or directory left out of the review, with the reason it was skipped.
+    """
+    def __init__(self, path: Path, reason: str, detail: str = "") -> None:
+        self.path = path
+        self.reason = reason
+        self.detail = detail
+
+class DiscoveryResult:
+    def __init__(self) -> None:
+        self.files: List[DiscoveredFile] = []
+        self.skipped: List[SkippedFile] = []
+
+    def skip_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for skipped in self.skipped:
+            counts[skipped.reason] = counts.get(skipped.reason, 0) + 1
+        return counts
+
+    def skipped_by_reason(self) -> Dict[str, List[SkippedFile]]:
+        by_reason: Dict[str, List[SkippedFile]] = {}
+        for skipped in self.skipped:
+            by_reason.setdefault(skipped.reason, []).append(skipped)
+        return by_reason
+
+def _translate_pattern(pattern: str) -> str:
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+        elif pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+        elif pattern[index] == "*":
+            regex += "[^/]*"
+            index += 1
+        elif pattern[index] == "?":
+            regex += "[^/]"
+            index += 1
+        elif pattern[index] == "[" and "]" in pattern[index + 1:]:
+            end = pattern.index("]", index + 1)
+            character_class = pattern[index + 1:end]
+            if character_class.startswith("!"):
+                character_class = "^" + character_class[1:]
+            regex += f"[{character_class}]"
+            index = end + 1
+        else:
+            regex += re.escape(pattern[index])
+            index += 1
+    return regex
+
+class IgnoreRules:
+    """
+    Gitignore-style rules: ``#`` comments, ``!`` negation, a trailing ``/`` for directories only, a
+    leading or inner ``/`` to anchor a pattern to its base directory, and ``*``, ``?``, ``[...]`` and
+    ``**`` wildcards. The last matching rule wins.
+    """
+    def __init__(self) -> None:
+        # (base directory relative to the root, pattern text, compiled pattern, negated, directories only)
+        self._rules: List[Tuple[str, str, Pattern[str], bool, bool]] = []
+
+    def add_patterns(self, patterns: List[str], base: str = "") -> None:
+        for line in patterns:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            text = line
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            directories_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            prefix = "" if anchored else "(?:.*/)?"
+            self._rules.append((base, text, re.compile(prefix + _translate_pattern(line) + "$"), negated, directories_only))
+
+    def add_file(self, ignore_file: Path, base: str = "") -> None:
+        try:
+            with open(ignore_file, "r", encoding="utf-8", errors="replace") as file:
+                self.add_patterns(file.readlines(), base)
+        except OSError:
+            pass
+
+    def match(self, relative_path: str, is_directory: bool) -> Optional[str]:
+        """
+        Returns the pattern that excludes ``relative_path`` (relative to the root, with ``/``
+        separators), or None if the path is not ignored.
+        """
+        matched: Optional[str] = None
+        for base, text, pattern, negated, directories_only in self._rules:
+            if directories_only and not is_directory:
+                continue
+            if base:
+                if not relative_path.startswith(base + "/"):
+                    continue
+                path = relative_path[len(base) + 1:]
+            else:
+                path = relative_path
+            if pattern.match(path):
+                matched = None if negated else text
+        return matched
+
+def _is_generated_name(name: str) -> bool:
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in GENERATED_FILE_PATTERNS)
+
+def _read_file(path: Path, language: str) -> Tuple[Optional[DiscoveredFile], Optional[SkippedFile]]:
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError as error:
+        return None, SkippedFile(path, "unreadable", str(error))
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return None, SkippedFile(path, "binary")
+    try:
+        content = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return None, SkippedFile(path, "binary", "not valid UTF-8")
+    if GENERATED_MARKER.search(content[:GENERATED_MARKER_BYTES]):
+        return None, SkippedFile(path, "generated", "generated-code marker")
+    return DiscoveredFile(path, language, len(data), content), None
+
+def discover_files(
+    root: Path,
+    detect_language: Callable[[Path], str],
+    max_file_bytes: int = 256 * 1024,
+    ignore_patterns: Optional[List[str]] = None,
+    use_gitignore: bool = True,
+    max_workers: int = 8,
+) -> DiscoveryResult:
+    """
+    Finds the files under ``root`` to review. Vendored directories and paths matched by
+    ``.gitignore`` files (at the root and in subdirectories) or ``ignore_patterns`` are pruned while
+    walking. Files in an unsupported language, larger than ``max_file_bytes``, binary, or generated
+    are skipped. The remaining files are read in parallel on ``max_workers`` threads.
+    """
+    result = DiscoveryResult()
+    rules = IgnoreRules()
+    rules.add_patterns(ignore_patterns or [])
+    candidates: List[Tuple[Path, str]] = []
+    for directory, directory_names, file_names in os.walk(root):
+        directory_path = Path(directory)
+        relative_directory = directory_path.relative_to(root).as_posix()
+        relative_directory = "" if relative_directory == "." else relative_directory
+        if use_gitignore and ".gitignore" in file_names:
+            rules.add_file(directory_path / ".gitignore", relative_directory)
+        kept_directories = []
+        for name in sorted(directory_names):
+            relative_path = f"{relative_directory}/{name}" if relative_directory else name
+            if name in VENDORED_DIRECTORIES:
+                result.skipped.append(SkippedFile(directory_path / name, "vendored"))
+                continue
+            pattern = rules.match(relative_path, is_directory=True)
+            if pattern is not None:
+                result.skipped.append(SkippedFile(directory_path / name, "ignored", pattern))
+                continue
+            kept_directories.append(name)
+        # Pruning in place stops os.walk from descending into skipped directories
+        directory_names[:] = kept_directories
+        for name in sorted(file_names):
+            path = directory_path / name
+            relative_path = f"{relative_directory}/{name}" if relative_directory else name
+            pattern = rules.match(relative_path, is_directory=False)
+            if pattern is not None:
+                result.skipped.append(SkippedFile(path, "ignored", pattern))
+                continue
+            language = detect_language(path)
+            if language == "unknown":
+                result.skipped.append(SkippedFile(path, "unsupported"))
+                continue
+            if _is_generated_name(name):
+                result.skipped.append(SkippedFile(path, "generated", "generated file name"))
+                continue
+            try:
+                size = path.stat().st_size
+            except OSError as error:
+                result.skipped.append(SkippedFile(path, "unreadable", str(error)))
+                continue
+            if size > max_file_bytes:
+                result.skipped.append(SkippedFile(path, "too_large", f"{size} bytes"))
+                continue
+            candidates.append((path, language))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-discovery") as executor:
+        for discovered, skipped in executor.map(lambda candidate: _read_file(*candidate), candidates):
+            if discovered is not None:
+                result.files.append(discovered)
+            if skipped is not None:
+                result.skipped.append(skipped)
+    return result
@@ -0,0 +1,82 @@
+import re
+import subprocess
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+class FileChange:
+    """
+    A file that changed between a base ref and the working tree.
+    ``diff`` holds the changed hunks, or None for a new file that is reviewed in full.
+    """
+    def __init__(self, path: Path, status: str, diff: Optional[str] = None) -> None:
+        self.path = path
+        self.status = status
+        self.diff = diff
+
+def _run_git(args: List[str], cwd: Path) -> str:
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+def _extract_hunks(patch: str) -> str:
+    # Drop the diff/index/---/+++ headers and keep the hunks only
+    if patch.startswith("@@"):
+        return patch
+    start = patch.find("\n@@")
+    return patch[start + 1:] if start != -1 else ""
+
+def _split_raw_patch(output: str) -> List[Tuple[str, str, str]]:
+    """
+    Splits the output of ``git diff-index --raw -p -z`` into ``(status, path, patch)`` per file. The
+    NUL-separated raw records come first, with paths that are never quoted, followed by the patches
+    in the same order, one ``diff --git`` block per record.
+    """
+    fields = output.split("\0")
+    records: List[Tuple[str, str]] = []
+    index = 0
+    while index + 1 < len(fields) and fields[index].startswith(":"):
+        records.append((fields[index].split()[-1][0], fields[index + 1]))
+        index += 2
+    patch_text = "\0".join(fields[index:]).lstrip("\0")
+    patches = re.split(r"^(?=diff --git )", patch_text, flags=re.MULTILINE)
+    patches = [patch for patch in patches if patch.startswith("diff --git ")]
+    if len(patches) != len(records):
+        raise RuntimeError(f"git diff-index returned {len(patches)} patches for {len(records)} changed files.")
+    return [(status, path, patch) for (status, path), patch in zip(records, patches)]
+
+def get_changed_files(base_ref: str, directory: Path, context_lines: int = 10) -> Dict[Path, FileChange]:
+    """
+    Returns the files under ``directory`` that differ between ``base_ref`` and the working tree,
+    keyed on their resolved path. Modified files carry their changed hunks with ``context_lines``
+    lines of context; new and untracked files carry no diff and are reviewed in full. Deleted files
+    and files without text hunks, such as mode-only or binary changes, are left out. All changes
+    come from a single ``git diff-index`` call.
+    """
+    directory = directory.resolve()
+    _run_git(["update-index", "-q", "--refresh"], cwd=directory)
+    changes: Dict[Path, FileChange] = {}
+    output = _run_git(
+        [
+            "diff-index", "--raw", "-p", "-z", "--no-color", "--no-renames", f"--unified={context_lines}",
+            "--relative", base_ref, "--", ".",
+        ],
+        cwd=directory,
+    )
+    for status, relative_path, patch in _split_raw_patch(output):
+        if status == "D":
+            continue
+        path = (directory / relative_path).resolve()
+        diff: Optional[str] = None
+        if status != "A":
+            diff = _extract_hunks(patch)
+            if not diff:
+                continue
+        changes[path] = FileChange(path=path, status=status, diff=diff)
+    untracked = _run_git(["ls-files", "--others", "--exclude-standard", "-z", "--", "."], cwd=directory)
+    for relative_path in untracked.split("\0"):
+        if relative_path:
+            path = (directory / relative_path).resolve()
+            changes[path] = FileChange(path=path, status="A")
+    return changes
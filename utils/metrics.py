@@ -0,0 +1,62 @@
+from opentelemetry import metrics
+
+from typing import Any, Dict, Optional
+
+meter = metrics.get_meter(__name__)
+
+run_duration = meter.create_histogram(
+    "agent_team.run.duration", unit="s", description="Duration of an agent run, from start to completion."
+)
+queue_wait = meter.create_histogram(
+    "agent_team.task.queue_wait", unit="s", description="Time a task waits between being queued and starting."
+)
+prompt_tokens = meter.create_histogram(
+    "agent_team.run.prompt_tokens", unit="{token}", description="Prompt tokens used by an agent run."
+)
+completion_tokens = meter.create_histogram(
+    "agent_team.run.completion_tokens", unit="{token}", description="Completion tokens used by an agent run."
+)
+tasks_created = meter.create_counter(
+    "agent_team.tasks.created", unit="{task}", description="Tasks queued for team members."
+)
+review_cache_lookups = meter.create_counter(
+    "agent_team.review_cache.lookups", unit="{lookup}", description="Review cache lookups, labeled by hit or miss."
+)
+agent_pool_lookups = meter.create_counter(
+    "agent_team.agent_pool.lookups", unit="{lookup}", description="Agent pool lookups, labeled by hit or miss."
+)
+concurrency_limit = meter.create_gauge(
+    "agent_team.throttle.concurrency_limit", unit="{run}", description="Current limit on concurrent agent runs."
+)
+runs_in_flight = meter.create_up_down_counter(
+    "agent_team.throttle.runs_in_flight", unit="{run}", description="Agent runs in progress through a throttled client."
+)
+throttle_wait = meter.create_histogram(
+    "agent_team.throttle.wait", unit="s", description="Time an agent run waits for concurrency or quota before starting."
+)
+throttle_events = meter.create_counter(
+    "agent_team.throttle.events", unit="{event}", description="Throttled or transiently failed calls, labeled by operation and reason."
+)
+
+def attributes(team: str, agent: Optional[str] = None, language: Optional[str] = None) -> Dict[str, Any]:
+    labels = {"agent_team.name": team}
+    if agent is not None:
+        labels["agent_team.agent"] = agent
+    if language is not None:
+        labels["agent_team.language"] = language
+    return labels
+
+def record_run(labels: Dict[str, Any], seconds: float, usage: Optional[Any] = None) -> None:
+    """
+    Records a finished run. ``usage`` is the run's ``RunCompletionUsage``; the service leaves it
+    empty for runs that did not reach the model.
+    """
+    run_duration.record(seconds, labels)
+    if usage is not None:
+        if usage.prompt_tokens is not None:
+            prompt_tokens.record(usage.prompt_tokens, labels)
+        if usage.completion_tokens is not None:
+            completion_tokens.record(usage.completion_tokens, labels)
+
+def record_lookup(counter: Any, hit: bool, labels: Dict[str, Any]) -> None:
+    counter.add(1, {**labels, "agent_team.lookup.result": "hit" if hit else "miss"})
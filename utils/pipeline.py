@@ -0,0 +1,72 @@
+import yaml  # type: ignore
+
+from typing import Dict, List, Optional
+
+DEFAULT_STAGE_REQUEST = "{request}\n\n{upstream_results}"
+
+class PipelineStage:
+    """
+    A step in a pipeline. A stage with a recipient sends one task to that agent, built from its
+    request template; a stage without a recipient runs the tasks passed to ``process_request``.
+    """
+    def __init__(
+        self,
+        name: str,
+        recipient: Optional[str] = None,
+        request: str = DEFAULT_STAGE_REQUEST,
+        depends_on: Optional[List[str]] = None,
+    ) -> None:
+        self.name = name
+        self.recipient = recipient
+        self.request = request
+        self.depends_on = depends_on or []
+
+class Pipeline:
+    """
+    A declarative DAG of stages that replaces the team leader's routing with a fixed flow.
+    """
+    def __init__(self, stages: List[PipelineStage]) -> None:
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Pipeline stage names must be unique.")
+        if sum(1 for stage in stages if stage.recipient is None) > 1:
+            raise ValueError("Only one pipeline stage can run the tasks passed with the request.")
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in names:
+                    raise ValueError(f"Pipeline stage '{stage.name}' depends on unknown stage '{dependency}'.")
+        self.stages = stages
+        self.waves = self._build_waves()
+
+    @staticmethod
+    def load(path: str) -> "Pipeline":
+        with open(path, "r") as pipeline_file:
+            config = yaml.safe_load(pipeline_file)
+        stages = [
+            PipelineStage(
+                name=stage["name"],
+                recipient=stage.get("recipient"),
+                request=stage.get("request", DEFAULT_STAGE_REQUEST),
+                depends_on=stage.get("depends_on"),
+            )
+            for stage in config["stages"]
+        ]
+        return Pipeline(stages)
+
+    def _build_waves(self) -> List[List[PipelineStage]]:
+        """
+        Groups stages into waves in dependency order. Every stage in a wave only depends on stages
+        in earlier waves, so the stages of a wave can run concurrently.
+        """
+        done: Dict[str, int] = {}
+        remaining = list(self.stages)
+        waves: List[List[PipelineStage]] = []
+        while remaining:
+            wave = [stage for stage in remaining if all(dependency in done for dependency in stage.depends_on)]
+            if not wave:
+                raise ValueError("Pipeline stages contain a dependency cycle.")
+            for stage in wave:
+                done[stage.name] = len(waves)
+                remaining.remove(stage)
+            waves.append(wave)
+        return waves
@@ -0,0 +1,137 @@
+from opentelemetry import trace
+from typing import Dict, List, Optional, Tuple
+from utils.agent_team import AgentTask, AgentTeam
+from utils.chunking import pack_texts
+from utils.review_cache import ReviewCache
+
+tracer = trace.get_tracer(__name__)
+
+FILE_SUMMARY_INSTRUCTIONS = (
+    "Summarize the following code review of one file for a consolidated report. Keep every concrete "
+    "finding with its line numbers and severity, drop repetition and generic advice, and start with "
+    "the heading `### File: {name}`."
+)
+LANGUAGE_SUMMARY_INSTRUCTIONS = (
+    "Combine the following summaries of {language} file reviews into one markdown section. Start with "
+    "a short overall assessment and the most important findings across the files, then keep a short "
+    "subsection per file with its findings and line numbers."
+)
+REPORT_INSTRUCTIONS = (
+    "Write the final code review report in markdown from the following per-language summaries. Add an "
+    "executive summary at the top, keep one section per language, and keep the findings, file names "
+    "and line numbers from the summaries."
+)
+
+# Level names, used in span attributes
+LEVEL_FILE = "file"
+LEVEL_LANGUAGE = "language"
+LEVEL_REPORT = "report"
+
+class ReportConsolidator:
+    """
+    Writes the report in three levels instead of one pass over every review: each file's review is
+    summarized, the file summaries of each language are combined, and the report is written from the
+    language summaries. A language whose file summaries exceed ``max_input_tokens`` is combined in
+    parts. The summaries of a level run in parallel on ``agent_name`` with ``AgentTeam.run_tasks``.
+
+    Each summary is cached on the hash of its input, so re-running after a change only redoes the
+    files that changed and the language and report summaries above them. Reviews shorter than
+    ``passthrough_chars`` are used as they are instead of being summarized.
+    """
+    def __init__(
+        self,
+        agent_team: AgentTeam,
+        agent_name: str,
+        model: str,
+        cache: Optional[ReviewCache] = None,
+        max_input_tokens: int = 12000,
+        passthrough_chars: int = 1500,
+    ) -> None:
+        self._agent_team = agent_team
+        self._agent_name = agent_name
+        self._model = model
+        self._cache = cache
+        self._max_input_tokens = max_input_tokens
+        self._passthrough_chars = passthrough_chars
+        self.summaries_run: Dict[str, int] = {}
+        self.summaries_cached: Dict[str, int] = {}
+
+    def consolidate(self, file_reviews: Dict[str, Dict[str, str]]) -> Optional[str]:
+        """
+        Returns the report for ``file_reviews`` (language -> file name -> review), or None if no
+        report was produced.
+        """
+        with tracer.start_as_current_span("consolidate-report") as consolidation_span:
+            file_summaries: Dict[Tuple[str, str], str] = {}
+            file_inputs: Dict[Tuple[str, str], Tuple[str, str]] = {}
+            for language, reviews in file_reviews.items():
+                for file_name, review in reviews.items():
+                    if len(review) < self._passthrough_chars:
+                        file_summaries[(language, file_name)] = review.strip()
+                    else:
+                        file_inputs[(language, file_name)] = (FILE_SUMMARY_INSTRUCTIONS.format(name=file_name), review)
+            file_summaries.update(self._summarize(LEVEL_FILE, file_inputs))
+
+            language_inputs: Dict[Tuple[str, int, int], Tuple[str, str]] = {}
+            for language in sorted(file_reviews):
+                summaries = [file_summaries[(language, file_name)] for file_name in sorted(file_reviews[language])]
+                groups = pack_texts(summaries, self._max_input_tokens)
+                for index, group in enumerate(groups):
+                    language_inputs[(language, index + 1, len(groups))] = (
+                        LANGUAGE_SUMMARY_INSTRUCTIONS.format(language=language),
+                        "\n\n".join(group),
+                    )
+            language_summaries = self._summarize(LEVEL_LANGUAGE, language_inputs)
+
+            sections = []
+            for language, part, parts in sorted(language_summaries):
+                heading = f"## {language.capitalize()}" + (f" (part {part} of {parts})" if parts > 1 else "")
+                sections.append(f"{heading}\n\n{language_summaries[(language, part, parts)]}")
+            report = self._summarize(LEVEL_REPORT, {LEVEL_REPORT: (REPORT_INSTRUCTIONS, "\n\n".join(sections))}, fallback=False)
+
+            consolidation_span.set_attribute("consolidation.files", sum(len(reviews) for reviews in file_reviews.values()))
+            consolidation_span.set_attribute("consolidation.language_parts", len(language_inputs))
+            for level in (LEVEL_FILE, LEVEL_LANGUAGE, LEVEL_REPORT):
+                consolidation_span.set_attribute(f"consolidation.{level}.run", self.summaries_run.get(level, 0))
+                consolidation_span.set_attribute(f"consolidation.{level}.cached", self.summaries_cached.get(level, 0))
+            print(
+                "Report consolidation: "
+                + ", ".join(
+                    f"{level} {self.summaries_run.get(level, 0)} run/{self.summaries_cached.get(level, 0)} cached"
+                    for level in (LEVEL_FILE, LEVEL_LANGUAGE, LEVEL_REPORT)
+                )
+            )
+            return report.get(LEVEL_REPORT)
+
+    def _summarize(self, level: str, inputs: Dict, fallback: bool = True) -> Dict:
+        """
+        Summarizes each ``(instructions, content)`` in ``inputs``, taking cached summaries where there
+        are any and running the rest in parallel. A summary that fails falls back to its content
+        unless ``fallback`` is False, in which case it is left out.
+        """
+        summaries: Dict = {}
+        pending: List[Tuple[object, Optional[str], AgentTask]] = []
+        for key, (instructions, content) in inputs.items():
+            cache_key = ReviewCache.make_key(content, instructions, self._model) if self._cache is not None else None
+            cached = self._cache.get(cache_key) if self._cache is not None and cache_key is not None else None
+            if cached is not None:
+                summaries[key] = cached
+                continue
+            task = AgentTask(
+                recipient=self._agent_name,
+                task_description=f"{instructions}\n\n{content}",
+                requestor="report-consolidation",
+            )
+            pending.append((key, cache_key, task))
+        self.summaries_cached[level] = self.summaries_cached.get(level, 0) + len(summaries)
+        self.summaries_run[level] = self.summaries_run.get(level, 0) + len(pending)
+        if pending:
+            self._agent_team.run_tasks([task for _, _, task in pending])
+        for key, cache_key, task in pending:
+            if task.result:
+                summaries[key] = task.result.strip()
+                if self._cache is not None and cache_key is not None:
+                    self._cache.put(cache_key, summaries[key], file_name=f"{level} summary")
+            elif fallback:
+                summaries[key] = inputs[key][1]
+        return summaries
@@ -0,0 +1,57 @@
+import os
+import threading
+
+from typing import Any, Dict, List
+
+class IncrementalReportWriter:
+    """
+    Writes review sections to the report file as soon as each review finishes, so useful output is
+    on disk long before the consolidated report is ready. The final report replaces the sections.
+    """
+    def __init__(self, path: str, title: str = "Code Review (in progress)") -> None:
+        self.path = path
+        self.title = title
+        self._sections: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def add_section(self, heading: str, body: str) -> None:
+        with self._lock:
+            self._sections.setdefault(heading, []).append(body.strip())
+            content = f"# {self.title}\n\n"
+            for section_heading, bodies in self._sections.items():
+                content += f"## {section_heading}\n\n" + "\n\n".join(bodies) + "\n\n"
+            self._write(content)
+
+    def write_final(self, markdown: str) -> None:
+        with self._lock:
+            self._write(markdown)
+
+    def _write(self, content: str) -> None:
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as report_file:
+            report_file.write(content)
+        os.replace(temp_path, self.path)
+
+class StreamPrinter:
+    """
+    Prints text streamed by concurrent tasks to the console a line at a time, each line prefixed with
+    the task's recipient, so output from tasks streaming at the same time does not interleave. The
+    last, unterminated line of a task is printed by :meth:`flush`.
+    """
+    def __init__(self) -> None:
+        self._pending: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+
+    def write(self, task: Any, text: str) -> None:
+        with self._lock:
+            lines = (self._pending.pop(task, "") + text).split("\n")
+            for line in lines[:-1]:
+                print(f"[{task.recipient}] {line}", flush=True)
+            if lines[-1]:
+                self._pending[task] = lines[-1]
+
+    def flush(self, task: Any) -> None:
+        with self._lock:
+            line = self._pending.pop(task, None)
+            if line is not None:
+                print(f"[{task.recipient}] {line}", flush=True)
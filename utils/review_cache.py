@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from typing import Dict, List, Optional
+
+FILE_HEADING_PATTERN = re.compile(r"^\s*#{1,6}\s*File:\s*`?([^`\n]+?)`?\s*$", re.MULTILINE)
+
+class ReviewCache:
+    """
+    A persistent on-disk cache of per-file code reviews.
+
+    Entries are keyed on the hash of the reviewed content, the reviewing agent's instructions, the
+    model deployment and the review settings, so a change to any of them is a miss. Each entry is
+    stored as its own JSON file. Entries older than ``max_age_seconds`` are evicted, and the least
+    recently used entries are evicted once the cache grows beyond ``max_bytes``.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 100 * 1024 * 1024, max_age_seconds: float = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content: str, instructions: str, model: str, settings: str = "") -> str:
+        """
+        ``settings`` names anything else that changes the review of the same content, such as the
+        preprocessing applied before it is sent.
+        """
+        digest = hashlib.sha256()
+        for part in (hashlib.sha256(content.encode("utf-8")).hexdigest(), instructions, model, settings):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._entry_path(key)
+        review: Optional[str] = None
+        try:
+            if time.time() - os.path.getmtime(path) <= self.max_age_seconds:
+                with open(path, "r") as entry_file:
+                    review = json.load(entry_file)["review"]
+                # Touch the entry so size-based eviction drops the least recently used entries first
+                os.utime(path)
+        except (OSError, ValueError, KeyError):
+            review = None
+        with self._lock:
+            if review is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return review
+
+    def contains(self, key: str) -> bool:
+        """
+        Whether there is an unexpired entry for ``key``, without counting a hit or miss or touching it.
+        """
+        try:
+            return time.time() - os.path.getmtime(self._entry_path(key)) <= self.max_age_seconds
+        except OSError:
+            return False
+
+    def put(self, key: str, review: str, file_name: str = "") -> None:
+        path = self._entry_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as entry_file:
+            json.dump({"file": file_name, "created_at": time.time(), "review": review}, entry_file)
+        os.replace(temp_path, path)
+
+    def evict(self) -> int:
+        """
+        Removes expired entries, then the least recently used entries until the cache fits in ``max_bytes``.
+        Returns the number of entries removed.
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                removed += self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total_bytes -= size
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+def split_review_by_file(review: str, file_names: List[str]) -> Dict[str, str]:
+    """
+    Splits an agent's review into per-file sections using the ``### File: <name>`` headings the agent
+    is asked to emit. A review of a single file is attributed to that file as a whole. Files without
+    a section are left out.
+    """
+    if len(file_names) == 1:
+        return {file_names[0]: review.strip()}
+    matches = list(FILE_HEADING_PATTERN.finditer(review))
+    sections: Dict[str, str] = {}
+    for index, match in enumerate(matches):
+        name = match.group(1).strip()
+        if name not in file_names or name in sections:
+            continue
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(review)
+        sections[name] = review[match.start():end].strip()
+    return sections
@@ -0,0 +1,39 @@
+import heapq
+import math
+
+from pathlib import Path
+from typing import Dict, List
+
+def shard_count(total_tokens: int, file_count: int, shard_tokens: int, max_shards: int) -> int:
+    """
+    Picks the number of shards for a language: one per ``shard_tokens`` of code, at most
+    ``max_shards`` and never more than there are files.
+    """
+    if file_count <= 1 or shard_tokens <= 0:
+        return 1
+    return max(1, min(math.ceil(total_tokens / shard_tokens), max_shards, file_count))
+
+def balance_shards(files: List[Path], tokens: Dict[Path, int], shards: int) -> List[List[Path]]:
+    """
+    Splits ``files`` into ``shards`` lists of about the same total ``tokens``, largest file first onto
+    the lightest shard (longest-processing-time scheduling). Files keep their order within a shard. A
+    shard is empty when there are fewer files than shards.
+    """
+    shards = max(1, shards)
+    if shards == 1:
+        return [list(files)]
+    order = {file_path: index for index, file_path in enumerate(files)}
+    loads = [(0, index) for index in range(shards)]
+    assigned: List[List[Path]] = [[] for _ in range(shards)]
+    for file_path in sorted(files, key=lambda file_path: (-tokens.get(file_path, 0), order[file_path])):
+        load, index = heapq.heappop(loads)
+        assigned[index].append(file_path)
+        heapq.heappush(loads, (load + tokens.get(file_path, 0), index))
+    return [sorted(shard, key=order.__getitem__) for shard in assigned]
+
+def shard_agent_name(name: str, index: int, shards: int) -> str:
+    """
+    The name of the agent for shard ``index`` (0-based): the language agent's own name when there is
+    a single shard, otherwise the name with a 1-based suffix.
+    """
+    return name if shards <= 1 else f"{name}-{index + 1}"
@@ -0,0 +1,296 @@
+import ast
+import multiprocessing
+import re
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+
+# Python thresholds
+MAX_COMPLEXITY = 10
+HOTSPOT_COMPLEXITY = 5
+MAX_FUNCTION_LINES = 60
+MAX_PARAMETERS = 7
+
+# Lines of context shown around a finding, and the most lines shown for one function
+CONTEXT_LINES = 3
+MAX_REGION_LINES = 80
+# A file is sent whole when the regions worth a look cover at least this share of it
+WHOLE_FILE_RATIO = 0.6
+
+COMMENT_PREFIXES = {
+    "python": ("#",),
+    "terraform": ("#", "//", "/*", "*"),
+    "csharp": ("//", "/*", "*"),
+    "typescript": ("//", "/*", "*"),
+}
+
+# (rule, pattern, message) checks that apply to every language
+COMMON_CHECKS: List[Tuple[str, Pattern[str], str]] = [
+    (
+        "possible-secret",
+        re.compile(r"""(password|passwd|secret|api[_-]?key|access[_-]?key|token)\w*["']?\s*[:=]\s*["'][^"'\s]{6,}["']""", re.IGNORECASE),
+        "Possible hard-coded secret",
+    ),
+    ("sql-concatenation", re.compile(r"""["'](SELECT|INSERT|UPDATE|DELETE)\b[^"']*["']\s*\+""", re.IGNORECASE), "SQL built by string concatenation"),
+    ("todo", re.compile(r"\b(TODO|FIXME|HACK|XXX)\b"), "Unresolved TODO/FIXME comment"),
+]
+
+LANGUAGE_CHECKS: Dict[str, List[Tuple[str, Pattern[str], str]]] = {
+    "csharp": [
+        ("empty-catch", re.compile(r"catch\s*(\([^)]*\))?\s*\{\s*\}"), "Empty catch block swallows exceptions"),
+        ("async-void", re.compile(r"\basync\s+void\s+(?!\w+\s*\(\s*object\b)"), "async void method outside an event handler"),
+        ("sync-over-async", re.compile(r"\.(Result\b|Wait\(\s*\)|GetAwaiter\(\)\.GetResult\(\))"), "Blocking on a task can deadlock"),
+        ("httpclient-instantiation", re.compile(r"\bnew\s+HttpClient\s*\("), "HttpClient created per use instead of reused"),
+        ("thread-sleep", re.compile(r"\bThread\.Sleep\s*\("), "Thread.Sleep blocks a thread"),
+        ("suppressed-warning", re.compile(r"#pragma\s+warning\s+disable"), "Compiler warning suppressed"),
+    ],
+    "typescript": [
+        ("any-type", re.compile(r"(:\s*any\b|\bas\s+any\b|<any>)"), "Use of the any type"),
+        ("loose-equality", re.compile(r"[^=!<>]==[^=]|!=[^=]"), "Loose equality instead of === / !=="),
+        ("ts-ignore", re.compile(r"@ts-(ignore|nocheck)"), "Type checking suppressed"),
+        ("console-log", re.compile(r"\bconsole\.(log|debug)\s*\("), "Leftover console logging"),
+        ("eval", re.compile(r"\b(eval|Function)\s*\("), "Dynamic code evaluation"),
+        ("var-declaration", re.compile(r"^\s*var\s"), "var instead of let/const"),
+        ("non-null-assertion", re.compile(r"\w!\.(?!=)"), "Non-null assertion"),
+    ],
+    "terraform": [
+        ("open-cidr", re.compile(r"""["']0\.0\.0\.0/0["']|["']\*["']\s*$"""), "Open to any address"),
+        ("public-access", re.compile(r"""(acl\s*=\s*["']public-read|public_network_access_enabled\s*=\s*true|allow_blob_public_access\s*=\s*true)"""), "Public access enabled"),
+        (
+            "encryption-disabled",
+            re.compile(r"""\b(encrypted|enable_https_traffic_only|https_only|encryption_enabled)\s*=\s*false"""),
+            "Encryption or HTTPS disabled",
+        ),
+        ("unpinned-module", re.compile(r"""source\s*=\s*["'](git::|github\.com)[^"'?]*["']"""), "Module source not pinned to a ref"),
+    ],
+}
+
+# Terraform resource types from providers where tagging is expected
+TAGGED_RESOURCE_PREFIXES = ("azurerm_", "aws_", "google_")
+TERRAFORM_RESOURCE = re.compile(r"""^\s*resource\s+["']([\w-]+)["']\s+["']([\w-]+)["']\s*\{""")
+
+class Finding:
+    """
+    A local analysis result. Lines are 1-based and inclusive.
+    """
+    def __init__(self, rule: str, message: str, line: int, end_line: Optional[int] = None) -> None:
+        self.rule = rule
+        self.message = message
+        self.line = line
+        self.end_line = end_line if end_line is not None else line
+
+    def describe(self) -> str:
+        location = f"line {self.line}" if self.end_line == self.line else f"lines {self.line}-{self.end_line}"
+        return f"{location}: {self.rule}: {self.message}"
+
+class FileAnalysis:
+    """
+    The findings for one file and the line ranges worth sending for review. No regions means the
+    file should be sent whole.
+    """
+    def __init__(self, path: Path, language: str, total_lines: int, code_lines: int) -> None:
+        self.path = path
+        self.language = language
+        self.total_lines = total_lines
+        self.code_lines = code_lines
+        self.findings: List[Finding] = []
+        self.regions: List[Tuple[int, int]] = []
+
+    def is_trivial(self, max_code_lines: int) -> bool:
+        return not self.findings and self.code_lines <= max_code_lines
+
+    def notes(self) -> str:
+        if not self.findings:
+            return ""
+        lines = [f"Static analysis findings ({len(self.findings)}):"]
+        lines.extend(f"- {finding.describe()}" for finding in self.findings)
+        return "\n".join(lines)
+
+def _complexity(node: ast.AST) -> int:
+    """
+    Cyclomatic complexity of a function, not counting the functions and classes nested in it.
+    """
+    complexity = 1
+    stack = list(ast.iter_child_nodes(node))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(child, (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler)):
+            complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            complexity += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            complexity += 1 + len(child.ifs)
+        elif isinstance(child, ast.match_case):
+            complexity += 1
+        stack.extend(ast.iter_child_nodes(child))
+    return complexity
+
+def _imported_names(tree: ast.Module) -> List[Tuple[str, int]]:
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.append((alias.asname or alias.name.split(".")[0], node.lineno))
+        elif isinstance(node, ast.ImportFrom) and node.module != "__future__":
+            for alias in node.names:
+                if alias.name != "*":
+                    names.append((alias.asname or alias.name, node.lineno))
+    return names
+
+def _used_names(tree: ast.Module) -> Set[str]:
+    used: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            used.add(node.id)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            # Names in string annotations and __all__
+            used.update(re.findall(r"[A-Za-z_]\w*", node.value))
+    return used
+
+def _analyze_python(analysis: FileAnalysis, code: str, file_name: str) -> List[Tuple[int, int]]:
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError) as error:
+        line = getattr(error, "lineno", None) or 1
+        analysis.findings.append(Finding("syntax-error", f"File does not parse: {error}", line))
+        return []
+    hotspots: List[Tuple[int, int]] = []
+    if file_name != "__init__.py":
+        used = _used_names(tree)
+        for name, line in _imported_names(tree):
+            if name not in used:
+                analysis.findings.append(Finding("unused-import", f"'{name}' is imported but not used", line))
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            end = node.end_lineno or node.lineno
+            complexity = _complexity(node)
+            if complexity > MAX_COMPLEXITY:
+                analysis.findings.append(
+                    Finding("high-complexity", f"'{node.name}' has cyclomatic complexity {complexity}", start, end)
+                )
+            elif complexity >= HOTSPOT_COMPLEXITY:
+                hotspots.append((start, end))
+            if end - start + 1 > MAX_FUNCTION_LINES:
+                analysis.findings.append(Finding("long-function", f"'{node.name}' is {end - start + 1} lines long", start, end))
+            arguments = node.args
+            parameters = len(arguments.posonlyargs) + len(arguments.args) + len(arguments.kwonlyargs)
+            if parameters > MAX_PARAMETERS:
+                analysis.findings.append(Finding("too-many-parameters", f"'{node.name}' takes {parameters} parameters", node.lineno))
+            for default in arguments.defaults + [default for default in arguments.kw_defaults if default is not None]:
+                if isinstance(default, (ast.List, ast.Dict, ast.Set)):
+                    analysis.findings.append(
+                        Finding("mutable-default", f"'{node.name}' has a mutable default argument", default.lineno)
+                    )
+        elif isinstance(node, ast.ExceptHandler):
+            if node.type is None:
+                analysis.findings.append(Finding("bare-except", "Bare except catches everything, including KeyboardInterrupt", node.lineno))
+            elif len(node.body) == 1 and isinstance(node.body[0], ast.Pass):
+                analysis.findings.append(Finding("swallowed-exception", "Exception is silently ignored", node.lineno))
+        elif isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            analysis.findings.append(Finding("star-import", f"Wildcard import from '{node.module}'", node.lineno))
+        elif isinstance(node, ast.Call):
+            function = node.func
+            if isinstance(function, ast.Name) and function.id in ("eval", "exec"):
+                analysis.findings.append(Finding("eval", f"Call to {function.id}()", node.lineno))
+            for keyword in node.keywords:
+                if keyword.arg == "shell" and isinstance(keyword.value, ast.Constant) and keyword.value.value is True:
+                    analysis.findings.append(Finding("shell-true", "Subprocess call with shell=True", node.lineno))
+    return hotspots
+
+def _analyze_terraform_blocks(analysis: FileAnalysis, lines: List[str]) -> None:
+    index = 0
+    while index < len(lines):
+        match = TERRAFORM_RESOURCE.match(lines[index])
+        if not match:
+            index += 1
+            continue
+        depth = 0
+        end = index
+        for end in range(index, len(lines)):
+            depth += lines[end].count("{") - lines[end].count("}")
+            if depth <= 0:
+                break
+        block = lines[index:end + 1]
+        resource_type, resource_name = match.groups()
+        if resource_type.startswith(TAGGED_RESOURCE_PREFIXES) and not any(re.match(r"\s*tags\s*=", line) for line in block):
+            analysis.findings.append(
+                Finding("missing-tags", f"{resource_type}.{resource_name} has no tags", index + 1, end + 1)
+            )
+        index = end + 1
+
+def _merge_regions(regions: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(regions):
+        if merged and start <= merged[-1][1] + 2:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def analyze_code(path: Path, code: str, language: str) -> FileAnalysis:
+    """
+    Runs the local checks for ``language`` on ``code`` and picks the regions to send for review: each
+    finding with a few lines of context, and for Python the moderately complex functions as well.
+    """
+    lines = code.splitlines()
+    prefixes = COMMENT_PREFIXES.get(language, ())
+    code_lines = sum(1 for line in lines if line.strip() and not line.strip().startswith(prefixes))
+    analysis = FileAnalysis(path, language, len(lines), code_lines)
+    hotspots: List[Tuple[int, int]] = []
+    if language == "python":
+        hotspots = _analyze_python(analysis, code, path.name)
+    elif language == "terraform":
+        _analyze_terraform_blocks(analysis, lines)
+    checks = COMMON_CHECKS + LANGUAGE_CHECKS.get(language, [])
+    for number, line in enumerate(lines, start=1):
+        for rule, pattern, message in checks:
+            if pattern.search(line):
+                analysis.findings.append(Finding(rule, message, number))
+    analysis.findings.sort(key=lambda finding: (finding.line, finding.rule))
+    if any(finding.rule == "syntax-error" for finding in analysis.findings):
+        return analysis
+    regions = []
+    for start, end in hotspots + [(finding.line, finding.end_line) for finding in analysis.findings]:
+        end = min(end, start + MAX_REGION_LINES - 1)
+        regions.append((max(1, start - CONTEXT_LINES), min(len(lines), end + CONTEXT_LINES)))
+    regions = _merge_regions(regions)
+    if sum(end - start + 1 for start, end in regions) < WHOLE_FILE_RATIO * len(lines):
+        analysis.regions = regions
+    return analysis
+
+def render_regions(code: str, regions: List[Tuple[int, int]]) -> str:
+    """
+    The lines of ``regions`` prefixed with their line numbers, with ``...`` where lines are left out.
+    """
+    lines = code.splitlines()
+    width = len(str(len(lines)))
+    rendered: List[str] = []
+    previous_end = 0
+    for start, end in regions:
+        if start > previous_end + 1:
+            rendered.append("...")
+        rendered.extend(f"{number:>{width}} | {lines[number - 1]}" for number in range(start, end + 1))
+        previous_end = end
+    if previous_end < len(lines):
+        rendered.append("...")
+    return "\n".join(rendered)
+
+def _analyze(item: Tuple[Path, str, str]) -> FileAnalysis:
+    return analyze_code(*item)
+
+def analyze_files(files: List[Tuple[Path, str, str]], max_workers: int = 4) -> Dict[Path, FileAnalysis]:
+    """
+    Analyzes ``(path, code, language)`` items in a process pool, or in this process for
+    ``max_workers`` of 1 or a single file. Workers are spawned rather than forked, which is safe in
+    the threaded review service.
+    """
+    if max_workers <= 1 or len(files) <= 1:
+        return {item[0]: _analyze(item) for item in files}
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(files)), mp_context=context) as executor:
+        chunk_size = max(1, len(files) // (max_workers * 4))
+        return {analysis.path: analysis for analysis in executor.map(_analyze, files, chunksize=chunk_size)}
@@ -0,0 +1,558 @@
+import asyncio
+import collections
+import email.utils
+import functools
+import inspect
+import math
+import random
+import re
+import threading
+import time
+
+from typing import Any, Callable, Deque, Dict, Optional
+from azure.core.exceptions import AzureError, HttpResponseError, ServiceRequestError, ServiceResponseError
+from azure.ai.agents.models import ListSortOrder
+from utils import metrics
+
+# Status codes worth retrying. Calls that create something are only retried when the service
+# rejected them outright (429, 503) or the request never reached it, so a retry cannot duplicate them.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+REJECTED_STATUS_CODES = {429, 503}
+
+RATE_LIMIT_ERROR_CODE = "rate_limit_exceeded"
+_TRY_AGAIN_IN = re.compile(r"try again in (\d+(?:\.\d+)?) seconds?", re.IGNORECASE)
+
+# Statuses of a run that has not finished, during which its thread cannot take another run
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "requires_action", "cancelling")
+
+QUOTA_WINDOW_SECONDS = 60.0
+ASYNC_POLL_SECONDS = 0.05
+
+def retry_after_seconds(error: AzureError) -> Optional[float]:
+    """
+    Reads the delay the service asked for from ``retry-after-ms``, ``x-ms-retry-after-ms`` or
+    ``retry-after`` (seconds or an HTTP date), or from a "try again in N seconds" error message.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(header)
+        if value:
+            try:
+                return max(0.0, float(value) / 1000)
+            except ValueError:
+                pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = _TRY_AGAIN_IN.search(str(getattr(error, "message", None) or error))
+    return float(match.group(1)) if match else None
+
+def _is_idempotent(operation: str) -> bool:
+    return operation.rsplit(".", 1)[-1].startswith(("get", "list", "delete"))
+
+def _retry_reason(operation: str, error: AzureError) -> Optional[str]:
+    if isinstance(error, ServiceRequestError):
+        return "connection"
+    if isinstance(error, ServiceResponseError):
+        return "connection" if _is_idempotent(operation) else None
+    if isinstance(error, HttpResponseError):
+        retryable = RETRYABLE_STATUS_CODES if _is_idempotent(operation) else REJECTED_STATUS_CODES
+        if error.status_code in retryable:
+            return str(error.status_code)
+    return None
+
+def _run_tokens(run: Any) -> Optional[int]:
+    usage = getattr(run, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+def _adopt_active_run(run: Any, thread_id: str, agent_id: Optional[str]) -> Any:
+    if run is None or getattr(run, "status", None) not in ACTIVE_RUN_STATUSES:
+        return None
+    if getattr(run, "agent_id", None) != agent_id:
+        raise RuntimeError(f"Thread {thread_id} already has active run {run.id} of another agent.")
+    return run
+
+class _RunSlot:
+    def __init__(self, started_at: float) -> None:
+        self.started_at = started_at
+        self.tokens: Optional[int] = None
+
+class ThrottleController:
+    """
+    Paces the agent runs of every client wrapper that shares it, which should be every client using
+    the same model deployment.
+
+    The number of runs in flight is capped by an additive-increase/multiplicative-decrease limit: a
+    completed run raises it by ``1 / limit`` (about one per round of runs), and a throttled call halves
+    it, at most once per ``decrease_cooldown`` seconds. A retry-after hint also pauses new runs until it
+    has passed. With ``requests_per_minute`` or ``tokens_per_minute`` set, a run only starts while the
+    runs of the last minute stay under ``headroom`` of that quota. Runs that have not finished yet are
+    counted at the average token usage of earlier runs.
+    """
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        headroom: float = 0.9,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        decrease_cooldown: float = 5.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        if min_concurrency < 1 or max_concurrency < min_concurrency:
+            raise ValueError("Concurrency limits must satisfy 1 <= min_concurrency <= max_concurrency.")
+        if not 0 < headroom <= 1:
+            raise ValueError("headroom must be in (0, 1].")
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.headroom = headroom
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.decrease_cooldown = decrease_cooldown
+        self.throttle_counts: Dict[str, int] = {}
+        self.retries = 0
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._next_decrease_at = 0.0
+        self._tokens_per_run: Optional[float] = None
+        self._window: Deque[_RunSlot] = collections.deque()
+        self._random = random.Random(seed)
+        self._condition = threading.Condition()
+        metrics.concurrency_limit.set(self.concurrency_limit)
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(self.min_concurrency, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "concurrency_limit": self.concurrency_limit,
+                "in_flight": self._in_flight,
+                "throttled": dict(self.throttle_counts),
+                "retries": self.retries,
+            }
+
+    def _capacity_wait(self, now: float) -> float:
+        """
+        Returns 0 if a run can start now, otherwise how long to wait before checking again.
+        """
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= self.concurrency_limit:
+            return math.inf
+        while self._window and self._window[0].started_at <= now - QUOTA_WINDOW_SECONDS:
+            self._window.popleft()
+        if not self._window:
+            return 0.0
+        window_expiry = self._window[0].started_at + QUOTA_WINDOW_SECONDS - now
+        if self.requests_per_minute and len(self._window) + 1 > self.requests_per_minute * self.headroom:
+            return window_expiry
+        if self.tokens_per_minute and self._tokens_per_run is not None:
+            tokens = sum(slot.tokens if slot.tokens is not None else self._tokens_per_run for slot in self._window)
+            if tokens + self._tokens_per_run > self.tokens_per_minute * self.headroom:
+                return window_expiry
+        return 0.0
+
+    def _reserve(self, now: float) -> _RunSlot:
+        slot = _RunSlot(now)
+        self._in_flight += 1
+        self._window.append(slot)
+        metrics.runs_in_flight.add(1)
+        return slot
+
+    def acquire(self) -> _RunSlot:
+        """
+        Blocks until a run may start and reserves a slot for it.
+        """
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._capacity_wait(now)
+                if wait <= 0:
+                    metrics.throttle_wait.record(now - started)
+                    return self._reserve(now)
+                self._condition.wait(None if math.isinf(wait) else wait)
+
+    async def acquire_async(self) -> _RunSlot:
+        started = time.monotonic()
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                wait = self._capacity_wait(now)
+                if wait <= 0:
+                    metrics.throttle_wait.record(now - started)
+                    return self._reserve(now)
+            await asyncio.sleep(min(wait, ASYNC_POLL_SECONDS))
+
+    def release(self, slot: _RunSlot, tokens: Optional[int], completed: bool) -> None:
+        """
+        Frees a run slot. ``tokens`` is the run's total token usage if known; ``completed`` is whether
+        the run finished normally, which is what lets the concurrency limit grow.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if tokens is not None:
+                slot.tokens = tokens
+                self._tokens_per_run = (
+                    tokens if self._tokens_per_run is None else 0.8 * self._tokens_per_run + 0.2 * tokens
+                )
+            elif not completed:
+                slot.tokens = 0
+            if completed:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            metrics.runs_in_flight.add(-1)
+            metrics.concurrency_limit.set(self.concurrency_limit)
+            self._condition.notify_all()
+
+    def _record_throttle(self, operation: str, reason: str, retry_after: Optional[float], retried: bool) -> None:
+        now = time.monotonic()
+        with self._condition:
+            self.throttle_counts[reason] = self.throttle_counts.get(reason, 0) + 1
+            if retried:
+                self.retries += 1
+            if now >= self._next_decrease_at:
+                self._limit = max(float(self.min_concurrency), self._limit / 2)
+                self._next_decrease_at = now + max(self.decrease_cooldown, retry_after or 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            limit = self.concurrency_limit
+            metrics.concurrency_limit.set(limit)
+            self._condition.notify_all()
+        metrics.throttle_events.add(
+            1,
+            {
+                "agent_team.throttle.operation": operation,
+                "agent_team.throttle.reason": reason,
+                "agent_team.throttle.retried": retried,
+            },
+        )
+        print(f"Throttled on {operation} ({reason}); concurrent run limit is now {limit}.")
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            # Spread the callers told to come back at the same time
+            return retry_after * self._random.uniform(1.0, 1.2)
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def retry_delay(self, operation: str, error: AzureError, attempt: int) -> Optional[float]:
+        """
+        Returns how long to wait before retrying a call that failed with ``error``, or None if it
+        should not be retried.
+        """
+        reason = _retry_reason(operation, error)
+        if reason is None:
+            return None
+        retry_after = retry_after_seconds(error)
+        retried = attempt < self.max_retries
+        self._record_throttle(operation, reason, retry_after, retried)
+        return self._backoff(attempt, retry_after) if retried else None
+
+    def run_retry_delay(self, operation: str, run: Any, attempt: int) -> Optional[float]:
+        """
+        Like :meth:`retry_delay`, for a run that the service failed because of the rate limit.
+        """
+        last_error = getattr(run, "last_error", None)
+        if getattr(run, "status", None) != "failed" or getattr(last_error, "code", None) != RATE_LIMIT_ERROR_CODE:
+            return None
+        match = _TRY_AGAIN_IN.search(getattr(last_error, "message", None) or "")
+        retry_after = float(match.group(1)) if match else None
+        retried = attempt < self.max_retries
+        self._record_throttle(operation, RATE_LIMIT_ERROR_CODE, retry_after, retried)
+        return self._backoff(attempt, retry_after) if retried else None
+
+class _ThrottledOperations:
+    """
+    Wraps an operations group (``threads``, ``messages``, ``runs``) so each call is retried.
+    """
+    def __init__(self, client: "ThrottledAgentsClient", group: str, operations: Any) -> None:
+        self._client = client
+        self._group = group
+        self._operations = operations
+
+    def __getattr__(self, name: str) -> Any:
+        return self._client._wrap(f"{self._group}.{name}", getattr(self._operations, name))
+
+class _RetriedRunCalls:
+    """
+    The runs operations as the SDK's ``create_and_process`` sees them when it is run by the throttled
+    client: ``create`` and ``get`` are each retried on their own, so a failed status poll is retried
+    as a poll instead of starting another run. Other operations, such as submitting tool outputs, are
+    passed through unchanged. With ``check_active``, ``create`` first checks that the thread has no
+    active run, as after a run that failed.
+    """
+    def __init__(self, client: "ThrottledAgentsClient", operations: Any, check_active: bool) -> None:
+        self._client = client
+        self._operations = operations
+        self._check_active = check_active
+
+    def create(self, thread_id: str, **kwargs: Any) -> Any:
+        return self._client._create_run(self._operations, thread_id, self._check_active, **kwargs)
+
+    def get(self, *args: Any, **kwargs: Any) -> Any:
+        return self._client._call("runs.get", self._operations.get, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._operations, name)
+
+class _ThrottledRuns(_ThrottledOperations):
+    def create_and_process(self, *args: Any, **kwargs: Any) -> Any:
+        controller = self._client.controller
+        attempt = 0
+        while True:
+            slot = controller.acquire()
+            run = None
+            delay: Optional[float] = None
+            try:
+                # The SDK's own create_and_process, with its create and get calls retried one by one
+                operations = _RetriedRunCalls(self._client, self._operations, check_active=attempt > 0)
+                run = type(self._operations).create_and_process(operations, *args, **kwargs)
+                delay = controller.run_retry_delay("runs.create_and_process", run, attempt)
+            finally:
+                controller.release(slot, _run_tokens(run), completed=getattr(run, "status", None) == "completed")
+            if delay is None:
+                return run
+            time.sleep(delay)
+            attempt += 1
+
+    def stream(self, *args: Any, **kwargs: Any) -> "_ThrottledStream":
+        controller = self._client.controller
+        slot = controller.acquire()
+        try:
+            stream = self._client._call("runs.stream", self._operations.stream, *args, **kwargs)
+        except BaseException:
+            controller.release(slot, None, completed=False)
+            raise
+        return _ThrottledStream(stream, controller, slot)
+
+class _ThrottledStream:
+    """
+    Holds the run slot until the stream's context exits. Streamed runs do not report their usage
+    here, so they count at the average usage of earlier runs.
+    """
+    def __init__(self, stream: Any, controller: ThrottleController, slot: _RunSlot) -> None:
+        self._stream = stream
+        self._controller = controller
+        self._slot = slot
+
+    def __enter__(self) -> Any:
+        return self._stream.__enter__()
+
+    def __exit__(self, *exc_details: Any) -> Any:
+        try:
+            return self._stream.__exit__(*exc_details)
+        finally:
+            self._controller.release(self._slot, None, completed=exc_details[0] is None)
+
+class ThrottledAgentsClient:
+    """
+    An ``AgentsClient`` wrapper that retries throttled and transient failures and paces agent runs
+    with a :class:`ThrottleController`. It exposes the client's interface, so it can be passed to
+    :class:`~utils.agent_team.AgentTeam` in place of the client.
+
+    Failed calls are retried after the delay the service asked for, or after an exponential backoff
+    with full jitter. This comes on top of the HTTP pipeline's own retries, which give up after a few
+    seconds, and also covers runs that the service fails with ``rate_limit_exceeded``. In
+    ``runs.create_and_process`` the SDK's polling loop runs with its ``create`` and ``get`` calls retried
+    one by one. Streamed runs are paced, but a streamed run failed by the rate limit is returned to the
+    caller as it is.
+    """
+    def __init__(self, agents_client: Any, controller: Optional[ThrottleController] = None) -> None:
+        self._agents_client = agents_client
+        self.controller = controller if controller is not None else ThrottleController()
+        self.threads = _ThrottledOperations(self, "threads", agents_client.threads)
+        self.messages = _ThrottledOperations(self, "messages", agents_client.messages)
+        self.runs = _ThrottledRuns(self, "runs", agents_client.runs)
+
+    def __enter__(self) -> "ThrottledAgentsClient":
+        self._agents_client.__enter__()
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        self._agents_client.__exit__(*exc_details)
+
+    def __getattr__(self, name: str) -> Any:
+        return self._wrap(name, getattr(self._agents_client, name))
+
+    def _wrap(self, operation: str, attribute: Any) -> Any:
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return self._call(operation, attribute, *args, **kwargs)
+        return call
+
+    def _call(self, operation: str, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except AzureError as error:
+                delay = self.controller.retry_delay(operation, error, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    def _active_run(self, operations: Any, thread_id: str, agent_id: Optional[str]) -> Any:
+        """
+        Returns the thread's active run if it belongs to ``agent_id``, and None if the thread has no
+        active run. An active run of another agent is an error, since no run can be added next to it.
+        """
+        def newest_run() -> Any:
+            return next(iter(operations.list(thread_id=thread_id, limit=1, order=ListSortOrder.DESCENDING)), None)
+
+        run = self._call("runs.list", newest_run)
+        return _adopt_active_run(run, thread_id, agent_id)
+
+    def _create_run(self, operations: Any, thread_id: str, check_active: bool, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            if check_active or attempt:
+                # An earlier attempt may have started the run after all; it is picked up instead of
+                # starting a second one
+                run = self._active_run(operations, thread_id, kwargs.get("agent_id"))
+                if run is not None:
+                    return run
+            try:
+                return operations.create(thread_id=thread_id, **kwargs)
+            except AzureError as error:
+                delay = self.controller.retry_delay("runs.create", error, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+class _AsyncRetriedRunCalls(_RetriedRunCalls):
+    async def create(self, thread_id: str, **kwargs: Any) -> Any:
+        return await self._client._create_run_async(self._operations, thread_id, self._check_active, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._client._call_async("runs.get", self._operations.get, *args, **kwargs)
+
+class _AsyncThrottledRuns(_ThrottledOperations):
+    async def create_and_process(self, *args: Any, **kwargs: Any) -> Any:
+        controller = self._client.controller
+        attempt = 0
+        while True:
+            slot = await controller.acquire_async()
+            run = None
+            delay: Optional[float] = None
+            try:
+                operations = _AsyncRetriedRunCalls(self._client, self._operations, check_active=attempt > 0)
+                run = await type(self._operations).create_and_process(operations, *args, **kwargs)
+                delay = controller.run_retry_delay("runs.create_and_process", run, attempt)
+            finally:
+                controller.release(slot, _run_tokens(run), completed=getattr(run, "status", None) == "completed")
+            if delay is None:
+                return run
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def stream(self, *args: Any, **kwargs: Any) -> "_AsyncThrottledStream":
+        controller = self._client.controller
+        slot = await controller.acquire_async()
+        try:
+            stream = await self._client._call_async("runs.stream", self._operations.stream, *args, **kwargs)
+        except BaseException:
+            controller.release(slot, None, completed=False)
+            raise
+        return _AsyncThrottledStream(stream, controller, slot)
+
+class _AsyncThrottledStream:
+    def __init__(self, stream: Any, controller: ThrottleController, slot: _RunSlot) -> None:
+        self._stream = stream
+        self._controller = controller
+        self._slot = slot
+
+    async def __aenter__(self) -> Any:
+        return await self._stream.__aenter__()
+
+    async def __aexit__(self, *exc_details: Any) -> Any:
+        try:
+            return await self._stream.__aexit__(*exc_details)
+        finally:
+            self._controller.release(self._slot, None, completed=exc_details[0] is None)
+
+class AsyncThrottledAgentsClient(ThrottledAgentsClient):
+    """
+    The ``azure.ai.agents.aio`` counterpart of :class:`ThrottledAgentsClient`, for
+    :class:`~utils.async_agent_team.AsyncAgentTeam`. Waits for capacity and backoffs are awaited, so
+    they never block the event loop.
+    """
+    def __init__(self, agents_client: Any, controller: Optional[ThrottleController] = None) -> None:
+        super().__init__(agents_client, controller)
+        self.runs = _AsyncThrottledRuns(self, "runs", agents_client.runs)
+
+    async def __aenter__(self) -> "AsyncThrottledAgentsClient":
+        await self._agents_client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_details: Any) -> None:
+        await self._agents_client.__aexit__(*exc_details)
+
+    def _wrap(self, operation: str, attribute: Any) -> Any:
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self._call_async(operation, attribute, *args, **kwargs)
+        return call
+
+    async def _call_async(self, operation: str, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await function(*args, **kwargs)
+            except AzureError as error:
+                delay = self.controller.retry_delay(operation, error, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _active_run_async(self, operations: Any, thread_id: str, agent_id: Optional[str]) -> Any:
+        async def newest_run() -> Any:
+            async for run in operations.list(thread_id=thread_id, limit=1, order=ListSortOrder.DESCENDING):
+                return run
+            return None
+
+        run = await self._call_async("runs.list", newest_run)
+        return _adopt_active_run(run, thread_id, agent_id)
+
+    async def _create_run_async(self, operations: Any, thread_id: str, check_active: bool, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            if check_active or attempt:
+                run = await self._active_run_async(operations, thread_id, kwargs.get("agent_id"))
+                if run is not None:
+                    return run
+            try:
+                return await operations.create(thread_id=thread_id, **kwargs)
+            except AzureError as error:
+                delay = self.controller.retry_delay("runs.create", error, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,87 @@
+import hashlib
+import os
+
+from opentelemetry import trace
+from opentelemetry.trace import Span
+from typing import Any, Dict, Optional
+
+# Defaults for the batch span processor and the SDK's attribute length limit, applied before the tracer
+# provider is created unless the OTEL_* variables are already set. A larger queue with shorter delays
+# keeps spans from being dropped while reviews emit many of them; the length limit also bounds content
+# recorded by instrumentation this policy does not see, such as the Azure SDK's GenAI spans.
+EXPORT_DEFAULTS = {
+    "OTEL_BSP_MAX_QUEUE_SIZE": "8192",
+    "OTEL_BSP_MAX_EXPORT_BATCH_SIZE": "512",
+    "OTEL_BSP_SCHEDULE_DELAY": "2000",
+    "OTEL_BSP_EXPORT_TIMEOUT": "30000",
+    "OTEL_ATTRIBUTE_VALUE_LENGTH_LIMIT": "16384",
+}
+
+# Trace IDs are compared against the ratio on their low 64 bits, as OpenTelemetry's TraceIdRatioBased does
+_TRACE_ID_LIMIT = (1 << 64) - 1
+
+class TracingPolicy:
+    """
+    Bounds the content (task descriptions and results, which include the reviewed code) put on spans
+    and events. Content is recorded for a ``sample_ratio`` share of traces, decided once per trace from
+    its trace ID so every span of a trace agrees. Recorded content is cut to ``max_content_chars``.
+    Every content attribute also gets ``.length`` and ``.sha256`` attributes, so unsampled or truncated
+    content can still be told apart and matched across spans.
+    """
+    def __init__(self, max_content_chars: int = 2048, sample_ratio: float = 1.0) -> None:
+        if max_content_chars < 0:
+            raise ValueError("max_content_chars must not be negative.")
+        if not 0.0 <= sample_ratio <= 1.0:
+            raise ValueError("sample_ratio must be between 0 and 1.")
+        self.max_content_chars = max_content_chars
+        self.sample_ratio = sample_ratio
+        self._trace_id_bound = round(sample_ratio * (_TRACE_ID_LIMIT + 1))
+
+    def records_content(self, span: Span) -> bool:
+        if self.sample_ratio >= 1.0:
+            return True
+        trace_id = span.get_span_context().trace_id
+        return trace_id & _TRACE_ID_LIMIT < self._trace_id_bound
+
+    def truncate(self, content: str) -> str:
+        if len(content) <= self.max_content_chars:
+            return content
+        omitted = len(content) - self.max_content_chars
+        return f"{content[: self.max_content_chars]}\n[... {omitted} characters omitted]"
+
+    def content_attributes(self, key: str, content: str, span: Optional[Span] = None) -> Dict[str, Any]:
+        """
+        Returns the attributes that stand in for ``content`` under ``key`` on ``span`` (the current
+        span if None). Nothing is computed for spans that are not recording.
+        """
+        span = span if span is not None else trace.get_current_span()
+        if not span.is_recording():
+            return {}
+        attributes: Dict[str, Any] = {
+            f"{key}.length": len(content),
+            f"{key}.sha256": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        }
+        if self.max_content_chars and self.records_content(span):
+            attributes[key] = self.truncate(content)
+        return attributes
+
+_policy = TracingPolicy()
+
+def set_policy(policy: TracingPolicy) -> None:
+    global _policy
+    _policy = policy
+
+def get_policy() -> TracingPolicy:
+    return _policy
+
+def content_attributes(key: str, content: str, span: Optional[Span] = None) -> Dict[str, Any]:
+    return _policy.content_attributes(key, content, span)
+
+def apply_export_defaults() -> Dict[str, str]:
+    """
+    Sets the ``EXPORT_DEFAULTS`` that are not already in the environment and returns the effective
+    values. Must run before the tracer provider and its batch span processor are created.
+    """
+    for name, value in EXPORT_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+    return {name: os.environ[name] for name in EXPORT_DEFAULTS}
@@ -0,0 +1,473 @@
+import contextvars
+import functools
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from azure.core.exceptions import ResourceNotFoundError
+from azure.ai.agents.models import (
+    Agent,
+    AgentEventHandler,
+    AgentThread,
+    MessageDeltaChunk,
+    MessageRole,
+    MessageTextContent,
+    ThreadMessage,
+    ThreadRun,
+)
+
+TRANSCRIPT_VERSION = 1
+
+# The tool calls made by the run being recorded in the current thread. The SDK makes automatic
+# function calls from the thread that processes the run, so the recorded functions can find its record.
+_recording_calls: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar(
+    "transcript_recording_calls", default=None
+)
+
+def _role(role: Any) -> str:
+    value = str(getattr(role, "value", role)).lower()
+    return "assistant" if value in ("assistant", "agent") else "user"
+
+def _hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+class _ThreadLog:
+    """
+    The messages of each thread as ``(role, content)`` pairs, kept locally so runs can be matched on
+    what their thread contained without reading it back from the service.
+    """
+    def __init__(self) -> None:
+        self._messages: Dict[str, List[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, thread_id: str, messages: Optional[List[Any]] = None) -> None:
+        with self._lock:
+            self._messages[thread_id] = [(_role(message.role), str(message.content)) for message in messages or []]
+
+    def delete(self, thread_id: str) -> None:
+        with self._lock:
+            self._messages.pop(thread_id, None)
+
+    def append(self, thread_id: str, role: Any, content: str) -> None:
+        with self._lock:
+            self._messages.setdefault(thread_id, []).append((_role(role), content))
+
+    def messages(self, thread_id: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            return list(self._messages.get(thread_id, []))
+
+    def keys(self, thread_id: str, agent_name: str) -> Tuple[str, str]:
+        """
+        Returns the run's fingerprint, over the agent and every message in the thread, and its request
+        key, over the agent and the last user message. The request key still matches when messages
+        from concurrent tasks were added to a shared thread in a different order.
+        """
+        messages = self.messages(thread_id)
+        fingerprint = _hash(agent_name, *(f"{role}:{content}" for role, content in messages))
+        last_request = next((content for role, content in reversed(messages) if role == "user"), "")
+        return fingerprint, _hash(agent_name, last_request)
+
+class Transcript:
+    """
+    The recorded agent runs of one or more reviews: for each run, its agent, the keys of its input,
+    the reply text, the run status and usage, and the tool calls the run made. Threads and messages
+    are not stored, since replay rebuilds them from the requests and the recorded replies.
+
+    A replayed run is matched on its fingerprint first and on its request key otherwise. Runs with
+    the same key are served in the order they were recorded.
+    """
+    def __init__(self, runs: Optional[List[Dict[str, Any]]] = None, agents: Optional[Dict[str, str]] = None) -> None:
+        self.runs: List[Dict[str, Any]] = runs or []
+        self.agents: Dict[str, str] = agents or {}
+        self._by_fingerprint: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_request: Dict[str, List[Dict[str, Any]]] = {}
+        for run in self.runs:
+            self._index(run)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(path: str) -> "Transcript":
+        with gzip.open(path, "rt", encoding="utf-8") as transcript_file:
+            data = json.load(transcript_file)
+        if data.get("version") != TRANSCRIPT_VERSION:
+            raise ValueError(f"Unsupported transcript version {data.get('version')} in '{path}'.")
+        return Transcript(data["runs"], data.get("agents"))
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            data = {"version": TRANSCRIPT_VERSION, "agents": dict(self.agents), "runs": list(self.runs)}
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as transcript_file:
+            json.dump(data, transcript_file, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def _index(self, run: Dict[str, Any]) -> None:
+        self._by_fingerprint.setdefault(run["fingerprint"], []).append(run)
+        self._by_request.setdefault(run["request"], []).append(run)
+
+    def add_run(self, run: Dict[str, Any]) -> None:
+        with self._lock:
+            self.runs.append(run)
+
+    def add_agent(self, agent_id: str, name: str) -> None:
+        with self._lock:
+            self.agents[agent_id] = name
+
+    def take_run(self, agent_name: str, fingerprint: str, request: str) -> Dict[str, Any]:
+        with self._lock:
+            for runs, other_key, other in (
+                (self._by_fingerprint.get(fingerprint), "request", self._by_request),
+                (self._by_request.get(request), "fingerprint", self._by_fingerprint),
+            ):
+                if runs:
+                    run = runs.pop(0)
+                    other[run[other_key]].remove(run)
+                    return run
+        raise LookupError(f"No recorded run of agent '{agent_name}' matches this request.")
+
+def _message_text(content: str) -> MessageTextContent:
+    return MessageTextContent({"type": "text", "text": {"value": content, "annotations": []}})
+
+class _Operations:
+    pass
+
+class RecordingAgentsClient:
+    """
+    An ``AgentsClient`` wrapper that records every agent run made through it, including the tool
+    calls made by functions registered with ``enable_auto_function_calls``, and writes the transcript
+    to ``path`` when the client is closed. Other calls are passed through unchanged.
+
+    Functions must be registered through this wrapper for their calls to be recorded. Recording reads
+    each run's reply back once, which adds a call per non-streamed run.
+    """
+    def __init__(self, agents_client: Any, path: str) -> None:
+        self._agents_client = agents_client
+        self.path = path
+        self.transcript = Transcript()
+        self._threads = _ThreadLog()
+        self.threads = _Operations()
+        self.threads.create = self._create_thread
+        self.threads.delete = self._delete_thread
+        self.messages = _Operations()
+        self.messages.create = self._create_message
+        self.messages.list = agents_client.messages.list
+        self.messages.get_last_message_text_by_role = agents_client.messages.get_last_message_text_by_role
+        self.runs = _Operations()
+        self.runs.create_and_process = self._create_and_process
+        self.runs.stream = self._stream
+
+    def __enter__(self) -> "RecordingAgentsClient":
+        self._agents_client.__enter__()
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        try:
+            self.save()
+        finally:
+            self._agents_client.__exit__(*exc_details)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._agents_client, name)
+
+    def save(self) -> None:
+        self.transcript.save(self.path)
+        print(f"Recorded {len(self.transcript.runs)} agent runs to '{self.path}'")
+
+    def enable_auto_function_calls(self, tools: Any) -> None:
+        if isinstance(tools, (set, list, tuple)):
+            tools = {self._recorded_function(function) for function in tools}
+        self._agents_client.enable_auto_function_calls(tools)
+
+    @staticmethod
+    def _recorded_function(function: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def call(**arguments: Any) -> Any:
+            calls = _recording_calls.get()
+            if calls is not None:
+                calls.append({"name": function.__name__, "arguments": arguments})
+            return function(**arguments)
+        return call
+
+    def create_agent(self, *args: Any, **kwargs: Any) -> Agent:
+        agent = self._agents_client.create_agent(*args, **kwargs)
+        self.transcript.add_agent(agent.id, agent.name)
+        return agent
+
+    def _agent_name(self, agent_id: str) -> str:
+        name = self.transcript.agents.get(agent_id)
+        if name is None:
+            # Pooled agents were created by an earlier process
+            name = self._agents_client.get_agent(agent_id).name
+            self.transcript.add_agent(agent_id, name)
+        return name
+
+    def _create_thread(self, messages: Optional[List[Any]] = None, **kwargs: Any) -> AgentThread:
+        if messages:
+            thread = self._agents_client.threads.create(messages=messages, **kwargs)
+        else:
+            thread = self._agents_client.threads.create(**kwargs)
+        self._threads.create(thread.id, messages)
+        return thread
+
+    def _delete_thread(self, thread_id: str, **kwargs: Any) -> Any:
+        self._threads.delete(thread_id)
+        return self._agents_client.threads.delete(thread_id, **kwargs)
+
+    def _create_message(self, thread_id: str, role: Any, content: str, **kwargs: Any) -> ThreadMessage:
+        message = self._agents_client.messages.create(thread_id=thread_id, role=role, content=content, **kwargs)
+        self._threads.append(thread_id, role, content)
+        return message
+
+    def _record_run(
+        self, thread_id: str, agent_name: str, keys: Tuple[str, str], text: str, run: Optional[ThreadRun], calls: List[Dict[str, Any]]
+    ) -> None:
+        if text:
+            self._threads.append(thread_id, "assistant", text)
+        usage = getattr(run, "usage", None)
+        last_error = getattr(run, "last_error", None)
+        self.transcript.add_run(
+            {
+                "agent": agent_name,
+                "fingerprint": keys[0],
+                "request": keys[1],
+                "text": text,
+                "status": getattr(run, "status", None),
+                "usage": usage.as_dict() if usage is not None else None,
+                "last_error": last_error.as_dict() if last_error is not None else None,
+                "tool_calls": calls,
+            }
+        )
+
+    def _create_and_process(self, thread_id: str, agent_id: str, **kwargs: Any) -> ThreadRun:
+        agent_name = self._agent_name(agent_id)
+        keys = self._threads.keys(thread_id, agent_name)
+        calls: List[Dict[str, Any]] = []
+        token = _recording_calls.set(calls)
+        try:
+            run = self._agents_client.runs.create_and_process(thread_id=thread_id, agent_id=agent_id, **kwargs)
+        finally:
+            _recording_calls.reset(token)
+        text = ""
+        if getattr(run, "status", None) == "completed":
+            text_message = self._agents_client.messages.get_last_message_text_by_role(
+                thread_id=thread_id, role=MessageRole.AGENT
+            )
+            text = text_message.text.value if text_message and text_message.text else ""
+        self._record_run(thread_id, agent_name, keys, text, run, calls)
+        return run
+
+    def _stream(self, thread_id: str, agent_id: str, event_handler: AgentEventHandler, **kwargs: Any) -> "_RecordingStream":
+        stream = self._agents_client.runs.stream(thread_id=thread_id, agent_id=agent_id, event_handler=event_handler, **kwargs)
+        return _RecordingStream(self, stream, thread_id, self._agent_name(agent_id), event_handler)
+
+class _RecordingStream:
+    """
+    Records a streamed run by observing the completed message and run passed to the caller's event
+    handler, so the stream is consumed exactly as it would be without recording.
+    """
+    def __init__(self, client: RecordingAgentsClient, stream: Any, thread_id: str, agent_name: str, handler: Any) -> None:
+        self._client = client
+        self._stream = stream
+        self._thread_id = thread_id
+        self._agent_name = agent_name
+        self._handler = handler
+        self._text = ""
+        self._run: Optional[ThreadRun] = None
+        self._calls: List[Dict[str, Any]] = []
+        self._keys = client._threads.keys(thread_id, agent_name)
+        self._token: Optional[contextvars.Token] = None
+
+    def __enter__(self) -> Any:
+        on_thread_message = self._handler.on_thread_message
+        on_thread_run = self._handler.on_thread_run
+
+        def observe_message(message: ThreadMessage) -> Any:
+            if message.status == "completed" and message.text_messages:
+                self._text = message.text_messages[-1].text.value
+            return on_thread_message(message)
+
+        def observe_run(run: ThreadRun) -> Any:
+            self._run = run
+            return on_thread_run(run)
+
+        # Instance attributes take precedence over the handler's methods until the stream exits
+        self._handler.on_thread_message = observe_message
+        self._handler.on_thread_run = observe_run
+        self._token = _recording_calls.set(self._calls)
+        return self._stream.__enter__()
+
+    def __exit__(self, *exc_details: Any) -> Any:
+        try:
+            return self._stream.__exit__(*exc_details)
+        finally:
+            if self._token is not None:
+                _recording_calls.reset(self._token)
+            del self._handler.on_thread_message
+            del self._handler.on_thread_run
+            self._client._record_run(self._thread_id, self._agent_name, self._keys, self._text, self._run, self._calls)
+
+class ReplayAgentsClient:
+    """
+    An in-process ``AgentsClient`` stand-in that serves the runs of a recorded :class:`Transcript`
+    with no network access. Threads and messages are kept locally. Each replayed run makes the tool
+    calls of its recorded run through the functions registered with ``enable_auto_function_calls``,
+    so ``_create_task`` queues the same tasks as in the recording.
+    """
+    def __init__(self, transcript: Transcript) -> None:
+        self.transcript = transcript
+        self.replayed_runs = 0
+        self._threads = _ThreadLog()
+        self._functions: Dict[str, Callable[..., Any]] = {}
+        self._agents: Dict[str, str] = dict(transcript.agents)
+        self._ids = itertools.count(1)
+        self.threads = _Operations()
+        self.threads.create = self._create_thread
+        self.threads.delete = self._delete_thread
+        self.messages = _Operations()
+        self.messages.create = self._create_message
+        self.messages.list = self._list_messages
+        self.messages.get_last_message_text_by_role = self._get_last_message_text_by_role
+        self.runs = _Operations()
+        self.runs.create_and_process = self._create_and_process
+        self.runs.stream = self._stream
+
+    @staticmethod
+    def load(path: str) -> "ReplayAgentsClient":
+        return ReplayAgentsClient(Transcript.load(path))
+
+    def __enter__(self) -> "ReplayAgentsClient":
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        print(f"Replayed {self.replayed_runs} agent runs")
+
+    def _next_id(self, prefix: str) -> str:
+        return f"replay_{prefix}_{next(self._ids)}"
+
+    def enable_auto_function_calls(self, tools: Any) -> None:
+        for function in tools:
+            self._functions[function.__name__] = function
+
+    def create_agent(self, model: str, name: str, instructions: str = "", **kwargs: Any) -> Agent:
+        agent = Agent({"id": self._next_id("asst"), "object": "assistant", "name": name, "model": model, "instructions": instructions})
+        self._agents[agent.id] = name
+        return agent
+
+    def get_agent(self, agent_id: str, **kwargs: Any) -> Agent:
+        if agent_id not in self._agents:
+            raise ResourceNotFoundError(f"Agent '{agent_id}' is not in the transcript.")
+        return Agent({"id": agent_id, "object": "assistant", "name": self._agents[agent_id]})
+
+    def delete_agent(self, agent_id: str, **kwargs: Any) -> None:
+        self._agents.pop(agent_id, None)
+
+    def _create_thread(self, messages: Optional[List[Any]] = None, **kwargs: Any) -> AgentThread:
+        thread = AgentThread({"id": self._next_id("thread"), "object": "thread", "created_at": int(time.time())})
+        self._threads.create(thread.id, messages)
+        return thread
+
+    def _delete_thread(self, thread_id: str, **kwargs: Any) -> None:
+        self._threads.delete(thread_id)
+
+    def _build_message(self, thread_id: str, role: str, content: str) -> ThreadMessage:
+        return ThreadMessage(
+            {
+                "id": self._next_id("msg"),
+                "object": "thread.message",
+                "created_at": int(time.time()),
+                "thread_id": thread_id,
+                "status": "completed",
+                "role": role,
+                "content": [{"type": "text", "text": {"value": content, "annotations": []}}],
+                "attachments": [],
+                "metadata": {},
+            }
+        )
+
+    def _create_message(self, thread_id: str, role: Any, content: str, **kwargs: Any) -> ThreadMessage:
+        self._threads.append(thread_id, role, content)
+        return self._build_message(thread_id, _role(role), content)
+
+    def _list_messages(self, thread_id: str, **kwargs: Any) -> List[ThreadMessage]:
+        # Newest first, like the service's default order
+        return [self._build_message(thread_id, role, content) for role, content in reversed(self._threads.messages(thread_id))]
+
+    def _get_last_message_text_by_role(self, thread_id: str, role: Any) -> Optional[MessageTextContent]:
+        wanted = _role(role)
+        for message_role, content in reversed(self._threads.messages(thread_id)):
+            if message_role == wanted:
+                return _message_text(content)
+        return None
+
+    def _replay_run(self, thread_id: str, agent_id: str) -> Tuple[Dict[str, Any], ThreadRun]:
+        agent_name = self._agents.get(agent_id)
+        if agent_name is None:
+            raise ResourceNotFoundError(f"Agent '{agent_id}' is not in the transcript.")
+        fingerprint, request = self._threads.keys(thread_id, agent_name)
+        recorded = self.transcript.take_run(agent_name, fingerprint, request)
+        for tool_call in recorded["tool_calls"]:
+            self._functions[tool_call["name"]](**tool_call["arguments"])
+        if recorded["text"]:
+            self._threads.append(thread_id, "assistant", recorded["text"])
+        self.replayed_runs += 1
+        run = ThreadRun(
+            {
+                "id": self._next_id("run"),
+                "object": "thread.run",
+                "thread_id": thread_id,
+                "assistant_id": agent_id,
+                "status": recorded["status"],
+                "usage": recorded["usage"],
+                "last_error": recorded["last_error"],
+            }
+        )
+        return recorded, run
+
+    def _create_and_process(self, thread_id: str, agent_id: str, **kwargs: Any) -> ThreadRun:
+        return self._replay_run(thread_id, agent_id)[1]
+
+    def _stream(self, thread_id: str, agent_id: str, event_handler: AgentEventHandler, **kwargs: Any) -> "_ReplayStream":
+        return _ReplayStream(self, thread_id, agent_id, event_handler)
+
+class _ReplayStream:
+    def __init__(self, client: ReplayAgentsClient, thread_id: str, agent_id: str, event_handler: AgentEventHandler) -> None:
+        self._client = client
+        self._thread_id = thread_id
+        self._agent_id = agent_id
+        self._event_handler = event_handler
+
+    def __enter__(self) -> "_ReplayStream":
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        pass
+
+    def until_done(self) -> None:
+        recorded, run = self._client._replay_run(self._thread_id, self._agent_id)
+        if recorded["text"]:
+            message = self._client._build_message(self._thread_id, "assistant", recorded["text"])
+            # The whole reply arrives as one delta
+            self._event_handler.on_message_delta(
+                MessageDeltaChunk(
+                    {
+                        "id": message.id,
+                        "object": "thread.message.delta",
+                        "delta": {
+                            "role": "assistant",
+                            "content": [{"index": 0, "type": "text", "text": {"value": recorded["text"], "annotations": []}}],
+                        },
+                    }
+                )
+            )
+            self._event_handler.on_thread_message(message)
+        self._event_handler.on_thread_run(run)
+        self._event_handler.on_done()